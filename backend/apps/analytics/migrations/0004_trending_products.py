@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_initial'),
+        ('products', '0005_product_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductActivityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('cart_adds', models.PositiveIntegerField(default=0)),
+                ('cart_quantity', models.PositiveIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('ordered_quantity', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_buckets', to='products.product')),
+            ],
+            options={
+                'db_table': 'product_activity_buckets',
+                'indexes': [models.Index(fields=['bucket_start'], name='product_act_bucket__ae9b5d_idx')],
+                'unique_together': {('product', 'bucket_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_hours', models.PositiveIntegerField(choices=[(1, 'Last hour'), (6, 'Last 6 hours'), (24, 'Last 24 hours'), (72, 'Last 3 days'), (168, 'Last 7 days')])),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.FloatField(default=0)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('cart_adds', models.PositiveIntegerField(default=0)),
+                ('cart_quantity', models.PositiveIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('ordered_quantity', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_entries', to='products.product')),
+            ],
+            options={
+                'db_table': 'trending_products',
+                'ordering': ['window_hours', 'rank'],
+                'indexes': [models.Index(fields=['window_hours', 'rank'], name='trending_pr_window__44c46a_idx')],
+                'unique_together': {('window_hours', 'product')},
+            },
+        ),
+    ]
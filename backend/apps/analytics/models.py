@@ -137,3 +137,63 @@ class PopularProduct(models.Model):
     
     def __str__(self):
         return f"{self.product.name} - {self.seller.business_name} ({self.period_start} to {self.period_end})"
+
+
+class ProductActivityBucket(models.Model):
+    """Hourly counts of product views, cart adds and orders used for trending scores"""
+    
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='activity_buckets')
+    bucket_start = models.DateTimeField()
+    
+    views = models.PositiveIntegerField(default=0)
+    cart_adds = models.PositiveIntegerField(default=0)
+    cart_quantity = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+    ordered_quantity = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'product_activity_buckets'
+        unique_together = [['product', 'bucket_start']]
+        indexes = [
+            models.Index(fields=['bucket_start']),
+        ]
+    
+    def __str__(self):
+        return f"Activity for product {self.product_id} at {self.bucket_start}"
+
+
+class TrendingProduct(models.Model):
+    """Precomputed trending ranking of products for a fixed time window"""
+    
+    WINDOW_CHOICES = (
+        (1, 'Last hour'),
+        (6, 'Last 6 hours'),
+        (24, 'Last 24 hours'),
+        (72, 'Last 3 days'),
+        (168, 'Last 7 days'),
+    )
+    
+    window_hours = models.PositiveIntegerField(choices=WINDOW_CHOICES)
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='trending_entries')
+    rank = models.PositiveIntegerField()
+    score = models.FloatField(default=0)
+    
+    # Raw activity within the window
+    views = models.PositiveIntegerField(default=0)
+    cart_adds = models.PositiveIntegerField(default=0)
+    cart_quantity = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+    ordered_quantity = models.PositiveIntegerField(default=0)
+    
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'trending_products'
+        unique_together = [['window_hours', 'product']]
+        indexes = [
+            models.Index(fields=['window_hours', 'rank']),
+        ]
+        ordering = ['window_hours', 'rank']
+    
+    def __str__(self):
+        return f"#{self.rank} {self.product_id} ({self.window_hours}h)"
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .trending import refresh_trending_products as refresh_trending
+
+
+@shared_task
+def refresh_trending_products():
+    """Recompute trending product rankings from recent activity"""
+    refresh_trending()
@@ -1,3 +1,76 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.orders.models import Cart, CartItem
+from apps.products.models import Product
+from apps.users.models import User, SellerProfile
+from .models import ProductActivityBucket, TrendingProduct
+from .trending import get_bucket_start, refresh_activity_buckets, refresh_trending_scores
+
+
+def create_product(seller, name):
+    return Product.objects.create(
+        seller=seller, name=name, description=name, price=100, base_price=100, stock_quantity=10
+    )
+
 
-# Create your tests here.
+class TrendingProductTests(TestCase):
+    """Trending rankings precomputed from hourly activity buckets"""
+    
+    def setUp(self):
+        user = User.objects.create(email='seller@example.com', username='seller')
+        seller = SellerProfile.objects.create(
+            user=user, business_name='Shop', business_description='Clothes',
+            phone_number='+8801711111111', business_address='Dhaka', status='approved'
+        )
+        self.viewed = create_product(seller, 'Viewed')
+        self.ordered = create_product(seller, 'Ordered')
+        self.last_week = create_product(seller, 'Last week')
+        self.now = timezone.now()
+        this_hour = get_bucket_start(self.now)
+        ProductActivityBucket.objects.bulk_create([
+            ProductActivityBucket(product=self.viewed, bucket_start=this_hour, views=10),
+            ProductActivityBucket(product=self.ordered, bucket_start=this_hour, orders=1, ordered_quantity=2),
+            ProductActivityBucket(product=self.last_week, bucket_start=this_hour - timedelta(days=5), views=500),
+        ])
+    
+    def ranking(self, window_hours):
+        return list(TrendingProduct.objects.filter(window_hours=window_hours).values_list('product_id', flat=True))
+    
+    def test_windows_rank_their_own_activity(self):
+        refresh_trending_scores(self.now)
+        
+        # An order weighs more than ten views; older activity only counts in longer windows
+        self.assertEqual(self.ranking(24), [self.ordered.id, self.viewed.id])
+        self.assertEqual(self.ranking(168)[0], self.last_week.id)
+        entry = TrendingProduct.objects.get(window_hours=24, product=self.ordered)
+        self.assertEqual((entry.rank, entry.orders, entry.ordered_quantity), (1, 1, 2))
+    
+    def test_inactive_products_are_left_out(self):
+        Product.objects.filter(id=self.ordered.id).update(status='inactive')
+        
+        refresh_trending_scores(self.now)
+        self.assertEqual(self.ranking(24), [self.viewed.id])
+    
+    def test_cart_adds_are_counted_into_buckets(self):
+        buyer = User.objects.create(email='buyer@example.com', username='buyer')
+        CartItem.objects.create(cart=Cart.objects.create(user=buyer), product=self.viewed, quantity=3)
+        
+        refresh_activity_buckets(self.now - timedelta(hours=2))
+        
+        bucket = ProductActivityBucket.objects.get(product=self.viewed, bucket_start=get_bucket_start(self.now))
+        self.assertEqual((bucket.views, bucket.cart_adds, bucket.cart_quantity), (10, 1, 3))
+    
+    def test_endpoint_serves_the_smallest_covering_window(self):
+        refresh_trending_scores(self.now)
+        
+        response = APIClient().get('/api/v1/products/trending/', {'hours': 20})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['analytics_period_hours'], 24)
+        self.assertEqual(
+            [product['id'] for product in response.data['products']][:2], [self.ordered.id, self.viewed.id]
+        )
@@ -0,0 +1,170 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, IntegerField, Sum, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import ProductActivityBucket, TrendingProduct
+
+
+TRENDING_WINDOWS = [hours for hours, _ in TrendingProduct.WINDOW_CHOICES]
+TRENDING_LIMIT = 100
+
+# Relative weight of each kind of activity in the trending score
+VIEW_WEIGHT = 1
+CART_ADD_WEIGHT = 5
+ORDER_WEIGHT = 20
+
+# Activity loses half of its weight every quarter of the window
+HALF_LIFE_FRACTION = 0.25
+
+# Cart and order counts are recomputed for the buckets of the last hours on
+# every refresh; older buckets are final
+RECOMPUTE_HOURS = 2
+
+
+def get_trending_window(hours):
+    """Smallest precomputed window covering the requested number of hours"""
+    for window in TRENDING_WINDOWS:
+        if hours <= window:
+            return window
+    return TRENDING_WINDOWS[-1]
+
+
+def get_bucket_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def add_bucket_views(view_counts, moment=None):
+    """Add flushed product views to the current hourly bucket"""
+    from apps.products.models import Product
+    
+    bucket_start = get_bucket_start(moment or timezone.now())
+    view_counts = dict(view_counts)
+    product_ids = list(Product.objects.filter(id__in=view_counts).values_list('id', flat=True))
+    if not product_ids:
+        return
+    
+    ProductActivityBucket.objects.bulk_create(
+        [ProductActivityBucket(product_id=product_id, bucket_start=bucket_start) for product_id in product_ids],
+        ignore_conflicts=True
+    )
+    ProductActivityBucket.objects.filter(
+        bucket_start=bucket_start,
+        product_id__in=product_ids
+    ).update(views=F('views') + Case(
+        *[When(product_id=product_id, then=view_counts[product_id]) for product_id in product_ids],
+        default=0,
+        output_field=IntegerField()
+    ))
+
+
+def refresh_activity_buckets(since):
+    """Recompute cart and order counts of the hourly buckets starting at `since`"""
+    from apps.orders.models import CartItem, OrderItem
+    
+    since = get_bucket_start(since)
+    buckets = {}
+    
+    def get_bucket(row):
+        key = (row['product_id'], row['bucket'])
+        if key not in buckets:
+            buckets[key] = ProductActivityBucket(product_id=row['product_id'], bucket_start=row['bucket'])
+        return buckets[key]
+    
+    cart_rows = CartItem.objects.filter(created_at__gte=since).annotate(
+        bucket=TruncHour('created_at')
+    ).values('product_id', 'bucket').annotate(adds=Count('id'), quantity=Sum('quantity'))
+    for row in cart_rows:
+        bucket = get_bucket(row)
+        bucket.cart_adds = row['adds']
+        bucket.cart_quantity = row['quantity'] or 0
+    
+    order_rows = OrderItem.objects.filter(created_at__gte=since).annotate(
+        bucket=TruncHour('created_at')
+    ).values('product_id', 'bucket').annotate(orders=Count('id'), quantity=Sum('quantity'))
+    for row in order_rows:
+        bucket = get_bucket(row)
+        bucket.orders = row['orders']
+        bucket.ordered_quantity = row['quantity'] or 0
+    
+    counted_fields = ['cart_adds', 'cart_quantity', 'orders', 'ordered_quantity']
+    with transaction.atomic():
+        ProductActivityBucket.objects.filter(bucket_start__gte=since).update(
+            **{field: 0 for field in counted_fields}
+        )
+        ProductActivityBucket.objects.bulk_create(
+            buckets.values(),
+            update_conflicts=True,
+            unique_fields=['product', 'bucket_start'],
+            update_fields=counted_fields
+        )
+    return len(buckets)
+
+
+def refresh_trending_scores(now=None):
+    """Rank products with time-decayed activity scores for every trending window"""
+    now = now or timezone.now()
+    table = ProductActivityBucket._meta.db_table
+    
+    for window in TRENDING_WINDOWS:
+        half_life = window * HALF_LIFE_FRACTION
+        # Age is measured from the end of each bucket, so the current hour counts in full
+        decay = RawSQL(
+            f'power(0.5, greatest(extract(epoch from (%s - "{table}"."bucket_start")) - 3600, 0) / 3600.0 / %s)',
+            (now, half_life),
+            output_field=FloatField()
+        )
+        activity = F('views') * VIEW_WEIGHT + F('cart_adds') * CART_ADD_WEIGHT + F('orders') * ORDER_WEIGHT
+        
+        rows = ProductActivityBucket.objects.filter(
+            bucket_start__gte=get_bucket_start(now - timedelta(hours=window)),
+            product__status='active'
+        ).values('product_id').annotate(
+            total_views=Sum('views'),
+            total_cart_adds=Sum('cart_adds'),
+            total_cart_quantity=Sum('cart_quantity'),
+            total_orders=Sum('orders'),
+            total_ordered_quantity=Sum('ordered_quantity'),
+            score=Sum(ExpressionWrapper(activity * decay, output_field=FloatField()))
+        ).filter(score__gt=0).order_by('-score', 'product_id')[:TRENDING_LIMIT]
+        
+        entries = [
+            TrendingProduct(
+                window_hours=window,
+                product_id=row['product_id'],
+                rank=rank,
+                score=row['score'],
+                views=row['total_views'],
+                cart_adds=row['total_cart_adds'],
+                cart_quantity=row['total_cart_quantity'],
+                orders=row['total_orders'],
+                ordered_quantity=row['total_ordered_quantity'],
+                computed_at=now
+            )
+            for rank, row in enumerate(rows, start=1)
+        ]
+        
+        with transaction.atomic():
+            TrendingProduct.objects.filter(window_hours=window).delete()
+            TrendingProduct.objects.bulk_create(entries)
+
+
+def refresh_trending_products():
+    """Update recent activity buckets, rescore every window and prune old buckets"""
+    now = timezone.now()
+    
+    # Backfill the longest window until a first ranking exists
+    if TrendingProduct.objects.exists():
+        since = now - timedelta(hours=RECOMPUTE_HOURS)
+    else:
+        since = now - timedelta(hours=TRENDING_WINDOWS[-1])
+    
+    refresh_activity_buckets(since)
+    refresh_trending_scores(now)
+    
+    ProductActivityBucket.objects.filter(
+        bucket_start__lt=get_bucket_start(now - timedelta(hours=TRENDING_WINDOWS[-1]))
+    ).delete()
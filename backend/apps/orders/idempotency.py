@@ -0,0 +1,82 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+# Keys can be retried for this long, then they are purged
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+
+def request_fingerprint(request):
+    """SHA-256 of the method, path and body of a request, so a key cannot be reused for another request"""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    payload = json.dumps([request.method, request.path, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def idempotent(view_method):
+    """
+    Make an APIView handler safe to retry with an Idempotency-Key header.
+    
+    The first request with a key runs the handler and stores its response with
+    the key, in the transaction of the handler's own writes; retries get that
+    response back without running it again. A duplicate arriving while the
+    first is still running waits on the key's row lock, then replays. Server
+    errors are not stored, so those requests can be retried for real.
+    Requests without the header run as before.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return Response(
+                {'error': f'{IDEMPOTENCY_HEADER} is too long'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        fingerprint = request_fingerprint(request)
+        record, _ = IdempotencyKey.objects.get_or_create(
+            user=request.user, key=key, defaults={'fingerprint': fingerprint}
+        )
+        
+        with transaction.atomic():
+            # Held until the response is stored, so concurrent duplicates queue up here
+            record = IdempotencyKey.objects.select_for_update().get(pk=record.pk)
+            if record.fingerprint != fingerprint:
+                return Response(
+                    {'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if record.status_code is not None:
+                response = Response(record.response_body, status=record.status_code)
+                response['Idempotent-Replayed'] = 'true'
+                return response
+            
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code < 500:
+                record.status_code = response.status_code
+                record.response_body = response.data
+                record.save(update_fields=['status_code', 'response_body'])
+            return response
+    
+    return wrapper
+
+
+def purge_expired_idempotency_keys(now=None):
+    """Delete keys past their retry window; returns how many"""
+    cutoff = (now or timezone.now()) - IDEMPOTENCY_KEY_TTL
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
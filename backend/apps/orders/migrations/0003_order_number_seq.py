@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:05
+
+from django.db import migrations
+
+
+# Start after the random 5-digit IDs and after any larger numeric ID already taken
+CREATE_SEQUENCE_SQL = """
+CREATE SEQUENCE order_number_seq START WITH 100000;
+SELECT setval('order_number_seq', GREATEST(100000, COALESCE(MAX(id::bigint) + 1, 0)), false)
+  FROM orders
+ WHERE id ~ '^[0-9]{1,18}$';
+"""
+
+DROP_SEQUENCE_SQL = "DROP SEQUENCE order_number_seq;"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SEQUENCE_SQL, reverse_sql=DROP_SEQUENCE_SQL),
+    ]
@@ -1,11 +1,11 @@
-from django.db import models
+from django.db import connection, models
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 from djmoney.models.fields import MoneyField
 from phonenumber_field.modelfields import PhoneNumberField
 import uuid
 from decimal import Decimal
 from django.utils import timezone
-import random
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -13,6 +13,17 @@ if TYPE_CHECKING:
 
 User = get_user_model()
 
+# Order IDs are drawn from this Postgres sequence (created in migration 0003):
+# one nextval() per order, never repeated across workers. It starts above the
+# random 5-digit IDs given out before.
+ORDER_NUMBER_SEQUENCE = 'order_number_seq'
+
+
+def next_order_number():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT nextval(%s)', [ORDER_NUMBER_SEQUENCE])
+        return str(cursor.fetchone()[0])
+
 
 class Order(models.Model):
     """Orders placed by customers - matches frontend Order structure"""
@@ -34,91 +45,7 @@ class Order(models.Model):
         ('bank_transfer', 'Bank Transfer'),
     )
     
-    id = models.CharField(max_length=20, primary_key=True)  # Custom ID like "69420"
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
-    seller = models.ForeignKey('users.SellerProfile', on_delete=models.SET_NULL, null=True, related_name='seller_orders')
-    
-    # Customer information
-    customer_name = models.CharField(max_length=200)
-    customer_email = models.EmailField()
-    customer_phone = models.CharField(max_length=20)
-    customer_address = models.TextField()
-    
-    # Order details - frontend compatible fields
-    status = models.CharField(max_length=20, choices=ORDER_STATUS, default='pending')
-    payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD, default='cod')
-    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
-    bill = models.DecimalField(max_digits=10, decimal_places=2)  # Frontend uses 'bill'
-    
-    # Frontend timestamp fields
-    placedOn = models.CharField(max_length=20, blank=True)  # Frontend format: "02/03/25"
-    time = models.CharField(max_length=20, blank=True)  # Frontend format: "04:20 P.M"
-    placedTime = models.CharField(max_length=20, blank=True)  # Alternative field name
-    
-    # Standard timestamps
-    placed_on_date = models.DateField(auto_now_add=True)
-    placed_time_obj = models.TimeField(auto_now_add=True)
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-    
-    class Meta:
-        db_table = 'orders'
-        indexes = [
-            models.Index(fields=['user', 'status']),
-            models.Index(fields=['seller', 'status']),
-            models.Index(fields=['status']),
-            models.Index(fields=['created_at']),
-        ]
-        ordering = ['-created_at']
-    
-    def save(self, *args, **kwargs):
-        from django.utils import timezone
-        
-        # Generate custom order ID if not provided
-        if not self.id:
-            self.id = str(random.randint(10000, 99999))
-            while Order.objects.filter(id=self.id).exists():
-                self.id = str(random.randint(10000, 99999))
-        
-        # Sync bill with total_amount
-        if self.total_amount:
-            self.bill = self.total_amount
-        
-        # Format frontend date/time fields using current time if created_at is not set yet
-        current_time = self.created_at or timezone.now()
-        if not self.placedOn:
-            self.placedOn = current_time.strftime("%d/%m/%y")
-        if not self.time:
-            self.time = current_time.strftime("%I:%M %p")
-        if not self.placedTime:
-            self.placedTime = self.time
-        
-        super().save(*args, **kwargs)
-    
-    def __str__(self):
-        return f"Order #{self.id}"
-    
-class Order(models.Model):
-    """Orders placed by customers - matches frontend Order structure"""
-    
-    ORDER_STATUS = (
-        ('pending', 'Pending'),
-        ('processing', 'Processing'),
-        ('shipped', 'Shipped'),
-        ('delivered', 'Delivered'),
-        ('partially_delivered', 'Partially Delivered'),
-        ('cancelled', 'Cancelled'),
-        ('refunded', 'Refunded'),
-    )
-    
-    PAYMENT_METHOD = (
-        ('cod', 'Cash on Delivery'),
-        ('card', 'Credit/Debit Card'),
-        ('mobile_banking', 'Mobile Banking'),
-        ('bank_transfer', 'Bank Transfer'),
-    )
-    
-    id = models.CharField(max_length=20, primary_key=True)  # Custom ID like "69420"
+    id = models.CharField(max_length=20, primary_key=True)  # Custom ID like "100420", see next_order_number()
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
     seller = models.ForeignKey('users.SellerProfile', on_delete=models.SET_NULL, null=True, related_name='seller_orders')
     
@@ -160,9 +87,7 @@ class Order(models.Model):
         
         # Generate custom order ID if not provided
         if not self.id:
-            self.id = str(random.randint(10000, 99999))
-            while Order.objects.filter(id=self.id).exists():
-                self.id = str(random.randint(10000, 99999))
+            self.id = next_order_number()
         
         # Sync bill with total_amount
         if self.total_amount:
@@ -326,6 +251,15 @@ class CartItem(models.Model):
     @property
     def unit_price(self):
         return self.product.discounted_price
+    
+    @property
+    def available_quantity(self):
+        # Units the cart owner holds at checkout are theirs to take; with_held_quantity() annotates them
+        return self.product.available_quantity + getattr(self, 'held_quantity', 0)
+    
+    @property
+    def is_available(self):
+        return self.product.status == 'active' and self.available_quantity > 0
 
 
 class Wishlist(models.Model):
@@ -357,4 +291,30 @@ class WishlistItem(models.Model):
         return f"{self.product.name} in {self.wishlist.user.email}'s wishlist"
 
 
-
+class IdempotencyKey(models.Model):
+    """
+    Idempotency-Key a user sent with an order request, and the response it got.
+    
+    Retries with the same key get the stored response instead of running the
+    request again (see apps.orders.idempotency). Rows are purged after a day.
+    """
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    # SHA-256 of the method, path and body of the first request sent with the key
+    fingerprint = models.CharField(max_length=64)
+    # Empty until a response is stored; server errors are never stored
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'idempotency_keys'
+        unique_together = [['user', 'key']]
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.key} for {self.user_id}"
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.db import transaction
 from django.shortcuts import get_object_or_404
 from apps.products.models import Product
+from apps.products.serializers import primary_image_url
 from apps.users.models import User
 from .models import (
     Cart, CartItem, Order, OrderItem, OrderStatusHistory
@@ -18,7 +19,7 @@ class CartItemSerializer(serializers.ModelSerializer):
     seller_id = serializers.CharField(source='product.seller.id', read_only=True)
     unit_price = serializers.SerializerMethodField()
     total_price = serializers.SerializerMethodField()
-    is_available = serializers.BooleanField(source='product.is_in_stock', read_only=True)
+    is_available = serializers.BooleanField(read_only=True)
     
     class Meta:
         model = CartItem
@@ -40,13 +41,7 @@ class CartItemSerializer(serializers.ModelSerializer):
     
     def get_product_image(self, obj):
         """Get product primary image"""
-        image = obj.product.images.filter(is_primary=True).first()
-        if image and hasattr(image, 'image') and image.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(image.image.url)
-            return image.image.url
-        return None
+        return primary_image_url(obj.product, self.context.get('request'))
 
 
 class CartSerializer(serializers.ModelSerializer):
@@ -74,7 +69,7 @@ class AddToCartSerializer(serializers.Serializer):
         """Validate product exists and is available"""
         try:
             product = Product.objects.get(id=value, status='active')
-            if not product.is_in_stock or product.stock_quantity <= 0:
+            if not product.is_in_stock:
                 raise serializers.ValidationError("Product is out of stock")
             return value
         except Product.DoesNotExist:
@@ -85,9 +80,9 @@ class AddToCartSerializer(serializers.Serializer):
         product = Product.objects.get(id=attrs['product_id'])
         quantity = attrs['quantity']
         
-        if quantity > product.stock_quantity:
+        if quantity > product.available_quantity:
             raise serializers.ValidationError(
-                f"Only {product.stock_quantity} items available in stock"
+                f"Only {product.available_quantity} items available in stock"
             )
         
         return attrs
@@ -101,9 +96,9 @@ class UpdateCartItemSerializer(serializers.Serializer):
     def validate_quantity(self, value):
         """Validate quantity against available stock"""
         cart_item = self.instance
-        if cart_item and value > cart_item.product.stock_quantity:
+        if cart_item and value > cart_item.available_quantity:
             raise serializers.ValidationError(
-                f"Only {cart_item.product.stock_quantity} items available in stock"
+                f"Only {cart_item.available_quantity} items available in stock"
             )
         return value
 
@@ -125,13 +120,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
     
     def get_product_image(self, obj):
         """Get product primary image"""
-        image = obj.product.images.filter(is_primary=True).first()
-        if image and hasattr(image, 'image') and image.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(image.image.url)
-            return image.image.url
-        return None
+        return primary_image_url(obj.product, self.context.get('request'))
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -247,7 +236,7 @@ class CreateQuickOrderSerializer(serializers.Serializer):
         """Validate product exists and is available"""
         try:
             product = Product.objects.get(id=value, status='active')
-            if not product.is_in_stock or product.stock_quantity <= 0:
+            if not product.is_in_stock:
                 raise serializers.ValidationError("Product is out of stock")
             return value
         except Product.DoesNotExist:
@@ -258,9 +247,9 @@ class CreateQuickOrderSerializer(serializers.Serializer):
         product = Product.objects.get(id=attrs['product_id'])
         quantity = attrs['quantity']
         
-        if quantity > product.stock_quantity:
+        if quantity > product.available_quantity:
             raise serializers.ValidationError(
-                f"Only {product.stock_quantity} items available in stock"
+                f"Only {product.available_quantity} items available in stock"
             )
         
         return attrs 
\ No newline at end of file
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .idempotency import purge_expired_idempotency_keys
+
+
+@shared_task
+def purge_idempotency_keys():
+    """Delete Idempotency-Key records past their retry window"""
+    return purge_expired_idempotency_keys()
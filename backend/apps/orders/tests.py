@@ -1,3 +1,253 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.products.models import Product
+from apps.users.models import User, SellerProfile
+from .idempotency import purge_expired_idempotency_keys
+from .models import Cart, CartItem, IdempotencyKey, Order
+
+
+def create_seller():
+    user = User.objects.create(email='seller@example.com', username='seller')
+    return SellerProfile.objects.create(
+        user=user, business_name='Shop', business_description='Clothes',
+        phone_number='+8801711111111', business_address='Dhaka', status='approved'
+    )
+
+
+def create_order(user, seller, **kwargs):
+    return Order.objects.create(
+        user=user, seller=seller, customer_name='Customer', customer_email=user.email,
+        customer_phone='+8801722222222', customer_address='Dhaka', total_amount=100, **kwargs
+    )
+
+
+class OrderNumberTests(TestCase):
+    """Order IDs come from the order_number_seq sequence"""
+    
+    def setUp(self):
+        self.seller = create_seller()
+        self.customer = User.objects.create(email='customer@example.com', username='customer')
+    
+    def test_ids_are_increasing_numbers(self):
+        ids = [int(create_order(self.customer, self.seller).id) for _ in range(3)]
+        
+        self.assertGreaterEqual(ids[0], 100000)
+        self.assertEqual(ids, [ids[0], ids[0] + 1, ids[0] + 2])
+    
+    def test_given_id_is_kept(self):
+        self.assertEqual(create_order(self.customer, self.seller, id='ABC1').id, 'ABC1')
+
+
+class ConcurrentOrderNumberTests(TransactionTestCase):
+    """Orders created at the same time never share an ID"""
+    
+    def test_concurrent_orders_get_distinct_ids(self):
+        seller = create_seller()
+        customer = User.objects.create(email='customer@example.com', username='customer')
+        ids = []
+        
+        def place_orders():
+            try:
+                for _ in range(10):
+                    ids.append(create_order(customer, seller).id)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=place_orders) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(ids), 40)
+        self.assertEqual(len(set(ids)), 40)
+        self.assertEqual(Order.objects.count(), 40)
+
+
+class IdempotentOrderTests(TestCase):
+    """Retrying order creation with an Idempotency-Key replays the first response"""
+    
+    def setUp(self):
+        seller = create_seller()
+        self.product = Product.objects.create(
+            seller=seller, name='Shirt', description='Shirt', price=100, base_price=100, stock_quantity=5
+        )
+        self.customer = User.objects.create(email='customer@example.com', username='customer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        self.url = reverse('create_quick_order')
+        self.body = {
+            'product_id': self.product.id, 'quantity': 1, 'payment_method': 'cod',
+            'customer_name': 'Customer', 'customer_phone': '+8801722222222', 'customer_address': 'Dhaka'
+        }
+    
+    def post(self, body, key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(self.url, body, format='json', **headers)
+    
+    def test_retry_replays_the_order(self):
+        first = self.post(self.body, 'order-1')
+        retry = self.post(self.body, 'order-1')
+        
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Order.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 4)
+    
+    def test_key_reused_for_another_request_is_rejected(self):
+        self.post(self.body, 'order-1')
+        
+        response = self.post({**self.body, 'quantity': 2}, 'order-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+    
+    def test_client_errors_are_replayed(self):
+        first = self.post({**self.body, 'quantity': 99}, 'order-1')
+        Product.objects.filter(id=self.product.id).update(stock_quantity=100)
+        retry = self.post({**self.body, 'quantity': 99}, 'order-1')
+        
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual(retry.status_code, 400)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertFalse(Order.objects.exists())
+    
+    def test_requests_without_key_are_not_deduplicated(self):
+        self.post(self.body)
+        self.post(self.body)
+        
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+    
+    def test_keys_are_scoped_to_the_user(self):
+        self.post(self.body, 'order-1')
+        other = User.objects.create(email='other@example.com', username='other')
+        self.client.force_authenticate(other)
+        
+        response = self.post(self.body, 'order-1')
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Order.objects.count(), 2)
+    
+    def test_expired_keys_are_purged(self):
+        self.post(self.body, 'order-1')
+        self.post(self.body, 'order-2')
+        IdempotencyKey.objects.filter(key='order-1').update(created_at=timezone.now() - timedelta(days=2))
+        
+        self.assertEqual(purge_expired_idempotency_keys(), 1)
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['order-2'])
+
+
+class ConcurrentIdempotentOrderTests(TransactionTestCase):
+    """Duplicates sent while the first request runs wait for it and replay it"""
+    
+    def test_concurrent_duplicates_create_one_order(self):
+        seller = create_seller()
+        product = Product.objects.create(
+            seller=seller, name='Shirt', description='Shirt', price=100, base_price=100, stock_quantity=5
+        )
+        customer = User.objects.create(email='customer@example.com', username='customer')
+        body = {
+            'product_id': product.id, 'quantity': 1, 'payment_method': 'cod',
+            'customer_name': 'Customer', 'customer_phone': '+8801722222222', 'customer_address': 'Dhaka'
+        }
+        responses = []
+        
+        def place_order():
+            try:
+                client = APIClient()
+                client.force_authenticate(customer)
+                responses.append(client.post(
+                    reverse('create_quick_order'), body, format='json', HTTP_IDEMPOTENCY_KEY='order-1'
+                ))
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=place_order) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual([response.status_code for response in responses], [201] * 4)
+        self.assertEqual(len({response.data['id'] for response in responses}), 1)
+        self.assertEqual(Order.objects.count(), 1)
+        product.refresh_from_db()
+        self.assertEqual(product.stock_quantity, 4)
+
+
+class CheckoutTests(TestCase):
+    """Orders created from the selected cart items"""
+    
+    def setUp(self):
+        self.seller = create_seller()
+        self.customer = User.objects.create(email='customer@example.com', username='customer')
+        self.cart = Cart.objects.create(user=self.customer)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+    
+    def add_to_cart(self, count, stock_quantity=5, quantity=1):
+        items = []
+        for i in range(count):
+            product = Product.objects.create(
+                seller=self.seller, name=f'Tee {i}', description='Tee', price=100, base_price=100,
+                stock_quantity=stock_quantity
+            )
+            items.append(CartItem.objects.create(cart=self.cart, product=product, quantity=quantity))
+        return items
+    
+    def checkout(self, items):
+        return self.client.post(reverse('create_order'), {
+            'payment_method': 'cod', 'selected_items': [{'item_id': item.id} for item in items]
+        }, format='json')
+    
+    def test_query_count_does_not_grow_with_the_cart(self):
+        query_counts = []
+        for count in (2, 8):
+            CartItem.objects.filter(cart=self.cart).delete()
+            items = self.add_to_cart(count)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.checkout(items)
+            self.assertEqual(response.status_code, 201)
+            query_counts.append(len(queries))
+        
+        self.assertEqual(query_counts[0], query_counts[1])
+    
+    def test_order_takes_stock_and_empties_the_ordered_rows(self):
+        items = self.add_to_cart(2, quantity=2)
+        other = self.add_to_cart(1)[0]
+        
+        response = self.checkout(items)
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(list(Product.objects.filter(id__in=[item.product_id for item in items]).values_list(
+            'stock_quantity', flat=True
+        )), [3, 3])
+        self.assertEqual(list(self.cart.items.values_list('id', flat=True)), [other.id])
+    
+    def test_short_stock_rolls_back_the_whole_checkout(self):
+        items = self.add_to_cart(2, quantity=2)
+        Product.objects.filter(id=items[1].product_id).update(stock_quantity=1)
+        
+        response = self.checkout(items)
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(item['item_id'], item['available']) for item in response.data['unavailable_items']],
+            [(items[1].id, 1)]
+        )
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(
+            dict(Product.objects.values_list('id', 'stock_quantity')),
+            {items[0].product_id: 5, items[1].product_id: 1}
+        )
+        self.assertEqual(self.cart.items.count(), 2)
@@ -16,6 +16,9 @@ urlpatterns = [
     path('cart/items/<int:pk>/remove/', views.RemoveFromCartView.as_view(), name='remove_from_cart'),
     path('cart/clear/', views.ClearCartView.as_view(), name='clear_cart'),
     
+    # Checkout stock holds
+    path('checkout/reserve/', views.CheckoutReservationView.as_view(), name='checkout_reserve'),
+    
     # Order endpoints - more specific routes first
     path('orders/create/', views.CreateOrderView.as_view(), name='create_order'),
     path('orders/quick-create/', views.CreateQuickOrderView.as_view(), name='create_quick_order'),
@@ -5,18 +5,53 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.db.models import F, Sum
+from django.db.models import F, OuterRef, Prefetch, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from decimal import Decimal
 
+from .idempotency import idempotent
 from .models import Cart, CartItem, Order, OrderItem, OrderStatusHistory
 from .serializers import (
     CartSerializer, CartItemSerializer, AddToCartSerializer, UpdateCartItemSerializer,
     OrderSerializer, CreateOrderSerializer, CreateQuickOrderSerializer
 )
-from apps.products.models import Product
+from apps.products.inventory import (
+    InsufficientStock, StockLine, decrement_stock, release_reservations, reserve_stock
+)
+from apps.products.models import Product, StockReservation, active_offer_prefetch, primary_image_prefetch
 from apps.promos.models import PromoCode
 from apps.notifications.models import UserNotification
 
 
+def with_held_quantity(cart_items):
+    """Annotate cart items with the units of their product the cart owner holds at checkout"""
+    held = StockReservation.objects.filter(
+        user_id=OuterRef('cart__user_id'), product_id=OuterRef('product_id')
+    ).values('product_id').annotate(total=Sum('quantity')).values('total')
+    return cart_items.annotate(held_quantity=Coalesce(Subquery(held), 0))
+
+
+def cart_items_prefetch():
+    """Prefetch cart items with everything CartItemSerializer reads per row"""
+    return Prefetch(
+        'items',
+        queryset=with_held_quantity(CartItem.objects.select_related('product__seller')).prefetch_related(
+            primary_image_prefetch('product__images'),
+            active_offer_prefetch('product__offers')
+        )
+    )
+
+
+def order_items_prefetch():
+    """Prefetch order items with everything OrderItemSerializer reads per row"""
+    return Prefetch(
+        'items',
+        queryset=OrderItem.objects.select_related('product__seller').prefetch_related(
+            primary_image_prefetch('product__images')
+        )
+    )
+
+
 def notify_sellers_about_new_order(order):
     """Create notifications for sellers about new orders"""
     # Get unique sellers from order items
@@ -63,7 +98,9 @@ class CartView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
+        cart, created = Cart.objects.prefetch_related(
+            cart_items_prefetch()
+        ).get_or_create(user=self.request.user)
         return cart
 
 
@@ -88,9 +125,9 @@ class AddToCartView(APIView):
             if existing_item:
                 # Update quantity
                 new_quantity = existing_item.quantity + serializer.validated_data['quantity']
-                if new_quantity > product.stock_quantity:
+                if new_quantity > product.available_quantity:
                     return Response(
-                        {'error': f'Only {product.stock_quantity} items available'},
+                        {'error': f'Only {product.available_quantity} items available'},
                         status=status.HTTP_400_BAD_REQUEST
                     )
                 existing_item.quantity = new_quantity
@@ -120,7 +157,7 @@ class UpdateCartItemView(generics.UpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return CartItem.objects.filter(cart__user=self.request.user)
+        return with_held_quantity(CartItem.objects.filter(cart__user=self.request.user))
     
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -160,7 +197,9 @@ class OrderListView(APIView):
     def get(self, request):
         try:
             print(f"DEBUG: Fetching orders for user: {request.user}")
-            orders = Order.objects.filter(user=request.user).prefetch_related('items').order_by('-created_at')
+            orders = Order.objects.filter(user=request.user).select_related(
+                'seller__user'
+            ).prefetch_related(order_items_prefetch()).order_by('-created_at')
             print(f"DEBUG: Found {orders.count()} orders in database")
             for order in orders:
                 print(f"DEBUG: Order {order.id} - Status: {order.status}, Items: {order.items.count()}, Bill: {order.bill}")
@@ -179,7 +218,9 @@ class OrderDetailView(APIView):
     
     def get(self, request, pk):
         try:
-            order = Order.objects.filter(user=request.user).prefetch_related('items').get(pk=pk)
+            order = Order.objects.filter(user=request.user).select_related(
+                'seller__user'
+            ).prefetch_related(order_items_prefetch()).get(pk=pk)
             serializer = OrderSerializer(order, context={'request': request})
             return Response(serializer.data)
         except Order.DoesNotExist:
@@ -189,237 +230,128 @@ class OrderDetailView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def resolve_selected_cart_items(cart, selected_items):
+    """
+    Cart items picked at checkout, in selection order and without duplicates.
+    
+    Selections name a cart item ID, or a product ID with size and color. All of
+    them are resolved in one query, with the products, sellers, primary images
+    and live offers that ordering them reads.
+    """
+    selections = []
+    for selected in selected_items:
+        try:
+            selections.append((int(selected.get('item_id')), selected.get('size', ''), selected.get('color', '')))
+        except (AttributeError, TypeError, ValueError):
+            continue
+    if not selections:
+        return []
+    
+    ids = {item_id for item_id, _, _ in selections}
+    items = cart.items.filter(Q(id__in=ids) | Q(product_id__in=ids)).select_related(
+        'product__seller__user'
+    ).prefetch_related(
+        primary_image_prefetch('product__images'),
+        active_offer_prefetch('product__offers')
+    )
+    by_id = {}
+    by_product = {}
+    for item in items:
+        by_id[item.id] = item
+        by_product[(item.product_id, item.size, item.color)] = item
+    
+    resolved = {}
+    for item_id, size, color in selections:
+        item = by_id.get(item_id) or by_product.get((item_id, size, color))
+        if item:
+            resolved.setdefault(item.id, item)
+    return list(resolved.values())
+
+
+def unavailable_items_response(error):
+    """400 response listing the cart items InsufficientStock reported, with what each could still get"""
+    return Response({
+        'error': 'Some items are not available in the requested quantity',
+        'unavailable_items': [
+            {
+                'item_id': item.id,
+                'product_id': item.product_id,
+                'size': item.size,
+                'color': item.color,
+                'quantity': item.quantity,
+                'available': available,
+            }
+            for item, available in zip(error.lines, error.available)
+        ]
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class CheckoutReservationView(APIView):
+    """
+    Hold stock for the selected cart items while the shopper checks out.
+    
+    POST replaces the shopper's holds with ones for `selected_items` (as sent
+    to CreateOrderView) until the returned expiry; creating the order turns
+    them into its stock decrement, and the sweeper task releases them once
+    they expire. DELETE releases them right away.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        selected_items = request.data.get('selected_items', [])
+        if not selected_items or not isinstance(selected_items, list):
+            return Response({'error': 'No items selected'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        cart = Cart.objects.filter(user=request.user).first()
+        cart_items = resolve_selected_cart_items(cart, selected_items) if cart else []
+        if not cart_items:
+            return Response({'error': 'No valid items selected'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            expires_at = reserve_stock(request.user, cart_items)
+        except InsufficientStock as e:
+            return unavailable_items_response(e)
+        
+        return Response({
+            'expires_at': expires_at,
+            'items': [
+                {
+                    'item_id': item.id,
+                    'product_id': item.product_id,
+                    'size': item.size,
+                    'color': item.color,
+                    'quantity': item.quantity,
+                }
+                for item in cart_items
+            ]
+        }, status=status.HTTP_201_CREATED)
+    
+    def delete(self, request):
+        release_reservations(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class CreateOrderView(APIView):
-    """Create order from cart"""
+    """
+    Create orders from the selected cart items, one per seller.
+    
+    Work is done per set rather than per item: the selected items are resolved
+    in one query, order items and status history are bulk created, the consumed
+    cart rows are deleted together and stock is taken last, with one guarded
+    statement per table for the whole basket that also consumes the shopper's
+    checkout holds (see apps.products.inventory).
+    """
     permission_classes = [permissions.IsAuthenticated]
     
-    @transaction.atomic
+    @idempotent
     def post(self, request):
         try:
-            print(f"DEBUG: Full request data: {request.data}")
-            print(f"DEBUG: Request user: {request.user}")
-            
             serializer = CreateOrderSerializer(data=request.data, context={'request': request})
-            if serializer.is_valid():
-                # Get user's cart
-                try:
-                    cart = Cart.objects.get(user=request.user)
-                    if not cart.items.exists():
-                        return Response(
-                            {'error': 'Cart is empty'},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-                except Cart.DoesNotExist:
-                    return Response(
-                        {'error': 'Cart not found'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                # Get only the selected items from request data
-                selected_items = request.data.get('selected_items', [])
-                print(f"DEBUG: Received selected_items: {selected_items}")
-                if not selected_items:
-                    return Response(
-                        {'error': 'No items selected'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                # Debug: Print all cart items
-                print(f"DEBUG: Cart has {cart.items.count()} items")
-                for cart_item in cart.items.all():
-                    print(f"DEBUG: Cart item - Product ID: {cart_item.product.id}, Size: '{cart_item.size}', Color: '{cart_item.color}'")
-                
-                # Filter cart items based on selected items
-                filtered_cart_items = []
-                for selected_item in selected_items:
-                    item_id = selected_item.get('item_id')
-                    size = selected_item.get('size', '')
-                    color = selected_item.get('color', '')
-                    
-                    print(f"DEBUG: Looking for cart item ID: {item_id}, Size: '{size}', Color: '{color}'")
-                    
-                    # Try to find by cart item ID first
-                    cart_item = cart.items.filter(id=item_id).first()
-                    
-                    # If not found by cart item ID, try by product ID and attributes
-                    if not cart_item:
-                        print(f"DEBUG: Cart item not found by ID, trying product ID: {item_id}")
-                        cart_item = cart.items.filter(
-                            product__id=item_id,
-                            size=size,
-                            color=color
-                        ).first()
-                    
-                    print(f"DEBUG: Cart item found: {cart_item}")
-                    
-                    if cart_item:
-                        filtered_cart_items.append(cart_item)
-                
-                # Debug: Check filtered cart items
-                print(f"DEBUG: Found {len(filtered_cart_items)} filtered cart items")
-                for item in filtered_cart_items:
-                    print(f"DEBUG: Cart item {item.id} - Product: {item.product.name}, Seller: {item.product.seller}")
-                
-                # Group cart items by seller
-                seller_items = {}
-                for item in filtered_cart_items:
-                    seller = item.product.seller
-                    if seller not in seller_items:
-                        seller_items[seller] = []
-                    seller_items[seller].append(item)
-                
-                print(f"DEBUG: Grouped items into {len(seller_items)} seller groups")
-                
-                # Apply promo code if provided
-                promo_code = serializer.validated_data.get('promo_code')
-                total_discount = 0
-                promo_applied = False
-                
-                if promo_code:
-                    from apps.promos.utils import calculate_promo_discount
-                    cart_total = sum(item.total_price for item in filtered_cart_items)
-                    discount_amount, is_valid, error_msg = calculate_promo_discount(
-                        promo_code, cart_total, filtered_cart_items, request.user
-                    )
-                    
-                    if is_valid and discount_amount > 0:
-                        total_discount = discount_amount
-                        promo_applied = True
-                        print(f"DEBUG: Promo code {promo_code} applied with discount: {discount_amount}")
-                    else:
-                        print(f"DEBUG: Promo code error: {error_msg}")
-                
-                # Create separate orders for each seller
-                orders = []
-                for seller, items in seller_items.items():
-                    # Calculate total amount for this seller's items
-                    subtotal = sum(item.total_price for item in items)
-                    
-                    # Apply proportional discount if promo code was used
-                    seller_discount = 0
-                    if promo_applied and total_discount > 0:
-                        cart_total = sum(item.total_price for item in filtered_cart_items)
-                        seller_discount = (subtotal / cart_total) * total_discount
-                    
-                    final_amount = subtotal - seller_discount
-                    
-                    print(f"DEBUG: Creating order for seller {seller} - Subtotal: {subtotal}, Discount: {seller_discount}, Final: {final_amount}")
-                    
-                    # Create order for this seller
-                    order = Order.objects.create(
-                        user=request.user,
-                        seller=seller,
-                        customer_name=request.user.get_full_name() or request.user.email,
-                        customer_email=request.user.email,
-                        customer_phone=serializer.validated_data.get('customer_phone', ''),
-                        customer_address=serializer.validated_data.get('customer_address', ''),
-                        payment_method=serializer.validated_data['payment_method'],
-                        total_amount=final_amount,
-                        bill=final_amount,
-                    )
-                    
-                    print(f"DEBUG: Created order with ID: {order.id}")
-                    
-                    # Create order items
-                    for cart_item in items:
-                        # Safely get primary image
-                        primary_image = cart_item.product.images.filter(is_primary=True).first()
-                        photo = primary_image.image if primary_image else None
-                        
-                        OrderItem.objects.create(
-                            order=order,
-                            product=cart_item.product,
-                            title=cart_item.product.name,
-                            photo=photo,
-                            size=cart_item.size,
-                            color=cart_item.color,
-                            quantity=cart_item.quantity,
-                            unit_price=cart_item.unit_price,
-                            total_price=cart_item.total_price,
-                        )
-                        
-                        # Update product stock
-                        product = cart_item.product
-                        if product.track_inventory:
-                            product.stock_quantity = F('stock_quantity') - cart_item.quantity
-                            product.save()
-                    
-                    # Create order status history
-                    OrderStatusHistory.objects.create(
-                        order=order,
-                        new_status='pending',
-                        changed_by=request.user,
-                    )
-                    
-                    # Notify seller about new order
-                    notify_sellers_about_new_order(order)
-                    
-                    orders.append(order)
-                
-                # Don't delete cart items here - we'll handle it after order creation
-                # This is important to prevent the entire cart from being cleared
-                
-                # Apply promo code usage tracking if promo was used
-                if promo_applied and promo_code:
-                    from apps.promos.utils import apply_promo_code
-                    for order in orders:
-                        # Calculate proportional discount for this order
-                        subtotal = sum(item.total_price for item in seller_items[order.seller])
-                        cart_total = sum(item.total_price for item in filtered_cart_items)
-                        order_discount = (subtotal / cart_total) * total_discount
-                        
-                        # Apply promo code to this order
-                        success, message = apply_promo_code(promo_code, order, request.user, order_discount)
-                        if success:
-                            print(f"DEBUG: Promo code applied to order {order.id} with discount {order_discount}")
-                        else:
-                            print(f"DEBUG: Failed to apply promo to order {order.id}: {message}")
-                
-                # Notify customer about orders
-                for order in orders:
-                    notify_customer_about_order(order)
-                
-                # Debug logging
-                print(f"DEBUG: Created {len(orders)} orders")
-                for order in orders:
-                    print(f"DEBUG: Order {order.id} - Status: {order.status}, Items: {order.items.count()}")
-                
-                # Serialize the orders
-                serialized_data = OrderSerializer(orders, many=True, context={'request': request}).data
-                print(f"DEBUG: Serialized data length: {len(serialized_data)}")
-                print(f"DEBUG: Serialized data: {serialized_data}")
-                
-                # Remove cart items for the ordered items
-                for selected_item in selected_items:
-                    item_id = selected_item.get('item_id')
-                    size = selected_item.get('size', '')
-                    color = selected_item.get('color', '')
-                    
-                    try:
-                        # Try to find by cart item ID first
-                        cart_item = cart.items.filter(id=item_id).first()
-                        
-                        # If not found by cart item ID, try by product ID and attributes
-                        if not cart_item:
-                            cart_item = cart.items.filter(
-                                product__id=item_id,
-                                size=size,
-                                color=color
-                            ).first()
-                        
-                        if cart_item:
-                            cart_item.delete()
-                            print(f"DEBUG: Deleted cart item {cart_item.id} for item {item_id}")
-                    except Exception as e:
-                        print(f"DEBUG: Error deleting cart item: {e}")
-                
-                # Return all created orders
-                return Response(
-                    serialized_data,
-                    status=status.HTTP_201_CREATED
-                )
-        
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            
+            with transaction.atomic():
+                return self.create_orders(request, serializer.validated_data)
         
         except Exception as e:
             print(f"ERROR: Order creation failed: {str(e)}")
@@ -429,24 +361,140 @@ class CreateOrderView(APIView):
                 {'error': f'Order creation failed: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    def create_orders(self, request, data):
+        # Get user's cart
+        cart = Cart.objects.filter(user=request.user).first()
+        if cart is None:
+            return Response({'error': 'Cart not found'}, status=status.HTTP_400_BAD_REQUEST)
+        if not cart.items.exists():
+            return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Get only the selected items from request data
+        selected_items = request.data.get('selected_items', [])
+        if not selected_items or not isinstance(selected_items, list):
+            return Response({'error': 'No items selected'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        cart_items = resolve_selected_cart_items(cart, selected_items)
+        
+        # Prices are read once, from the prefetched offers; as Decimals so promo
+        # discounts can be computed with them
+        unit_prices = {item.id: Decimal(str(item.unit_price)) for item in cart_items}
+        line_totals = {item.id: unit_prices[item.id] * item.quantity for item in cart_items}
+        cart_total = sum(line_totals.values())
+        
+        # Group cart items by seller
+        seller_items = {}
+        for item in cart_items:
+            seller_items.setdefault(item.product.seller, []).append(item)
+        
+        # Apply promo code if provided
+        promo_code = data.get('promo_code')
+        total_discount = 0
+        promo_applied = False
+        
+        if promo_code:
+            from apps.promos.utils import calculate_promo_discount
+            discount_amount, is_valid, error_msg = calculate_promo_discount(
+                promo_code, cart_total, cart_items, request.user
+            )
+            if is_valid and discount_amount > 0:
+                total_discount = discount_amount
+                promo_applied = True
+        
+        # Create separate orders for each seller
+        orders = []
+        order_discounts = {}
+        order_items = []
+        for seller, items in seller_items.items():
+            subtotal = sum(line_totals[item.id] for item in items)
+            
+            # Apply proportional discount if promo code was used
+            seller_discount = 0
+            if promo_applied:
+                seller_discount = (subtotal / cart_total) * total_discount
+            final_amount = subtotal - seller_discount
+            
+            order = Order.objects.create(
+                user=request.user,
+                seller=seller,
+                customer_name=request.user.get_full_name() or request.user.email,
+                customer_email=request.user.email,
+                customer_phone=data.get('customer_phone', ''),
+                customer_address=data.get('customer_address', ''),
+                payment_method=data['payment_method'],
+                total_amount=final_amount,
+                bill=final_amount,
+            )
+            
+            # bulk_create skips OrderItem.save(), so its derived fields are set here
+            items_of_order = []
+            for item in items:
+                primary_image = item.product.primary_image
+                items_of_order.append(OrderItem(
+                    order=order,
+                    product=item.product,
+                    title=item.product.name,
+                    product_name=item.product.name,
+                    photo=primary_image.image.name if primary_image else None,
+                    size=item.size,
+                    color=item.color,
+                    quantity=item.quantity,
+                    price=unit_prices[item.id],
+                    unit_price=unit_prices[item.id],
+                    total_price=line_totals[item.id],
+                ))
+            order_items.extend(items_of_order)
+            
+            # Serializers and notifications read the items without querying them
+            order._prefetched_objects_cache = {'items': items_of_order}
+            order_discounts[order.pk] = seller_discount
+            orders.append(order)
+        
+        OrderItem.objects.bulk_create(order_items)
+        OrderStatusHistory.objects.bulk_create([
+            OrderStatusHistory(order=order, new_status='pending', changed_by=request.user)
+            for order in orders
+        ])
+        
+        # Apply promo code usage tracking if promo was used
+        if promo_applied:
+            from apps.promos.utils import apply_promo_code
+            for order in orders:
+                apply_promo_code(promo_code, order, request.user, order_discounts[order.pk])
+        
+        for order in orders:
+            notify_sellers_about_new_order(order)
+            notify_customer_about_order(order)
+        
+        # Remove the ordered rows, leaving the rest of the cart
+        CartItem.objects.filter(id__in=[item.id for item in cart_items]).delete()
+        
+        # Last, so the stock rows stay locked for as short as possible
+        try:
+            decrement_stock(cart_items, user=request.user)
+        except InsufficientStock as e:
+            transaction.set_rollback(True)
+            return unavailable_items_response(e)
+        
+        return Response(
+            OrderSerializer(orders, many=True, context={'request': request}).data,
+            status=status.HTTP_201_CREATED
+        )
+
+
 class CreateQuickOrderView(APIView):
     """Create order for single product (from product detail page)"""
     permission_classes = [permissions.IsAuthenticated]
     
+    @idempotent
     @transaction.atomic
     def post(self, request):
         serializer = CreateQuickOrderSerializer(data=request.data)
         if serializer.is_valid():
             # Get product
             product = Product.objects.get(id=serializer.validated_data['product_id'])
-            
-            # Validate stock availability
             quantity = serializer.validated_data['quantity']
-            if quantity > product.stock_quantity:
-                return Response(
-                    {'error': f'Only {product.stock_quantity} items available'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
             
             # Calculate total price
             unit_price = product.discounted_price
@@ -493,10 +541,7 @@ class CreateQuickOrderView(APIView):
                 title=product.name
             )
             
-            # Update product stock
-            product.stock_quantity = F('stock_quantity') - quantity
-            product.sales_count = F('sales_count') + quantity
-            product.save()
+            Product.objects.filter(id=product.id).update(sales_count=F('sales_count') + quantity)
             
             # Apply promo code usage tracking if promo was used
             if promo_code and discount_amount > 0:
@@ -511,15 +556,23 @@ class CreateQuickOrderView(APIView):
             notify_sellers_about_new_order(order)
             notify_customer_about_order(order)
             
-            # Debug logging
-            print(f"DEBUG QUICK ORDER: Created order {order.id} - Status: {order.status}, Items: {order.items.count()}")
-            
-            # Serialize the order
-            serialized_data = OrderSerializer(order, context={'request': request}).data
-            print(f"DEBUG QUICK ORDER: Serialized data: {serialized_data}")
+            # Stock is checked and taken in one statement, last to keep its row locks short
+            try:
+                decrement_stock([StockLine(
+                    product.id,
+                    serializer.validated_data.get('size', ''),
+                    serializer.validated_data.get('color', ''),
+                    quantity
+                )], user=request.user)
+            except InsufficientStock as e:
+                transaction.set_rollback(True)
+                return Response(
+                    {'error': f'Only {e.available[0]} items available'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
             return Response(
-                serialized_data,
+                OrderSerializer(order, context={'request': request}).data,
                 status=status.HTTP_201_CREATED
             )
         
@@ -543,7 +596,7 @@ class SellerOrderListView(generics.ListAPIView):
         seller_product_ids = Product.objects.filter(seller=self.request.user.seller_profile).values_list('id', flat=True)
         return Order.objects.filter(
             items__product_id__in=seller_product_ids
-        ).distinct().prefetch_related('items')
+        ).distinct().select_related('seller__user').prefetch_related(order_items_prefetch())
 
 
 @api_view(['GET'])
@@ -554,7 +607,9 @@ def seller_order_detail(request, order_id):
         return Response({'error': 'User is not a seller'}, status=400)
     
     try:
-        order = Order.objects.get(id=order_id)
+        order = Order.objects.select_related('seller__user').prefetch_related(
+            order_items_prefetch()
+        ).get(id=order_id)
         
         # Check if seller has products in this order
         from apps.products.models import Product
@@ -1,10 +1,13 @@
 from django.contrib import admin
 from django.utils.html import format_html
+from django.db import transaction
 from django.db.models import Count, Avg, Q
 from .models import (
     Category, Collection, Product, ProductImage, ProductVariant,
-    ProductAttributeType, ProductAttribute, ProductVariantAttribute, ProductVideo, ProductOffer
+    ProductAttributeType, ProductAttribute, ProductVariantAttribute, ProductVideo, ProductOffer,
+    ProductImportJob, StockReservation, TagUsage
 )
+from .tasks import run_product_import_task
 
 
 @admin.register(Category)
@@ -83,7 +86,7 @@ class ProductAdmin(admin.ModelAdmin):
     """Comprehensive product management"""
     
     list_display = [
-        'name', 'seller_name', 'category', 'status_badge', 'price', 
+        'name', 'seller_name', 'category', 'status_badge', 'price', 'effective_price',
         'stock_quantity', 'rating', 'sales_count', 'is_featured', 'created_at'
     ]
     list_filter = [
@@ -91,14 +94,17 @@ class ProductAdmin(admin.ModelAdmin):
         ('seller', admin.RelatedOnlyFieldListFilter),
     ]
     search_fields = ['name', 'description', 'seller__business_name']
-    readonly_fields = ['views_count', 'sales_count', 'rating', 'review_count', 'created_at', 'updated_at']
+    readonly_fields = [
+        'effective_price', 'current_offer', 'reserved_quantity', 'views_count', 'sales_count', 'rating', 'review_count',
+        'created_at', 'updated_at'
+    ]
     
     fieldsets = (
         ('Basic Information', {
             'fields': ('seller', 'name', 'slug', 'description', 'short_description')
         }),
         ('Pricing', {
-            'fields': ('price', 'base_price', 'compare_price', 'cost_price')
+            'fields': ('price', 'base_price', 'compare_price', 'cost_price', 'effective_price', 'current_offer')
         }),
         ('Categorization', {
             'fields': ('category', 'collection', 'tags')
@@ -116,7 +122,7 @@ class ProductAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Inventory', {
-            'fields': ('track_inventory', 'stock_quantity', 'low_stock_threshold')
+            'fields': ('track_inventory', 'stock_quantity', 'reserved_quantity', 'low_stock_threshold')
         }),
         ('Shipping', {
             'fields': ('requires_shipping', 'weight', 'shipping_days_min', 'shipping_days_max'),
@@ -162,12 +168,16 @@ class ProductAdmin(admin.ModelAdmin):
     seller_name.short_description = 'Seller'
     
     def activate_products(self, request, queryset):
+        product_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(status='active')
+        TagUsage.refresh_for_products(product_ids)
         self.message_user(request, f'{updated} products activated.')
     activate_products.short_description = "Activate selected products"
     
     def deactivate_products(self, request, queryset):
+        product_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(status='inactive')
+        TagUsage.refresh_for_products(product_ids)
         self.message_user(request, f'{updated} products deactivated.')
     deactivate_products.short_description = "Deactivate selected products"
     
@@ -209,7 +219,9 @@ class ProductImageAdmin(admin.ModelAdmin):
 class ProductVariantAdmin(admin.ModelAdmin):
     """Product variant management"""
     
-    list_display = ['product_name', 'sku', 'size', 'color', 'price', 'stock_quantity', 'is_active']
+    list_display = [
+        'product_name', 'sku', 'size', 'color', 'price', 'stock_quantity', 'reserved_quantity', 'is_active'
+    ]
     list_filter = ['is_active', 'size', 'color', 'product__category']
     search_fields = ['product__name', 'sku', 'size', 'color']
     raw_id_fields = ['product']
@@ -219,6 +231,20 @@ class ProductVariantAdmin(admin.ModelAdmin):
     product_name.short_description = 'Product'
 
 
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    """Checkout stock holds; deleting one gives its units back"""
+    
+    list_display = ['product', 'variant', 'user', 'quantity', 'expires_at', 'created_at']
+    list_filter = ['expires_at']
+    search_fields = ['product__name', 'user__email']
+    raw_id_fields = ['user', 'product', 'variant']
+    readonly_fields = ['user', 'product', 'variant', 'quantity', 'expires_at', 'created_at']
+    
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(ProductAttributeType)
 class ProductAttributeTypeAdmin(admin.ModelAdmin):
     """Product attribute type management"""
@@ -313,3 +339,41 @@ class ProductOfferAdmin(admin.ModelAdmin):
         return obj.is_active
     is_active.boolean = True
     is_active.short_description = "Currently Active"
+
+
+@admin.register(ProductImportJob)
+class ProductImportJobAdmin(admin.ModelAdmin):
+    """Bulk product import management"""
+    
+    list_display = ['id', 'seller', 'file_format', 'status', 'progress', 'created_count', 'error_count', 'created_at']
+    list_filter = ['status', 'file_format', 'created_at']
+    search_fields = ['seller__business_name']
+    raw_id_fields = ['seller', 'created_by']
+    readonly_fields = [
+        'file_format', 'status', 'total_rows', 'processed_rows', 'created_count', 'error_count',
+        'errors', 'started_at', 'finished_at', 'created_by', 'created_at', 'updated_at'
+    ]
+    
+    actions = ['run_imports']
+    
+    def progress(self, obj):
+        return f"{obj.progress}%"
+    progress.short_description = 'Progress'
+    
+    def save_model(self, request, obj, form, change):
+        queue_import = not change or 'file' in form.changed_data
+        if queue_import:
+            obj.created_by = obj.created_by or request.user
+            obj.file_format = 'xlsx' if obj.file.name.lower().endswith('.xlsx') else 'csv'
+            obj.status = 'pending'
+        super().save_model(request, obj, form, change)
+        if queue_import:
+            transaction.on_commit(lambda: run_product_import_task.delay(obj.pk))
+    
+    def run_imports(self, request, queryset):
+        job_ids = list(queryset.exclude(status='running').values_list('id', flat=True))
+        queryset.filter(id__in=job_ids).update(status='pending')
+        for job_id in job_ids:
+            transaction.on_commit(lambda job_id=job_id: run_product_import_task.delay(job_id))
+        self.message_user(request, f'{len(job_ids)} imports queued.')
+    run_imports.short_description = "Run selected imports"
@@ -0,0 +1,183 @@
+from django.db import transaction
+from django.db.models.fields.json import KeyTransform
+from django.db.models.functions import JSONObject
+from django.utils import timezone
+
+from .models import Product, ProductCard
+from .renditions import absolute_srcset
+from .serializers import ProductListSerializer, sparse_fields_from_request, sparse_queryset
+
+
+CARD_BATCH_SIZE = 500
+
+# Columns rewritten when an existing card is refreshed
+CARD_FIELDS = [
+    'seller', 'category', 'is_featured', 'price', 'rating', 'sales_count',
+    'created_at', 'offer_ends_at', 'payload', 'refreshed_at'
+]
+
+# Payload keys rewritten when a card's offer has ended
+CARD_OFFER_FIELDS = {'discounted_price', 'has_active_offer', 'savings_amount'}
+
+
+def card_products():
+    """Products with everything ProductListSerializer reads preloaded"""
+    return Product.objects.select_related(
+        'seller', 'category', 'collection'
+    ).prefetch_related('tags').with_primary_image().with_active_offer()
+
+
+def build_product_card(product, now):
+    # Serialized without a request, so image and logo URLs stay relative
+    active_offer = product.active_offer
+    return ProductCard(
+        product_id=product.id,
+        seller_id=product.seller_id,
+        category_id=product.category_id,
+        is_featured=product.is_featured,
+        price=product.price,
+        rating=product.rating,
+        sales_count=product.sales_count,
+        created_at=product.created_at,
+        offer_ends_at=active_offer.end_date if active_offer else None,
+        payload=ProductListSerializer(product).data,
+        refreshed_at=now
+    )
+
+
+def refresh_product_cards(product_ids=None, batch_size=CARD_BATCH_SIZE):
+    """Rebuild the cards of the given products (all by default); products that are not active lose theirs"""
+    if product_ids is None:
+        product_ids = Product.objects.values_list('id', flat=True)
+    product_ids = list(set(product_ids))
+    
+    refreshed = 0
+    for start in range(0, len(product_ids), batch_size):
+        batch = product_ids[start:start + batch_size]
+        now = timezone.now()
+        cards = [
+            build_product_card(product, now)
+            for product in card_products().filter(id__in=batch, status='active')
+        ]
+        with transaction.atomic():
+            ProductCard.objects.bulk_create(
+                cards,
+                update_conflicts=True,
+                unique_fields=['product'],
+                update_fields=CARD_FIELDS
+            )
+            ProductCard.objects.filter(product_id__in=batch).exclude(
+                product_id__in=[card.product_id for card in cards]
+            ).delete()
+        refreshed += len(cards)
+    return refreshed
+
+
+def queue_product_card_refresh(product_ids, in_background=False):
+    """
+    Refresh cards once the current transaction commits.
+    
+    Changes fanning out to many products (a seller, category or tag) are
+    handed to Celery with `in_background`; a failed refresh never fails the write.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    
+    if in_background:
+        from .tasks import refresh_product_cards_task
+        transaction.on_commit(lambda: refresh_product_cards_task.delay(product_ids), robust=True)
+    else:
+        transaction.on_commit(lambda: refresh_product_cards(product_ids), robust=True)
+
+
+def requested_card_fields(request):
+    """
+    Validated `fields` and `expand` of a request for product card data, as
+    (names of the fields to return, expansions); (None, None) for full cards.
+    """
+    fields, expand = sparse_fields_from_request(request)
+    if not (fields or expand):
+        return None, None
+    return list(ProductListSerializer(fields=fields, expand=expand).fields), expand
+
+
+def project_card_payloads(cards, fields):
+    """Read only the requested keys of card payloads, into `sparse_payload`"""
+    keys = set(fields)
+    if keys & CARD_OFFER_FIELDS:
+        # Needed to drop offers that ended since the card was built
+        keys.add('original_price')
+    return cards.only('product_id', 'offer_ends_at').annotate(
+        sparse_payload=JSONObject(**{key: KeyTransform(key, 'payload') for key in keys})
+    )
+
+
+def represent_product_card(card, request=None, now=None, fields=None):
+    """ProductListSerializer output of a card, with absolute URLs and expired offers dropped"""
+    data = card.sparse_payload if fields else card.payload
+    now = now or timezone.now()
+    
+    if card.offer_ends_at and card.offer_ends_at < now and 'original_price' in data:
+        data.update(
+            discounted_price=data['original_price'],
+            has_active_offer=False,
+            savings_amount=0
+        )
+    
+    if request:
+        if data.get('image'):
+            data['image'] = request.build_absolute_uri(data['image'])
+        if data.get('image_srcset'):
+            data['image_srcset'] = absolute_srcset(data['image_srcset'], request)
+        store = data.get('store')
+        if store and store.get('logo'):
+            store['logo'] = request.build_absolute_uri(store['logo'])
+    
+    if fields:
+        return {name: data.get(name) for name in fields}
+    return data
+
+
+def represent_product_cards(cards, request=None):
+    now = timezone.now()
+    return [represent_product_card(card, request, now) for card in cards]
+
+
+def product_card_map(products, request=None, fields=None, expand=None):
+    """
+    Card data of products (instances or IDs) keyed by ID, read in one query.
+    
+    Products without a card (not active, or not refreshed yet) are serialized
+    from the product tables instead. `fields` and `expand` (see
+    requested_card_fields()) trim the data; cards only hold the default
+    fields, so expanded data is always serialized.
+    """
+    product_ids = [getattr(product, 'pk', product) for product in products]
+    now = timezone.now()
+    data = {}
+    
+    if not expand:
+        cards = ProductCard.objects.filter(product_id__in=product_ids)
+        if fields:
+            cards = project_card_payloads(cards, fields)
+        data = {card.product_id: represent_product_card(card, request, now, fields) for card in cards}
+    
+    missing_ids = [product_id for product_id in product_ids if product_id not in data]
+    if missing_ids:
+        products = sparse_queryset(
+            card_products(), ProductListSerializer(fields=fields, expand=expand)
+        ).filter(id__in=missing_ids)
+        serializer = ProductListSerializer(
+            products, many=True, context={'request': request}, fields=fields, expand=expand
+        )
+        data.update((product['id'], product) for product in serializer.data)
+    return data
+
+
+def serialize_product_cards(products, request=None, fields=None, expand=None):
+    """Card data of products (instances or IDs), in the given order"""
+    products = list(products)
+    data = product_card_map(products, request, fields, expand)
+    product_ids = [getattr(product, 'pk', product) for product in products]
+    return [data[product_id] for product_id in product_ids if product_id in data]
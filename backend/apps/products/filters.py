@@ -1,20 +1,84 @@
 import django_filters
+from django.db.models import F, Q
+from rest_framework.filters import OrderingFilter
 from .models import Product, Category
 
 
 class ProductFilter(django_filters.FilterSet):
     """Filter for products with price range, category, and status"""
     
-    min_price = django_filters.NumberFilter(field_name='base_price', lookup_expr='gte')
-    max_price = django_filters.NumberFilter(field_name='base_price', lookup_expr='lte')
-    category = django_filters.ModelChoiceFilter(queryset=Category.objects.all())
+    # On what shoppers pay, offers included
+    min_price = django_filters.NumberFilter(field_name='effective_price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='effective_price', lookup_expr='lte')
+    # Slug or ID; subcategories are included
+    category = django_filters.CharFilter(method='filter_category')
     in_stock = django_filters.BooleanFilter(method='filter_in_stock')
+    # Comma separated values; a product matches if it has any of them
+    size = django_filters.CharFilter(method='filter_size')
+    color = django_filters.CharFilter(method='filter_color')
+    # Comma separated `attribute:value` pairs, e.g. `sleeve:full sleeve,fit:slim`.
+    # Values of the same attribute are alternatives, different attributes must all match.
+    attributes = django_filters.CharFilter(method='filter_attributes')
     
     class Meta:
         model = Product
         fields = ['category', 'seller', 'status', 'is_featured']
     
+    def filter_category(self, queryset, name, value):
+        """Products of a category and of all categories below it, by materialized path"""
+        lookup = Q(slug=value) | Q(pk=value) if value.isdigit() else Q(slug=value)
+        path = Category.objects.filter(lookup).values_list('path', flat=True).first()
+        if path is None:
+            return queryset.none()
+        return queryset.filter(category__path__startswith=path)
+    
     def filter_in_stock(self, queryset, name, value):
         if value:
-            return queryset.filter(stock_quantity__gt=0)
-        return queryset 
\ No newline at end of file
+            # Like Product.is_in_stock, stock held at checkout does not count
+            return queryset.filter(stock_quantity__gt=F('reserved_quantity'))
+        return queryset
+    
+    def filter_size(self, queryset, name, value):
+        return queryset.filter(self.attribute_values_q('size', value.split(',')))
+    
+    def filter_color(self, queryset, name, value):
+        return queryset.filter(self.attribute_values_q('color', value.split(',')))
+    
+    def filter_attributes(self, queryset, name, value):
+        values_by_attribute = {}
+        for pair in value.split(','):
+            attribute, _, attribute_value = pair.partition(':')
+            if attribute.strip() and attribute_value.strip():
+                values_by_attribute.setdefault(attribute.strip().lower(), []).append(attribute_value)
+        
+        for attribute, values in values_by_attribute.items():
+            queryset = queryset.filter(self.attribute_values_q(attribute, values))
+        return queryset
+    
+    @staticmethod
+    def attribute_values_q(attribute, values):
+        """JSONB containment on the GIN-indexed attributes_doc for any of the values"""
+        condition = Q()
+        for value in values:
+            value = value.strip().lower()
+            if value:
+                condition |= Q(attributes_doc__contains={attribute: [value]})
+        return condition
+
+
+class ProductOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter sorting public field names by the columns in the view's
+    `ordering_aliases`, e.g. `?ordering=price` by Product.effective_price.
+    """
+    
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        aliases = getattr(view, 'ordering_aliases', {})
+        if not ordering or not aliases:
+            return ordering
+        return [
+            ('-' if term.startswith('-') else '') + aliases.get(term.lstrip('-'), term.lstrip('-'))
+            if isinstance(term, str) else term
+            for term in ordering
+        ]
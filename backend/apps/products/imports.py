@@ -0,0 +1,325 @@
+import csv
+import io
+import ipaddress
+import logging
+import os
+import socket
+from itertools import islice
+from urllib.parse import urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+import tablib
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from PIL import Image
+from taggit.models import Tag, TaggedItem
+
+from justclothing.cache import invalidate_namespaces
+from .models import (
+    Product, ProductImage, ProductImportJob, ProductVariant, SearchSuggestion, TagUsage, refresh_attributes_docs
+)
+from .resources import IMPORT_BATCH_SIZE, ProductImportResource
+
+
+logger = logging.getLogger(__name__)
+
+# Row errors kept on the job; the count keeps going past it
+MAX_REPORTED_ERRORS = 200
+IMAGE_DOWNLOAD_TIMEOUT = 15
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+MAX_IMAGE_REDIRECTS = 3
+
+
+def iter_import_rows(job):
+    """Stream the rows of an import file from storage as (line number, cells), skipping empty rows"""
+    with job.file.open('rb') as import_file:
+        if job.file_format == 'xlsx':
+            from openpyxl import load_workbook
+            workbook = load_workbook(import_file, read_only=True, data_only=True)
+            try:
+                rows = workbook.active.iter_rows(values_only=True)
+                for line, values in enumerate(rows, start=1):
+                    if any(value not in (None, '') for value in values):
+                        yield line, list(values)
+            finally:
+                workbook.close()
+        else:
+            text = io.TextIOWrapper(import_file, encoding='utf-8-sig', newline='')
+            for line, values in enumerate(csv.reader(text), start=1):
+                if any(value.strip() for value in values):
+                    yield line, values
+
+
+def tag_products(tags_by_product):
+    """Link tags by name to products in bulk, creating missing tags"""
+    names = {name for tag_names in tags_by_product.values() for name in tag_names}
+    if not names:
+        return
+    
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = names - tags.keys()
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=Tag().slugify(name)) for name in missing],
+            ignore_conflicts=True
+        )
+        tags.update((tag.name, tag) for tag in Tag.objects.filter(name__in=missing))
+        # Slug taken by a differently named tag: let taggit pick a free one
+        for name in missing - tags.keys():
+            tags[name] = Tag.objects.create(name=name)
+    
+    content_type = ContentType.objects.get_for_model(Product)
+    TaggedItem.objects.bulk_create(
+        [
+            TaggedItem(content_type=content_type, object_id=product_id, tag=tags[name])
+            for product_id, tag_names in tags_by_product.items()
+            for name in dict.fromkeys(tag_names)
+        ],
+        ignore_conflicts=True
+    )
+    
+    usage_counts = dict(
+        TaggedItem.objects.filter(tag__in=tags.values()).values('tag_id').annotate(
+            count=Count('id')
+        ).values_list('tag_id', 'count')
+    )
+    SearchSuggestion.bulk_sync('tag', [(tag.id, tag.name, usage_counts.get(tag.id, 0)) for tag in tags.values()])
+    TagUsage.refresh([tag.id for tag in tags.values()])
+
+
+def save_import_relations(products):
+    """
+    Write what signal handlers would have for products created with bulk_create:
+    variants, tags, attribute documents and suggestions; listing cards and image
+    downloads follow once the batch is committed.
+    """
+    product_ids = [product.pk for product in products]
+    
+    variants = []
+    for product in products:
+        for variant in product.import_variants:
+            variant.product = product
+            variants.append(variant)
+    ProductVariant.objects.bulk_create(variants)
+    
+    tag_products({product.pk: product.import_tags for product in products if product.import_tags})
+    refresh_attributes_docs(product_ids)
+    SearchSuggestion.bulk_sync('product', [
+        (product.pk, product.name, product.sales_count) for product in products if product.status == 'active'
+    ])
+    invalidate_namespaces('products', 'tags')
+    
+    image_urls = [(product.pk, product.import_image_urls) for product in products if product.import_image_urls]
+    
+    def follow_up():
+        from .cards import refresh_product_cards
+        from .tasks import fetch_product_images_task
+        refresh_product_cards(product_ids)
+        for product_id, urls in image_urls:
+            fetch_product_images_task.delay(product_id, urls)
+    
+    transaction.on_commit(follow_up, robust=True)
+
+
+def update_job(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+    ProductImportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now(), **fields)
+
+
+def collect_row_errors(result, lines):
+    """Row errors of an import_export result as {"row": <file line>, "errors": {...}} entries"""
+    errors = [
+        {'row': lines[invalid_row.number - 1], 'errors': invalid_row.error_dict}
+        for invalid_row in result.invalid_rows
+    ]
+    errors.extend(
+        {'row': lines[number - 1], 'errors': {'__all__': [str(error.error) for error in row_errors]}}
+        for number, row_errors in result.row_errors()
+    )
+    errors.extend({'row': None, 'errors': {'__all__': [str(error.error)]}} for error in result.base_errors)
+    return errors
+
+
+def import_chunk(resource, dataset, lines):
+    """Import one chunk; returns (created count, row errors)"""
+    result = resource.import_data(dataset, use_transactions=True)
+    
+    if result.has_errors():
+        # Unexpected errors roll the whole chunk back (e.g. a slug taken by a
+        # concurrent insert), so it is retried once before giving up on it
+        result = resource.import_data(dataset, use_transactions=True)
+    if result.has_errors():
+        errors = collect_row_errors(result, lines)
+        errors.append({
+            'row': None,
+            'errors': {'__all__': [f'Rows {lines[0]}-{lines[-1]} were not imported.']}
+        })
+        return 0, errors
+    return result.totals['new'], collect_row_errors(result, lines)
+
+
+def run_product_import(job_id, chunk_size=IMPORT_BATCH_SIZE):
+    """Stream an import file through ProductImportResource chunk by chunk, reporting progress"""
+    job = ProductImportJob.objects.select_related('seller').get(pk=job_id)
+    update_job(
+        job,
+        status='running',
+        started_at=timezone.now(),
+        finished_at=None,
+        total_rows=None,
+        processed_rows=0,
+        created_count=0,
+        error_count=0,
+        errors=[]
+    )
+    
+    try:
+        # A first cheap pass gives the total used to report progress
+        total_rows = max(sum(1 for _ in iter_import_rows(job)) - 1, 0)
+        update_job(job, total_rows=total_rows)
+        
+        rows = iter_import_rows(job)
+        _, header_cells = next(rows, (None, []))
+        headers = [str(cell or '').strip().lower() for cell in header_cells]
+        if 'name' not in headers or 'price' not in headers:
+            raise ValueError('The file needs a header row with at least "name" and "price" columns.')
+        
+        resource = ProductImportResource(job.seller)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            
+            lines = [line for line, _ in chunk]
+            # Pad or cut rows to the header width, as tablib requires
+            dataset = tablib.Dataset(
+                *[tuple((values + [None] * len(headers))[:len(headers)]) for _, values in chunk],
+                headers=headers
+            )
+            created, errors = import_chunk(resource, dataset, lines)
+            
+            update_job(
+                job,
+                processed_rows=job.processed_rows + len(chunk),
+                created_count=job.created_count + created,
+                error_count=job.error_count + len(errors),
+                errors=(job.errors + errors)[:MAX_REPORTED_ERRORS]
+            )
+    except Exception as e:
+        logger.exception('Product import %s failed', job.pk)
+        update_job(
+            job,
+            status='failed',
+            finished_at=timezone.now(),
+            errors=(job.errors + [{'row': None, 'errors': {'__all__': [str(e)]}}])[:MAX_REPORTED_ERRORS]
+        )
+        return job.created_count
+    
+    update_job(job, status='completed', finished_at=timezone.now())
+    return job.created_count
+
+
+def public_address(url):
+    """
+    The address to fetch an http(s) URL from, if its host only resolves to
+    public addresses, so sellers cannot reach internal services; else None
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return None
+    try:
+        addresses = socket.getaddrinfo(parsed.hostname, parsed.port or None)
+    except (socket.gaierror, UnicodeError, ValueError):
+        return None
+    if not addresses or not all(ipaddress.ip_address(address[4][0]).is_global for address in addresses):
+        return None
+    return addresses[0][4][0]
+
+
+class PinnedAddressAdapter(HTTPAdapter):
+    """
+    Connects to an address checked beforehand rather than resolving the host
+    name again, which could give another (e.g. rebound, internal) address.
+    TLS still checks the certificate against the host name.
+    """
+    
+    def __init__(self, hostname, **kwargs):
+        self.hostname = hostname
+        super().__init__(**kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        # Ignored by plain http pools
+        kwargs['server_hostname'] = self.hostname
+        kwargs['assert_hostname'] = self.hostname
+        super().init_poolmanager(*args, **kwargs)
+
+
+def pinned_get(url, address):
+    """Stream a GET of `url` from `address`, without following redirects"""
+    parsed = urlparse(url)
+    host = f'[{address}]' if ':' in address else address
+    netloc = f'{host}:{parsed.port}' if parsed.port else host
+    session = requests.Session()
+    # Proxies would resolve the name themselves
+    session.trust_env = False
+    session.mount(f'{parsed.scheme}://', PinnedAddressAdapter(parsed.hostname))
+    response = session.get(
+        parsed._replace(netloc=netloc).geturl(),
+        headers={'Host': parsed.netloc.rpartition('@')[2]},
+        timeout=IMAGE_DOWNLOAD_TIMEOUT,
+        stream=True,
+        allow_redirects=False
+    )
+    return session, response
+
+
+def download_image(url):
+    """Fetch an image, checking the address of the URL and of every redirect before connecting"""
+    for _ in range(MAX_IMAGE_REDIRECTS + 1):
+        address = public_address(url)
+        if address is None:
+            raise ValueError('URL is not a public http(s) address')
+        
+        session, response = pinned_get(url, address)
+        with session, response:
+            if response.is_redirect:
+                url = urljoin(url, response.headers['Location'])
+                continue
+            response.raise_for_status()
+            content = response.raw.read(MAX_IMAGE_BYTES + 1, decode_content=True)
+        if len(content) > MAX_IMAGE_BYTES:
+            raise ValueError('Image is too large')
+        
+        Image.open(io.BytesIO(content)).verify()
+        return content
+    raise ValueError('Too many redirects')
+
+
+def fetch_product_images(product_id, urls):
+    """Download the images of an imported product; the first one becomes primary"""
+    if not Product.objects.filter(pk=product_id).exists():
+        return 0
+    
+    has_primary = ProductImage.objects.filter(product_id=product_id, is_primary=True).exists()
+    saved = 0
+    for sort_order, url in enumerate(urls):
+        try:
+            content = download_image(url)
+        except Exception as e:
+            logger.warning('Could not fetch image %s of product %s: %s', url, product_id, e)
+            continue
+        
+        name = os.path.basename(urlparse(url).path) or f'product-{product_id}.jpg'
+        ProductImage.objects.create(
+            product_id=product_id,
+            image=ContentFile(content, name=name),
+            is_primary=not has_primary and saved == 0,
+            sort_order=sort_order
+        )
+        saved += 1
+    return saved
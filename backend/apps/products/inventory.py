@@ -0,0 +1,336 @@
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Product, ProductVariant, StockReservation
+
+
+# How long checkout holds stock before the sweeper hands it back
+RESERVATION_TTL = timedelta(minutes=15)
+
+# A quantity of a product in a size and color; cart items have the same attributes
+StockLine = namedtuple('StockLine', ['product_id', 'size', 'color', 'quantity'])
+
+# Every row is updated only if its stock, less what other shoppers hold, still
+# covers the requested quantity, so concurrent checkouts cannot oversell; rows
+# that could not are left out of RETURNING. `held` is what the requesting
+# shopper holds of the row themselves. Row locks are held from here until the
+# transaction ends.
+GUARDED_UPDATE_SQL = """
+UPDATE {table} SET {assignments}, updated_at = %s
+  FROM (VALUES {values}) AS requested (id, quantity, held)
+ WHERE {table}.id = requested.id
+   AND {table}.stock_quantity - {table}.reserved_quantity + requested.held >= requested.quantity{condition}
+RETURNING {table}.id
+"""
+
+# Orders take their units off stock, along with the units held for them
+DECREMENT = (
+    'stock_quantity = {table}.stock_quantity - requested.quantity, '
+    'reserved_quantity = GREATEST({table}.reserved_quantity - requested.held, 0)'
+)
+RESERVE = 'reserved_quantity = {table}.reserved_quantity + requested.quantity'
+
+GIVE_BACK_SQL = """
+UPDATE {table} SET reserved_quantity = GREATEST({table}.reserved_quantity - held.quantity, 0), updated_at = %s
+  FROM (VALUES {values}) AS held (id, quantity)
+ WHERE {table}.id = held.id
+"""
+
+TRACKED_VARIANT_CONDITION = (
+    ' AND EXISTS (SELECT 1 FROM %s product WHERE product.id = {table}.product_id AND product.track_inventory)'
+    % connection.ops.quote_name(Product._meta.db_table)
+)
+
+DELETE_RESERVATIONS_SQL = """
+DELETE FROM {table} WHERE {condition} RETURNING product_id, variant_id, quantity
+"""
+
+
+class InsufficientStock(Exception):
+    """
+    Raised by decrement_stock() and reserve_stock() when some lines are not covered.
+    
+    `lines` are the lines whose product or variant ran short, and `available`
+    the quantity each of them could still get.
+    """
+    
+    def __init__(self, lines, available):
+        super().__init__(f'Not enough stock for {len(lines)} line(s)')
+        self.lines = lines
+        self.available = available
+
+
+def guarded_update(model, requests, assignments, condition=''):
+    """
+    Apply `assignments` to the rows of `model` ({id: (quantity, held)}) that
+    cover their quantity, in one UPDATE; returns the IDs updated
+    """
+    if not requests:
+        return set()
+    
+    table = connection.ops.quote_name(model._meta.db_table)
+    rows = sorted(requests.items())
+    params = [timezone.now()]
+    for row_id, (quantity, held) in rows:
+        params.extend([row_id, quantity, held])
+    
+    with connection.cursor() as cursor:
+        cursor.execute(
+            GUARDED_UPDATE_SQL.format(
+                table=table,
+                assignments=assignments.format(table=table),
+                values=', '.join(['(%s::integer, %s::integer, %s::integer)'] * len(rows)),
+                condition=condition.format(table=table)
+            ),
+            params
+        )
+        return {row_id for row_id, in cursor.fetchall()}
+
+
+def held_quantities(reservations):
+    """Sum (product ID, variant ID, quantity) rows into held quantities per product and per variant"""
+    products = defaultdict(int)
+    variants = defaultdict(int)
+    for product_id, variant_id, quantity in reservations:
+        if product_id:
+            products[product_id] += quantity
+        if variant_id:
+            variants[variant_id] += quantity
+    return products, variants
+
+
+def give_back(reservations):
+    """
+    Return the units of deleted reservations ((product ID, variant ID, quantity)
+    rows) to availability; listing cards are refreshed on commit
+    """
+    from .cards import queue_product_card_refresh
+    product_quantities, variant_quantities = held_quantities(reservations)
+    for model, quantities in ((Product, product_quantities), (ProductVariant, variant_quantities)):
+        if not quantities:
+            continue
+        table = connection.ops.quote_name(model._meta.db_table)
+        rows = sorted(quantities.items())
+        params = [timezone.now()]
+        for row_id, quantity in rows:
+            params.extend([row_id, quantity])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                GIVE_BACK_SQL.format(table=table, values=', '.join(['(%s::integer, %s::integer)'] * len(rows))),
+                params
+            )
+    queue_product_card_refresh(product_quantities)
+
+
+def delete_reservations(condition, params):
+    """Delete reservations matching an SQL condition; returns them as (product ID, variant ID, quantity) rows"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            DELETE_RESERVATIONS_SQL.format(
+                table=connection.ops.quote_name(StockReservation._meta.db_table),
+                condition=condition
+            ),
+            params
+        )
+        return cursor.fetchall()
+
+
+def line_variant_ids(lines):
+    """The active variant of each line (matched on size and color), or None, in one query"""
+    variant_ids = {
+        (product_id, size, color): variant_id
+        for variant_id, product_id, size, color in ProductVariant.objects.filter(
+            product_id__in={line.product_id for line in lines}, is_active=True
+        ).values_list('id', 'product_id', 'size', 'color')
+    }
+    return [variant_ids.get((line.product_id, line.size or '', line.color or '')) for line in lines]
+
+
+def basket_quantities(lines, line_variants):
+    """Sum the quantities of lines per product and per variant"""
+    products = defaultdict(int)
+    variants = defaultdict(int)
+    for line, variant_id in zip(lines, line_variants):
+        products[line.product_id] += line.quantity
+        if variant_id:
+            variants[variant_id] += line.quantity
+    return products, variants
+
+
+def update_basket(product_requests, variant_requests, assignments):
+    """
+    Guarded update of product then variant rows ({id: (quantity, held)});
+    returns the product and variant IDs that ran short. Products that do not
+    track inventory, and their variants, are left alone and never run short.
+    """
+    updated = guarded_update(Product, product_requests, assignments, condition=' AND {table}.track_inventory')
+    short_products = set(product_requests) - updated
+    if short_products:
+        short_products -= set(Product.objects.filter(
+            id__in=short_products, track_inventory=False
+        ).values_list('id', flat=True))
+    
+    # Variants count only for products that track inventory
+    updated = guarded_update(ProductVariant, variant_requests, assignments, condition=TRACKED_VARIANT_CONDITION)
+    short_variants = set(variant_requests) - updated
+    if short_variants:
+        short_variants -= set(ProductVariant.objects.filter(
+            id__in=short_variants, product__track_inventory=False
+        ).values_list('id', flat=True))
+    return short_products, short_variants
+
+
+def insufficient_stock(lines, line_variants, short_products, short_variants, held_products=None, held_variants=None):
+    """InsufficientStock for the lines of a basket whose product or variant ran short"""
+    failed = [
+        (line, variant_id) for line, variant_id in zip(lines, line_variants)
+        if line.product_id in short_products or variant_id in short_variants
+    ]
+    return InsufficientStock([line for line, _ in failed], available_stock(failed, held_products, held_variants))
+
+
+def reserve_stock(user, lines, ttl=RESERVATION_TTL):
+    """
+    Hold the quantities of `lines` for `user` until checkout completes or `ttl` passes.
+    
+    Holds the user already had are replaced, so starting checkout again never
+    stacks them. Holds are all or nothing: if any line is not covered by stock
+    less other shoppers' holds, nothing changes and InsufficientStock reports
+    the lines that ran short. Returns when the new holds expire.
+    """
+    lines = list(lines)
+    line_variants = line_variant_ids(lines)
+    product_quantities, variant_quantities = basket_quantities(lines, line_variants)
+    expires_at = timezone.now() + ttl
+    
+    with transaction.atomic():
+        released = delete_reservations('user_id = %s', [user.pk])
+        give_back(released)
+        short_products, short_variants = update_basket(
+            {product_id: (quantity, 0) for product_id, quantity in product_quantities.items()},
+            {variant_id: (quantity, 0) for variant_id, quantity in variant_quantities.items()},
+            RESERVE
+        )
+        if short_products or short_variants:
+            # Keep the previous holds too, up to this block's savepoint
+            transaction.set_rollback(True)
+        else:
+            StockReservation.objects.bulk_create([
+                StockReservation(
+                    user=user, product_id=line.product_id, variant_id=variant_id,
+                    quantity=line.quantity, expires_at=expires_at
+                )
+                for line, variant_id in zip(lines, line_variants)
+            ])
+    
+    if short_products or short_variants:
+        raise insufficient_stock(
+            lines, line_variants, short_products, short_variants, *held_quantities(released)
+        )
+    
+    # Cards show stock less holds
+    from .cards import queue_product_card_refresh
+    queue_product_card_refresh(product_quantities)
+    return expires_at
+
+
+def release_reservations(user):
+    """Drop every hold of `user`, e.g. when they leave checkout; returns how many there were"""
+    with transaction.atomic():
+        released = delete_reservations('user_id = %s', [user.pk])
+        give_back(released)
+    return len(released)
+
+
+def release_expired_reservations(now=None):
+    """Drop the holds past their expiry and return their units; returns how many there were"""
+    with transaction.atomic():
+        released = delete_reservations('expires_at <= %s', [now or timezone.now()])
+        give_back(released)
+    return len(released)
+
+
+def decrement_stock(lines, user=None):
+    """
+    Take the quantities of `lines` off product and variant stock, all or nothing.
+    
+    Lines of the same product or variant (matched on size and color) are
+    summed. Each table gets one guarded UPDATE for the whole basket. Products
+    that do not track inventory are left alone with their variants, like
+    variants of other sizes. When `user` is given, their checkout holds on the
+    ordered products are turned into the decrement: held units count as
+    available to them and stop being held, and holds on other variants of
+    those products are released. If any line is not covered, nothing
+    changes and InsufficientStock reports the lines that ran short. Listing
+    cards are refreshed on commit.
+    """
+    lines = list(lines)
+    line_variants = line_variant_ids(lines)
+    product_quantities, variant_quantities = basket_quantities(lines, line_variants)
+    held_products, held_variants = {}, {}
+    
+    with transaction.atomic():
+        if user is not None:
+            # Holds on products left out of the order stay, e.g. the rest of the cart during a quick order
+            released = delete_reservations('user_id = %s AND product_id = ANY(%s)', [user.pk, list(product_quantities)])
+            held_products, held_variants = held_quantities(released)
+            give_back(
+                (None, variant_id, quantity) for product_id, variant_id, quantity in released
+                if product_id in product_quantities and variant_id and variant_id not in variant_quantities
+            )
+        
+        short_products, short_variants = update_basket(
+            {
+                product_id: (quantity, held_products.get(product_id, 0))
+                for product_id, quantity in product_quantities.items()
+            },
+            {
+                variant_id: (quantity, held_variants.get(variant_id, 0))
+                for variant_id, quantity in variant_quantities.items()
+            },
+            DECREMENT
+        )
+        if short_products or short_variants:
+            # Undo the decrements that did go through, up to this block's savepoint
+            transaction.set_rollback(True)
+    
+    if short_products or short_variants:
+        raise insufficient_stock(
+            lines, line_variants, short_products, short_variants, held_products, held_variants
+        )
+    
+    from .cards import queue_product_card_refresh
+    queue_product_card_refresh(product_quantities)
+
+
+def available_stock(lines_with_variants, held_products=None, held_variants=None):
+    """
+    Quantities lines could still get: the stock of their product and variant
+    where the product tracks inventory, less what others hold (what the shopper holds,
+    per product and variant ID, is theirs to take)
+    """
+    held_products = held_products or {}
+    held_variants = held_variants or {}
+    products = {
+        product_id: stock - reserved + held_products.get(product_id, 0)
+        for product_id, stock, reserved in Product.objects.filter(
+            id__in={line.product_id for line, _ in lines_with_variants}, track_inventory=True
+        ).values_list('id', 'stock_quantity', 'reserved_quantity')
+    }
+    variants = {
+        variant_id: stock - reserved + held_variants.get(variant_id, 0)
+        for variant_id, stock, reserved in ProductVariant.objects.filter(
+            id__in={variant_id for _, variant_id in lines_with_variants if variant_id},
+            product__track_inventory=True
+        ).values_list('id', 'stock_quantity', 'reserved_quantity')
+    }
+    available = []
+    for line, variant_id in lines_with_variants:
+        quantities = [products[line.product_id]] if line.product_id in products else []
+        if variant_id in variants:
+            quantities.append(variants[variant_id])
+        available.append(max(min(quantities), 0) if quantities else 0)
+    return available
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from apps.products.models import ProductImage
+from apps.products.renditions import build_image_renditions
+from apps.products.tasks import generate_image_renditions_task
+
+
+class Command(BaseCommand):
+    help = 'Generate the responsive renditions of product images that have none or outdated ones'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Generate renditions in this process instead of queueing them for the image workers',
+        )
+    
+    def handle(self, *args, **options):
+        image_ids = [
+            image_id
+            for image_id, name, source in ProductImage.objects.exclude(image='').values_list(
+                'id', 'image', 'renditions__source'
+            ).iterator()
+            if source != name
+        ]
+        
+        for image_id in image_ids:
+            if options['sync']:
+                build_image_renditions(image_id)
+            else:
+                generate_image_renditions_task.delay(image_id)
+        
+        action = 'Generated' if options['sync'] else 'Queued'
+        self.stdout.write(
+            self.style.SUCCESS(f'{action} renditions for {len(image_ids)} product images')
+        )
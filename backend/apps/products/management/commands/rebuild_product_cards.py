@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from apps.products.cards import CARD_BATCH_SIZE, refresh_product_cards
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the listing card of every product in batches'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=CARD_BATCH_SIZE,
+            help='Number of products serialized per batch',
+        )
+    
+    def handle(self, *args, **options):
+        refreshed_count = refresh_product_cards(batch_size=options['batch_size'])
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt cards for {refreshed_count} active products')
+        )
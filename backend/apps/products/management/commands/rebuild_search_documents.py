@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+from apps.products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search document of every product in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of product IDs to refresh per UPDATE statement',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bounds = Product.objects.aggregate(first_id=Min('id'), last_id=Max('id'))
+        
+        if bounds['first_id'] is None:
+            self.stdout.write('No products to index')
+            return
+        
+        # Resetting the column fires the products trigger, which rebuilds the document
+        updated_count = 0
+        for start in range(bounds['first_id'], bounds['last_id'] + 1, batch_size):
+            updated_count += Product.objects.filter(
+                id__gte=start,
+                id__lt=start + batch_size
+            ).update(search_document=None)
+            self.stdout.write(f'Indexed products up to ID {start + batch_size - 1}')
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt search documents for {updated_count} products')
+        )
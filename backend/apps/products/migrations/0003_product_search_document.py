@@ -0,0 +1,151 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:41
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+# Product.search_document is kept up to date by triggers so that every write path
+# (model saves, queryset updates, tag changes, seller renames) refreshes it.
+# Any UPDATE that touches name, description, seller_id or search_document makes
+# the BEFORE trigger rebuild the document, so the other triggers (and the
+# rebuild_search_documents command) simply reset it to NULL.
+SEARCH_DOCUMENT_SQL = """
+CREATE OR REPLACE FUNCTION products_build_search_document(
+    p_id integer, p_name text, p_description text, p_seller_id integer
+) RETURNS tsvector AS $$
+    SELECT
+        setweight(to_tsvector(coalesce(p_name, '')), 'A') ||
+        setweight(to_tsvector(coalesce(p_description, '')), 'B') ||
+        setweight(to_tsvector(coalesce(
+            (SELECT business_name FROM seller_profiles WHERE id = p_seller_id), ''
+        )), 'C') ||
+        setweight(to_tsvector(coalesce(
+            (SELECT string_agg(tag.name, ' ')
+               FROM taggit_taggeditem item
+               JOIN taggit_tag tag ON tag.id = item.tag_id
+               JOIN django_content_type ct ON ct.id = item.content_type_id
+              WHERE item.object_id = p_id
+                AND ct.app_label = 'products' AND ct.model = 'product'), ''
+        )), 'D');
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION products_search_document_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.search_document := products_build_search_document(
+        NEW.id, NEW.name, NEW.description, NEW.seller_id
+    );
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER products_search_document_insert
+    BEFORE INSERT ON products
+    FOR EACH ROW EXECUTE FUNCTION products_search_document_trigger();
+
+CREATE TRIGGER products_search_document_update
+    BEFORE UPDATE OF name, description, seller_id, search_document ON products
+    FOR EACH ROW EXECUTE FUNCTION products_search_document_trigger();
+
+CREATE OR REPLACE FUNCTION taggit_taggeditem_search_document_trigger() RETURNS trigger AS $$
+DECLARE
+    item taggit_taggeditem%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        item := OLD;
+    ELSE
+        item := NEW;
+    END IF;
+    UPDATE products SET search_document = NULL
+     WHERE id = item.object_id
+       AND item.content_type_id = (
+           SELECT id FROM django_content_type
+            WHERE app_label = 'products' AND model = 'product'
+       );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER taggit_taggeditem_search_document
+    AFTER INSERT OR UPDATE OR DELETE ON taggit_taggeditem
+    FOR EACH ROW EXECUTE FUNCTION taggit_taggeditem_search_document_trigger();
+
+CREATE OR REPLACE FUNCTION taggit_tag_search_document_trigger() RETURNS trigger AS $$
+BEGIN
+    UPDATE products SET search_document = NULL
+      FROM taggit_taggeditem item
+      JOIN django_content_type ct ON ct.id = item.content_type_id
+     WHERE item.tag_id = NEW.id
+       AND item.object_id = products.id
+       AND ct.app_label = 'products' AND ct.model = 'product';
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER taggit_tag_search_document
+    AFTER UPDATE OF name ON taggit_tag
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION taggit_tag_search_document_trigger();
+
+CREATE OR REPLACE FUNCTION seller_profiles_search_document_trigger() RETURNS trigger AS $$
+BEGIN
+    UPDATE products SET search_document = NULL WHERE seller_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER seller_profiles_search_document
+    AFTER UPDATE OF business_name ON seller_profiles
+    FOR EACH ROW WHEN (OLD.business_name IS DISTINCT FROM NEW.business_name)
+    EXECUTE FUNCTION seller_profiles_search_document_trigger();
+
+-- Backfill existing products
+UPDATE products SET search_document = NULL;
+"""
+
+DROP_SEARCH_DOCUMENT_SQL = """
+DROP TRIGGER IF EXISTS seller_profiles_search_document ON seller_profiles;
+DROP TRIGGER IF EXISTS taggit_tag_search_document ON taggit_tag;
+DROP TRIGGER IF EXISTS taggit_taggeditem_search_document ON taggit_taggeditem;
+DROP TRIGGER IF EXISTS products_search_document_update ON products;
+DROP TRIGGER IF EXISTS products_search_document_insert ON products;
+DROP FUNCTION IF EXISTS seller_profiles_search_document_trigger();
+DROP FUNCTION IF EXISTS taggit_tag_search_document_trigger();
+DROP FUNCTION IF EXISTS taggit_taggeditem_search_document_trigger();
+DROP FUNCTION IF EXISTS products_search_document_trigger();
+DROP FUNCTION IF EXISTS products_build_search_document(integer, text, text, integer);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('products', '0002_initial'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        ('users', '0002_customerprofile_onboarding_completed_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='productoffer',
+            name='name',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='products_search_document_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='products_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunSQL(SEARCH_DOCUMENT_SQL, reverse_sql=DROP_SEARCH_DOCUMENT_SQL),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:45
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+# Seed the suggestion table from the existing catalog; afterwards it is kept in
+# sync by the signal handlers in apps.products.models.
+BACKFILL_SQL = """
+INSERT INTO search_suggestions (kind, object_id, label, term, weight, updated_at)
+SELECT 'product', id, name, lower(name), sales_count, now()
+  FROM products WHERE status = 'active' AND name <> ''
+UNION ALL
+SELECT 'category', id, name, lower(name), 0, now()
+  FROM categories WHERE is_active AND name <> ''
+UNION ALL
+SELECT 'seller', id, business_name, lower(business_name), 0, now()
+  FROM seller_profiles WHERE status = 'approved' AND business_name <> ''
+UNION ALL
+SELECT 'tag', tag.id, tag.name, lower(tag.name),
+       (SELECT count(*) FROM taggit_taggeditem item WHERE item.tag_id = tag.id), now()
+  FROM taggit_tag tag WHERE tag.name <> '';
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_search_document'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        ('users', '0002_customerprofile_onboarding_completed_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Product'), ('tag', 'Tag'), ('category', 'Category'), ('seller', 'Seller')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('label', models.CharField(max_length=255)),
+                ('term', models.CharField(max_length=255)),
+                ('weight', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'search_suggestions',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['term'], name='search_suggestions_term_trgm', opclasses=['gin_trgm_ops'])],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_suggestions_kind_object_unique')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:59
+
+import json
+from collections import defaultdict
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+# Frozen copies of the helpers in apps.products.models as of this migration, run
+# against historical models so later changes to the live code cannot alter it
+def normalize_attribute_values(value):
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+            value = parsed if isinstance(parsed, list) else value
+        except ValueError:
+            pass
+    values = value if isinstance(value, list) else [value]
+    return [str(item).strip().lower() for item in values if str(item).strip()]
+
+
+def attribute_doc_key(slug, input_type):
+    return input_type if input_type in ('size', 'color') else slug
+
+
+def backfill_attributes_docs(apps, schema_editor, batch_size=500):
+    Product = apps.get_model('products', 'Product')
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+    ProductAttribute = apps.get_model('products', 'ProductAttribute')
+    ProductVariantAttribute = apps.get_model('products', 'ProductVariantAttribute')
+
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    for start in range(0, len(product_ids), batch_size):
+        batch = product_ids[start:start + batch_size]
+        pairs = defaultdict(list)
+        
+        for product_id, sizes, colors in Product.objects.filter(id__in=batch).values_list(
+            'id', 'availableSizes', 'availableColors'
+        ):
+            pairs[product_id].append(('size', sizes or []))
+            pairs[product_id].append(('color', colors or []))
+        
+        for product_id, size, color in ProductVariant.objects.filter(
+            product_id__in=batch, is_active=True
+        ).values_list('product_id', 'size', 'color'):
+            pairs[product_id].extend([('size', size), ('color', color)])
+        
+        for product_id, slug, input_type, value in ProductAttribute.objects.filter(
+            product_id__in=batch
+        ).values_list('product_id', 'attribute_type__slug', 'attribute_type__input_type', 'value'):
+            pairs[product_id].append((attribute_doc_key(slug, input_type), value))
+        
+        for product_id, slug, input_type, value in ProductVariantAttribute.objects.filter(
+            variant__product_id__in=batch, variant__is_active=True
+        ).values_list('variant__product_id', 'attribute_type__slug', 'attribute_type__input_type', 'value'):
+            pairs[product_id].append((attribute_doc_key(slug, input_type), value))
+        
+        products = []
+        for product_id, product_pairs in pairs.items():
+            doc = {}
+            for key, value in product_pairs:
+                for item in normalize_attribute_values(value):
+                    if item not in doc.setdefault(key, []):
+                        doc[key].append(item)
+            products.append(Product(id=product_id, attributes_doc={key: items for key, items in doc.items() if items}))
+        Product.objects.bulk_update(products, ['attributes_doc'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_related_products'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        ('users', '0002_customerprofile_onboarding_completed_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='attributes_doc',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['attributes_doc'], name='products_attributes_doc_gin', opclasses=['jsonb_path_ops']),
+        ),
+        migrations.RunPython(backfill_attributes_docs, migrations.RunPython.noop),
+    ]
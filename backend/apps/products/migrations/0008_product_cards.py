@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:03
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Cards are built by `manage.py rebuild_product_cards` after deploying; until
+# then listing endpoints serialize products without a card from the product tables.
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_attributes_doc'),
+        ('users', '0002_customerprofile_onboarding_completed_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='products.product')),
+                ('is_featured', models.BooleanField(default=False)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('rating', models.DecimalField(decimal_places=2, default=0, max_digits=3)),
+                ('sales_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('offer_ends_at', models.DateTimeField(blank=True, null=True)),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('refreshed_at', models.DateTimeField()),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.category')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_cards', to='users.sellerprofile')),
+            ],
+            options={
+                'db_table': 'product_cards',
+                'indexes': [models.Index(fields=['seller', 'created_at'], name='product_cards_seller_created'), models.Index(fields=['category', 'created_at'], name='product_cards_category_created'), models.Index(fields=['is_featured', 'created_at'], name='product_cards_featured_created')],
+            },
+        ),
+    ]
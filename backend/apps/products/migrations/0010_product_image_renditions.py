@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:15
+
+from django.db import migrations, models
+
+
+# Renditions of existing images are made by `manage.py generate_image_renditions`
+# after deploying; until then serializers return a null srcset.
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_product_import_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:22
+
+from django.db import migrations, models
+
+
+# Paths of existing categories, walked down from the roots; afterwards
+# Category.save() maintains them.
+BACKFILL_SQL = """
+WITH RECURSIVE tree (id, path, depth) AS (
+    SELECT id, id || '/', 0 FROM categories WHERE parent_id IS NULL
+    UNION ALL
+    SELECT child.id, tree.path || child.id || '/', tree.depth + 1
+      FROM categories child JOIN tree ON child.parent_id = tree.id
+)
+UPDATE categories SET path = tree.path, depth = tree.depth
+  FROM tree WHERE categories.id = tree.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_product_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='categories_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Counts of the active products of every existing tag
+BACKFILL_SQL = """
+INSERT INTO tag_usage (tag_id, name, slug, product_count, updated_at)
+SELECT tag.id, tag.name, tag.slug, (
+    SELECT COUNT(*)
+      FROM taggit_taggeditem item
+      JOIN django_content_type content_type ON content_type.id = item.content_type_id
+      JOIN products product ON product.id = item.object_id
+     WHERE item.tag_id = tag.id
+       AND content_type.app_label = 'products' AND content_type.model = 'product'
+       AND product.status = 'active'
+), NOW()
+  FROM taggit_tag tag;
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_category_paths'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagUsage',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='taggit.tag')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100)),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'tag_usage',
+                'indexes': [models.Index(models.OrderBy(models.F('product_count'), descending=True), models.F('name'), name='tag_usage_ranking_idx')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Offers already past their end are expired, then every product gets its price
+# under its newest live offer (see apps.products.offers.offer_price)
+BACKFILL_SQL = """
+UPDATE product_offers SET status = 'expired' WHERE status = 'active' AND end_date < NOW();
+
+UPDATE products SET effective_price = price;
+
+UPDATE products SET
+    current_offer_id = offer.id,
+    effective_price = CASE
+        WHEN offer.offer_type = 'percentage' AND offer.discount_percentage > 0
+            THEN ROUND(products.price * (100 - offer.discount_percentage) / 100, 2)
+        WHEN offer.offer_type = 'flat' AND offer.discount_amount > 0
+            THEN GREATEST(products.price - offer.discount_amount, 0)
+        ELSE products.price
+    END
+  FROM (
+    SELECT DISTINCT ON (product_id) *
+      FROM product_offers
+     WHERE status = 'active' AND start_date <= NOW() AND end_date >= NOW()
+     ORDER BY product_id, created_at DESC
+  ) offer
+ WHERE offer.product_id = products.id;
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_tag_usage'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        ('users', '0002_customerprofile_onboarding_completed_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='products_status_price_id',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='current_offer',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.productoffer'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'effective_price', 'id'], name='products_status_eff_price_id'),
+        ),
+    ]
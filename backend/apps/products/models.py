@@ -1,11 +1,24 @@
-from django.db import models
+from django.db import models, transaction
+from collections import defaultdict
+from django.db.models import Prefetch, Q, F, Case, When, Value, Window, Count
+from django.db.models.functions import Concat, RowNumber, Substr
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField, TrigramSimilarity
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
 from taggit.managers import TaggableManager
+from taggit.models import Tag, TaggedItem
+from justclothing.cache import invalidate_namespaces
 from djmoney.models.fields import MoneyField
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 import json
+import re
 
 User = get_user_model()
 
@@ -46,6 +59,11 @@ class Category(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Materialized path: IDs from the root down to this category, e.g. "3/17/42/".
+    # A subtree is every category whose path starts with its root's path.
+    path = models.CharField(max_length=255, blank=True, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    
     class Meta:
         db_table = 'categories'
         verbose_name_plural = 'Categories'
@@ -53,17 +71,151 @@ class Category(models.Model):
             models.Index(fields=['name']),
             models.Index(fields=['slug']),
             models.Index(fields=['is_active']),
+            # varchar_pattern_ops lets prefix (LIKE 'x/%') lookups use the index
+            models.Index(fields=['path'], name='categories_path_idx', opclasses=['varchar_pattern_ops']),
         ]
     
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'parent' not in update_fields:
+            super().save(*args, **kwargs)
+            return
+        
+        parent_path = ''
+        if self.parent_id:
+            # Read from the database: a cached parent may have moved since
+            parent_path = Category.objects.filter(pk=self.parent_id).values_list('path', flat=True).get()
+            if self.path and parent_path.startswith(self.path):
+                raise ValueError('A category cannot be moved under itself or one of its subcategories.')
+        
+        with transaction.atomic():
+            old_path = self.path
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'path', 'depth'}
+            if self.pk:
+                self.path = f"{parent_path}{self.pk}/"
+                self.depth = self.path.count('/') - 1
+                super().save(*args, **kwargs)
+            else:
+                super().save(*args, **kwargs)
+                self.path = f"{parent_path}{self.pk}/"
+                self.depth = self.path.count('/') - 1
+                Category.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+            
+            if old_path and old_path != self.path:
+                # Re-root the subtree in one statement
+                Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(self.path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (self.depth - old_path.count('/') + 1)
+                )
+    
+    def get_descendants(self, include_self=False):
+        """The subtree below this category, in one indexed query"""
+        descendants = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            descendants = descendants.exclude(pk=self.pk)
+        return descendants
     
     def __str__(self):
         return self.name
 
 
+def link_category_tree(categories):
+    """
+    Link categories read together into a tree without further queries: each
+    gets its children as `tree_children` and its parent set when it was read too.
+    """
+    categories = sorted(categories, key=lambda category: (category.depth, category.name))
+    categories_by_id = {category.pk: category for category in categories}
+    for category in categories:
+        category.tree_children = []
+    for category in categories:
+        parent = categories_by_id.get(category.parent_id)
+        if parent is not None:
+            category.parent = parent
+            parent.tree_children.append(category)
+    return categories
+
+
+def load_category_subtrees(categories):
+    """Read the subtrees below the given categories in one query and link them"""
+    categories = list(categories)
+    if not categories:
+        return
+    
+    in_subtrees = Q()
+    for category in categories:
+        in_subtrees |= Q(path__startswith=category.path)
+    
+    loaded = {category.pk: category for category in categories}
+    for descendant in Category.objects.filter(in_subtrees).exclude(pk__in=list(loaded)):
+        loaded[descendant.pk] = descendant
+    link_category_tree(loaded.values())
+
+
+def active_offer_prefetch(lookup='offers'):
+    """
+    Prefetch the offers that are live right now into `prefetched_active_offers`.
+    
+    `lookup` can point through relations (e.g. 'product__offers') so carts and
+    orders can preload offers for their products as well.
+    """
+    from django.utils import timezone
+    now = timezone.now()
+    return Prefetch(
+        lookup,
+        queryset=ProductOffer.objects.filter(
+            status='active',
+            start_date__lte=now,
+            end_date__gte=now
+        ),
+        to_attr='prefetched_active_offers'
+    )
+
+
+def primary_image_prefetch(lookup='images'):
+    """
+    Prefetch only the primary image into `prefetched_primary_images`.
+    
+    Like active_offer_prefetch(), `lookup` may traverse relations
+    (e.g. 'product__images' from cart or order items).
+    """
+    return Prefetch(
+        lookup,
+        queryset=ProductImage.objects.filter(is_primary=True),
+        to_attr='prefetched_primary_images'
+    )
+
+
+def exclude_reserved_quantity(instance, args, kwargs):
+    """
+    Turn a full save of a loaded product or variant into one of every field but
+    reserved_quantity, which only apps.products.inventory moves with guarded
+    updates; writing back the copy read earlier would lose concurrent holds.
+    """
+    if instance._state.adding or args or kwargs.get('force_insert') or kwargs.get('update_fields') is not None:
+        return
+    kwargs['update_fields'] = [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name != 'reserved_quantity'
+    ]
+
+
+class ProductQuerySet(models.QuerySet):
+    """Query helpers that preload data read by product serializers"""
+    
+    def with_active_offer(self):
+        """Resolve the active offer for every product in one extra query"""
+        return self.prefetch_related(active_offer_prefetch())
+    
+    def with_primary_image(self):
+        """Resolve the primary image for every product in one extra query"""
+        return self.prefetch_related(primary_image_prefetch())
+
+
 class Product(models.Model):
     """Enhanced product model to match frontend expectations"""
     
@@ -86,6 +238,12 @@ class Product(models.Model):
     base_price = MoneyField(max_digits=10, decimal_places=2, default_currency='BDT')
     compare_price = MoneyField(max_digits=10, decimal_places=2, default_currency='BDT', null=True, blank=True)
     cost_price = MoneyField(max_digits=10, decimal_places=2, default_currency='BDT', null=True, blank=True)
+    # What shoppers pay right now: the price under the live offer, if any.
+    # Kept current by apps.products.offers so price filters and sorting use an index.
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
+    current_offer = models.ForeignKey(
+        'ProductOffer', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='+'
+    )
     
     # Categories, collections and tags
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='products')
@@ -118,6 +276,8 @@ class Product(models.Model):
     # Inventory
     track_inventory = models.BooleanField(default=True)
     stock_quantity = models.PositiveIntegerField(default=0)
+    # Units held by unexpired checkout reservations (see apps.products.inventory)
+    reserved_quantity = models.PositiveIntegerField(default=0, editable=False)
     low_stock_threshold = models.PositiveIntegerField(default=5)
     
     # Shipping
@@ -132,9 +292,19 @@ class Product(models.Model):
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
     review_count = models.PositiveIntegerField(default=0)
     
+    # Full-text search - weighted name (A), description (B), seller (C) and tags (D).
+    # Maintained by database triggers (see migration 0003), never set from Python.
+    search_document = SearchVectorField(null=True, editable=False)
+    
+    # Lowercased filterable values keyed by attribute, e.g. {"size": ["m", "xl"], "color": ["black"]},
+    # collected from the size/color lists, variants and attribute rows (see refresh_attributes_docs)
+    attributes_doc = models.JSONField(default=dict, blank=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ProductQuerySet.as_manager()
+    
     class Meta:
         db_table = 'products'
         indexes = [
@@ -145,22 +315,34 @@ class Product(models.Model):
             models.Index(fields=['rating']),
             models.Index(fields=['created_at']),
             models.Index(fields=['slug']),
+            # Keyset pagination: one composite index per sortable column, with id as tiebreaker
+            models.Index(fields=['status', 'created_at', 'id'], name='products_status_created_id'),
+            models.Index(fields=['status', 'effective_price', 'id'], name='products_status_eff_price_id'),
+            models.Index(fields=['status', 'rating', 'id'], name='products_status_rating_id'),
+            models.Index(fields=['status', 'sales_count', 'id'], name='products_status_sales_id'),
+            models.Index(fields=['seller', 'created_at', 'id'], name='products_seller_created_id'),
+            GinIndex(fields=['search_document'], name='products_search_document_gin'),
+            GinIndex(fields=['name'], name='products_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['attributes_doc'], name='products_attributes_doc_gin', opclasses=['jsonb_path_ops']),
         ]
     
     def save(self, *args, **kwargs):
+        exclude_reserved_quantity(self, args, kwargs)
+        
         if not self.slug:
-            base_slug = slugify(self.name)
-            unique_slug = base_slug
-            counter = 1
-            while Product.objects.filter(slug=unique_slug).exists():
-                unique_slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = unique_slug
+            self.slug = allocate_product_slugs([self.name])[0]
         
         # Sync price fields
         if self.price and not self.base_price:
             self.base_price = self.price
         
+        # Without a live offer shoppers pay the price; offers are applied by apps.products.offers
+        if not self.current_offer_id:
+            self.effective_price = self.price
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'price' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'effective_price'}
+        
         # Set storeId from seller
         if self.seller_id:
             self.storeId = self.seller_id
@@ -174,11 +356,16 @@ class Product(models.Model):
     def __str__(self):
         return self.name
     
+    @property
+    def available_quantity(self):
+        """Stock not held by other shoppers' checkout reservations"""
+        return max(self.stock_quantity - self.reserved_quantity, 0)
+    
     @property
     def is_in_stock(self):
         # Always check stock quantity, regardless of track_inventory setting
         # If track_inventory is False, we still shouldn't sell items with 0 stock
-        return self.stock_quantity > 0 and self.status == 'active'
+        return self.available_quantity > 0 and self.status == 'active'
     
     @property
     def is_low_stock(self):
@@ -189,6 +376,15 @@ class Product(models.Model):
     @property
     def primary_image(self):
         """Get the primary product image"""
+        # Use images preloaded by with_primary_image() or prefetch_related('images')
+        if hasattr(self, 'prefetched_primary_images'):
+            images = self.prefetched_primary_images
+            return images[0] if images else None
+        
+        prefetched_images = getattr(self, '_prefetched_objects_cache', {}).get('images')
+        if prefetched_images is not None:
+            return next((image for image in prefetched_images if image.is_primary), None)
+        
         return self.images.filter(is_primary=True).first()
     
     @property
@@ -200,6 +396,11 @@ class Product(models.Model):
     @property
     def active_offer(self):
         """Get the currently active offer for this product"""
+        # Use offers preloaded by ProductQuerySet.with_active_offer() when available
+        if hasattr(self, 'prefetched_active_offers'):
+            offers = self.prefetched_active_offers
+            return offers[0] if offers else None
+        
         from django.utils import timezone
         now = timezone.now()
         return self.offers.filter(
@@ -235,6 +436,34 @@ class Product(models.Model):
         return 0
 
 
+def allocate_product_slugs(names):
+    """
+    Unique slugs for new products named `names`, in order.
+    
+    Taken slugs of every base are read in one query, so a whole import batch
+    costs the same as a single product; suffixes follow the "<base>-<n>" pattern.
+    """
+    bases = [slugify(name) or 'product' for name in names]
+    pattern = r'^(%s)(-[0-9]+)?$' % '|'.join(re.escape(base) for base in set(bases))
+    taken = Product.objects.filter(slug__regex=pattern)
+    if len(set(bases)) == 1:
+        # A regex cannot use an index; the prefix narrows single saves down through
+        # the varchar_pattern_ops index Postgres keeps for the unique slug
+        taken = taken.filter(slug__startswith=bases[0])
+    taken = set(taken.values_list('slug', flat=True))
+    
+    slugs = []
+    next_suffix = {}
+    for base in bases:
+        slug = base
+        while slug in taken:
+            next_suffix[base] = next_suffix.get(base, 0) + 1
+            slug = f"{base}-{next_suffix[base]}"
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
 class ProductAttributeType(models.Model):
     """Define custom attribute types for products (e.g., sleeve_length, collar_type)"""
     
@@ -298,6 +527,7 @@ class ProductVariant(models.Model):
     
     # Inventory
     stock_quantity = models.PositiveIntegerField(default=0)
+    reserved_quantity = models.PositiveIntegerField(default=0, editable=False)
     
     # Status
     is_active = models.BooleanField(default=True)
@@ -313,10 +543,44 @@ class ProductVariant(models.Model):
         ]
         unique_together = [['product', 'size', 'color']]
     
+    def save(self, *args, **kwargs):
+        exclude_reserved_quantity(self, args, kwargs)
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.product.name} - {self.size}/{self.color}"
 
 
+class StockReservation(models.Model):
+    """
+    Units held for a shopper from the start of checkout until the order is
+    created or the hold expires.
+    
+    Held units are also counted in reserved_quantity of the product (when it
+    tracks inventory) and of the variant, so availability reads need no join.
+    Whoever deletes a reservation gives its units back (see apps.products.inventory).
+    """
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    variant = models.ForeignKey(
+        ProductVariant, on_delete=models.CASCADE, null=True, blank=True, related_name='reservations'
+    )
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'stock_reservations'
+        indexes = [
+            models.Index(fields=['expires_at']),
+            models.Index(fields=['user', 'product']),
+        ]
+    
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} for {self.user_id} until {self.expires_at}"
+
+
 class ProductVariantAttribute(models.Model):
     """Attributes for product variants"""
     
@@ -341,6 +605,10 @@ class ProductImage(models.Model):
     is_primary = models.BooleanField(default=False)
     sort_order = models.PositiveIntegerField(default=0)
     
+    # Resized WebP/JPEG copies made off the request thread, see apps.products.renditions:
+    # {"source": <image name>, "sizes": {"thumb": {"width", "height", "webp", "jpeg"}, ...}}
+    renditions = models.JSONField(default=dict, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -475,3 +743,597 @@ class ProductOffer(models.Model):
         original_price = float(self.product.price)
         discounted_price = self.discounted_price
         return round(original_price - discounted_price, 2)
+
+
+def normalize_attribute_values(value):
+    """Lowercased, non-empty values of an attribute stored as text, JSON list or list"""
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+            value = parsed if isinstance(parsed, list) else value
+        except ValueError:
+            pass
+    values = value if isinstance(value, list) else [value]
+    return [str(item).strip().lower() for item in values if str(item).strip()]
+
+
+def attribute_doc_key(slug, input_type):
+    """Size and color attributes share the keys used by availableSizes/availableColors"""
+    return input_type if input_type in ('size', 'color') else slug
+
+
+def refresh_attributes_docs(product_ids=None, batch_size=500):
+    """Rebuild Product.attributes_doc from size/color lists, active variants and attribute rows"""
+    if product_ids is None:
+        product_ids = list(Product.objects.values_list('id', flat=True))
+    product_ids = list(product_ids)
+    
+    for start in range(0, len(product_ids), batch_size):
+        batch = product_ids[start:start + batch_size]
+        pairs = defaultdict(list)
+        
+        for product_id, sizes, colors in Product.objects.filter(id__in=batch).values_list(
+            'id', 'availableSizes', 'availableColors'
+        ):
+            pairs[product_id].append(('size', sizes or []))
+            pairs[product_id].append(('color', colors or []))
+        
+        for product_id, size, color in ProductVariant.objects.filter(
+            product_id__in=batch, is_active=True
+        ).values_list('product_id', 'size', 'color'):
+            pairs[product_id].extend([('size', size), ('color', color)])
+        
+        for product_id, slug, input_type, value in ProductAttribute.objects.filter(
+            product_id__in=batch
+        ).values_list('product_id', 'attribute_type__slug', 'attribute_type__input_type', 'value'):
+            pairs[product_id].append((attribute_doc_key(slug, input_type), value))
+        
+        for product_id, slug, input_type, value in ProductVariantAttribute.objects.filter(
+            variant__product_id__in=batch, variant__is_active=True
+        ).values_list('variant__product_id', 'attribute_type__slug', 'attribute_type__input_type', 'value'):
+            pairs[product_id].append((attribute_doc_key(slug, input_type), value))
+        
+        products = []
+        for product_id, product_pairs in pairs.items():
+            doc = {}
+            for key, value in product_pairs:
+                for item in normalize_attribute_values(value):
+                    if item not in doc.setdefault(key, []):
+                        doc[key].append(item)
+            products.append(Product(id=product_id, attributes_doc={key: items for key, items in doc.items() if items}))
+        Product.objects.bulk_update(products, ['attributes_doc'])
+
+
+class RelatedProducts(models.Model):
+    """Precomputed ranked list of related products, rebuilt offline"""
+    
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='related_index')
+    related_ids = ArrayField(models.IntegerField(), default=list)
+    scores = ArrayField(models.FloatField(), default=list)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'related_products'
+        verbose_name_plural = 'Related products'
+    
+    def __str__(self):
+        return f"Related products for {self.product_id}"
+
+
+class ProductCard(models.Model):
+    """
+    Read-optimized projection of an active product for listing endpoints.
+    
+    `payload` holds the ProductListSerializer output (with relative media URLs),
+    so a page of cards is one primary key lookup instead of joins and prefetches.
+    Cards are rebuilt by apps.products.cards whenever one of their sources changes.
+    """
+    
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    seller = models.ForeignKey('users.SellerProfile', on_delete=models.CASCADE, related_name='product_cards')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='+')
+    is_featured = models.BooleanField(default=False)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    sales_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    # End of the offer baked into the payload; past it the offer fields are reset on read
+    offer_ends_at = models.DateTimeField(null=True, blank=True)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    refreshed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'product_cards'
+        indexes = [
+            models.Index(fields=['seller', 'created_at'], name='product_cards_seller_created'),
+            models.Index(fields=['category', 'created_at'], name='product_cards_category_created'),
+            models.Index(fields=['is_featured', 'created_at'], name='product_cards_featured_created'),
+        ]
+    
+    def __str__(self):
+        return f"Card for product {self.product_id}"
+
+
+class ProductImportJob(models.Model):
+    """Bulk catalog import of a CSV/XLSX file, processed in chunks by a Celery worker"""
+    
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel (XLSX)'),
+    )
+    
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    
+    seller = models.ForeignKey('users.SellerProfile', on_delete=models.CASCADE, related_name='product_imports')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='product_imports')
+    file = models.FileField(upload_to='imports/products/')
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv')
+    status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='pending')
+    
+    # Progress, updated after every chunk
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    # First row errors as {"row": <line>, "errors": {...}}
+    errors = models.JSONField(default=list, blank=True)
+    
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'product_import_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['seller', 'created_at']),
+            models.Index(fields=['status']),
+        ]
+    
+    def __str__(self):
+        return f"Import {self.pk} for {self.seller} ({self.status})"
+    
+    @property
+    def progress(self):
+        """Share of rows processed, between 0 and 100"""
+        if self.status == 'completed':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(100, round(self.processed_rows * 100 / self.total_rows))
+
+
+class SearchSuggestion(models.Model):
+    """Denormalized autocomplete entries for products, tags, categories and sellers"""
+    
+    KIND_CHOICES = (
+        ('product', 'Product'),
+        ('tag', 'Tag'),
+        ('category', 'Category'),
+        ('seller', 'Seller'),
+    )
+    
+    # Response keys used by the search_suggestions endpoint
+    RESPONSE_KEYS = {
+        'product': 'products',
+        'tag': 'tags',
+        'category': 'categories',
+        'seller': 'sellers',
+    }
+    
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    label = models.CharField(max_length=255)
+    # Lowercased label, matched by the trigram index
+    term = models.CharField(max_length=255)
+    # Popularity used to break ties (sales for products, usage for tags)
+    weight = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'search_suggestions'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_suggestions_kind_object_unique'),
+        ]
+        indexes = [
+            GinIndex(fields=['term'], name='search_suggestions_term_trgm', opclasses=['gin_trgm_ops']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind}: {self.label}"
+    
+    @classmethod
+    def sync(cls, kind, object_id, label, weight=0, active=True):
+        """Insert, refresh or drop the suggestion for one catalog entity"""
+        if not active or not label:
+            cls.objects.filter(kind=kind, object_id=object_id).delete()
+            return
+        
+        cls.objects.update_or_create(
+            kind=kind,
+            object_id=object_id,
+            defaults={'label': label, 'term': label.lower(), 'weight': weight or 0}
+        )
+    
+    @classmethod
+    def bulk_sync(cls, kind, entries):
+        """Insert or refresh suggestions from (object_id, label, weight) entries in one query"""
+        cls.objects.bulk_create(
+            [
+                cls(kind=kind, object_id=object_id, label=label, term=label.lower(), weight=weight or 0)
+                for object_id, label, weight in entries
+                if label
+            ],
+            update_conflicts=True,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['label', 'term', 'weight', 'updated_at']
+        )
+    
+    @classmethod
+    def sync_products(cls, product_ids):
+        """Refresh the suggestions of many products from their name, status and sales"""
+        listed = [
+            (product_id, name, sales_count)
+            for product_id, name, sales_count, status in Product.objects.filter(id__in=product_ids).values_list(
+                'id', 'name', 'sales_count', 'status'
+            )
+            if status == 'active' and name
+        ]
+        cls.objects.filter(kind='product', object_id__in=product_ids).exclude(
+            object_id__in=[product_id for product_id, _, _ in listed]
+        ).delete()
+        cls.bulk_sync('product', listed)
+    
+    @classmethod
+    def lookup(cls, query, limit=5):
+        """Return up to `limit` ranked labels per kind in a single query"""
+        term = query.lower()
+        suggestions = {key: [] for key in cls.RESPONSE_KEYS.values()}
+        
+        rows = cls.objects.filter(
+            Q(term__contains=term) | Q(term__trigram_similar=term)
+        ).annotate(
+            prefix_match=Case(When(term__startswith=term, then=Value(1)), default=Value(0)),
+            similarity=TrigramSimilarity('term', term),
+        ).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=[F('kind')],
+                order_by=[F('prefix_match').desc(), F('similarity').desc(), F('weight').desc(), F('label').asc()]
+            )
+        ).filter(position__lte=limit).order_by('kind', 'position').values_list('kind', 'label')
+        
+        for kind, label in rows:
+            suggestions[cls.RESPONSE_KEYS[kind]].append(label)
+        return suggestions
+
+
+class TagUsage(models.Model):
+    """
+    Number of active products carrying each tag, for the tag cloud and trending tags.
+    
+    Name and slug are copied from the tag so rankings are read from the
+    (count, name) index alone. Kept current by signal handlers and the
+    `reconcile_tag_usage` task, which picks up queryset updates of product status.
+    """
+    
+    tag = models.OneToOneField(Tag, on_delete=models.CASCADE, primary_key=True, related_name='usage')
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100)
+    product_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'tag_usage'
+        indexes = [
+            models.Index(F('product_count').desc(), 'name', name='tag_usage_ranking_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name}: {self.product_count}"
+    
+    @classmethod
+    def refresh(cls, tag_ids):
+        """Recount the active products of the given tags, with one grouped count over their tagged items"""
+        tag_ids = list(set(tag_ids))
+        if not tag_ids:
+            return
+        
+        product_counts = dict(
+            TaggedItem.objects.filter(
+                tag_id__in=tag_ids,
+                content_type=ContentType.objects.get_for_model(Product),
+                object_id__in=Product.objects.filter(status='active').values('id')
+            ).values('tag_id').annotate(count=Count('id')).values_list('tag_id', 'count')
+        )
+        cls.objects.bulk_create(
+            [
+                cls(tag_id=tag_id, name=name, slug=slug, product_count=product_counts.get(tag_id, 0))
+                for tag_id, name, slug in Tag.objects.filter(id__in=tag_ids).values_list('id', 'name', 'slug')
+            ],
+            update_conflicts=True,
+            unique_fields=['tag'],
+            update_fields=['name', 'slug', 'product_count', 'updated_at']
+        )
+    
+    @classmethod
+    def refresh_for_products(cls, product_ids):
+        """Recount the tags of the given products, e.g. after their status changed"""
+        cls.refresh(TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(Product),
+            object_id__in=list(product_ids)
+        ).values_list('tag_id', flat=True).distinct())
+    
+    @classmethod
+    def ranked(cls):
+        """Tags by number of active products, most used first"""
+        return cls.objects.order_by(F('product_count').desc(), 'name')
+
+
+# Signal handlers keeping search suggestions in sync with the catalog
+@receiver(post_save, sender=Product)
+def sync_product_suggestion(sender, instance, update_fields=None, **kwargs):
+    """Refresh the product suggestion when its name, status or sales change"""
+    if update_fields and not {'name', 'status', 'sales_count'} & set(update_fields):
+        return
+    SearchSuggestion.sync('product', instance.pk, instance.name, instance.sales_count, instance.status == 'active')
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_suggestion(sender, instance, **kwargs):
+    SearchSuggestion.sync('product', instance.pk, None)
+
+
+@receiver(post_save, sender=Category)
+def sync_category_suggestion(sender, instance, **kwargs):
+    SearchSuggestion.sync('category', instance.pk, instance.name, active=instance.is_active)
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_suggestion(sender, instance, **kwargs):
+    SearchSuggestion.sync('category', instance.pk, None)
+
+
+@receiver(post_save, sender='users.SellerProfile')
+def sync_seller_suggestion(sender, instance, **kwargs):
+    SearchSuggestion.sync('seller', instance.pk, instance.business_name, active=instance.status == 'approved')
+
+
+@receiver(post_delete, sender='users.SellerProfile')
+def remove_seller_suggestion(sender, instance, **kwargs):
+    SearchSuggestion.sync('seller', instance.pk, None)
+
+
+@receiver(post_save, sender=Tag)
+def sync_tag_suggestion(sender, instance, **kwargs):
+    usage_count = TaggedItem.objects.filter(tag_id=instance.pk).count()
+    SearchSuggestion.sync('tag', instance.pk, instance.name, usage_count)
+
+
+@receiver(post_delete, sender=Tag)
+def remove_tag_suggestion(sender, instance, **kwargs):
+    SearchSuggestion.sync('tag', instance.pk, None)
+
+
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def refresh_tag_suggestion_weight(sender, instance, **kwargs):
+    """Keep tag usage counts current as products are tagged and untagged"""
+    usage_count = TaggedItem.objects.filter(tag_id=instance.tag_id).count()
+    SearchSuggestion.objects.filter(kind='tag', object_id=instance.tag_id).update(weight=usage_count)
+
+
+# Signal handlers invalidating cached public catalog responses
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_product_cache(sender, **kwargs):
+    invalidate_namespaces('products')
+
+
+@receiver(post_save, sender=ProductOffer)
+@receiver(post_delete, sender=ProductOffer)
+def invalidate_offer_cache(sender, **kwargs):
+    invalidate_namespaces('offers')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, **kwargs):
+    invalidate_namespaces('categories')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def invalidate_tag_cache(sender, **kwargs):
+    invalidate_namespaces('tags')
+
+
+@receiver(post_save, sender=Collection)
+@receiver(post_delete, sender=Collection)
+def invalidate_collection_cache(sender, **kwargs):
+    invalidate_namespaces('collections')
+
+
+# Signal handlers bumping Product.updated_at when rows shown on the product page
+# change, so it can serve as the validator of conditional GETs
+def touch_products(product_ids):
+    from django.utils import timezone
+    Product.objects.filter(id__in=product_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=ProductOffer)
+@receiver(post_delete, sender=ProductOffer)
+def touch_product_from_rows(sender, instance, **kwargs):
+    touch_products([instance.product_id])
+
+
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def touch_product_from_tagged_item(sender, instance, **kwargs):
+    if ContentType.objects.get_for_id(instance.content_type_id).model_class() is Product:
+        touch_products([instance.object_id])
+
+
+# Signal handlers keeping Product.attributes_doc in sync with sizes, colors and attributes
+@receiver(post_save, sender=Product)
+def sync_product_attributes_doc(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {'availableSizes', 'availableColors'} & set(update_fields):
+        return
+    refresh_attributes_docs([instance.pk])
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=ProductAttribute)
+@receiver(post_delete, sender=ProductAttribute)
+def sync_attributes_doc_from_rows(sender, instance, **kwargs):
+    refresh_attributes_docs([instance.product_id])
+
+
+@receiver(post_save, sender=ProductVariantAttribute)
+@receiver(post_delete, sender=ProductVariantAttribute)
+def sync_attributes_doc_from_variant_rows(sender, instance, **kwargs):
+    product_ids = ProductVariant.objects.filter(id=instance.variant_id).values_list('product_id', flat=True)
+    refresh_attributes_docs(product_ids)
+
+
+# Signal handlers keeping product cards in sync with their source rows (see apps.products.cards)
+SELLER_CARD_FIELDS = {
+    'name', 'business_name', 'bio', 'verified', 'status', 'rating', 'followers',
+    'productsCount', 'joinedDate', 'logo', 'business_type'
+}
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_card(sender, instance, **kwargs):
+    from .cards import queue_product_card_refresh
+    queue_product_card_refresh([instance.pk])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductOffer)
+@receiver(post_delete, sender=ProductOffer)
+def refresh_card_from_product_rows(sender, instance, **kwargs):
+    from .cards import queue_product_card_refresh
+    queue_product_card_refresh([instance.product_id])
+
+
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def refresh_card_from_tagged_item(sender, instance, **kwargs):
+    from .cards import queue_product_card_refresh
+    if ContentType.objects.get_for_id(instance.content_type_id).model_class() is Product:
+        queue_product_card_refresh([instance.object_id])
+
+
+@receiver(post_save, sender=Tag)
+def refresh_cards_from_tag(sender, instance, **kwargs):
+    from .cards import queue_product_card_refresh
+    product_ids = Product.objects.filter(tags__id=instance.pk).values_list('id', flat=True)
+    queue_product_card_refresh(product_ids, in_background=True)
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def refresh_cards_from_category(sender, instance, **kwargs):
+    from .cards import queue_product_card_refresh
+    product_ids = Product.objects.filter(category_id=instance.pk).values_list('id', flat=True)
+    queue_product_card_refresh(product_ids, in_background=True)
+
+
+@receiver(post_save, sender=Collection)
+@receiver(pre_delete, sender=Collection)
+def refresh_cards_from_collection(sender, instance, **kwargs):
+    from .cards import queue_product_card_refresh
+    product_ids = Product.objects.filter(collection_id=instance.pk).values_list('id', flat=True)
+    queue_product_card_refresh(product_ids, in_background=True)
+
+
+@receiver(post_save, sender='users.SellerProfile')
+def refresh_cards_from_seller(sender, instance, created=False, update_fields=None, **kwargs):
+    from .cards import queue_product_card_refresh
+    if created or (update_fields and not SELLER_CARD_FIELDS & set(update_fields)):
+        return
+    product_ids = Product.objects.filter(seller_id=instance.pk).values_list('id', flat=True)
+    queue_product_card_refresh(product_ids, in_background=True)
+
+
+# Signal handlers keeping Product.effective_price in line with its offers (see apps.products.offers)
+@receiver(post_save, sender=ProductOffer)
+@receiver(post_delete, sender=ProductOffer)
+def refresh_effective_price_from_offer(sender, instance, **kwargs):
+    from .offers import refresh_effective_prices
+    refresh_effective_prices([instance.product_id])
+    # The update skips the product handlers; price filters, sorting and facets read the column
+    invalidate_namespaces('products')
+
+
+@receiver(post_save, sender=Product)
+def refresh_effective_price_from_product(sender, instance, created=False, update_fields=None, **kwargs):
+    # Without an offer save() has already set it
+    if created or not instance.current_offer_id or (update_fields and 'price' not in update_fields):
+        return
+    from .offers import refresh_effective_prices
+    refresh_effective_prices([instance.pk])
+
+
+# Signal handlers generating responsive renditions of product images (see apps.products.renditions)
+@receiver(post_save, sender=ProductImage)
+def queue_product_image_renditions(sender, instance, **kwargs):
+    from .renditions import queue_image_renditions
+    if instance.image and instance.renditions.get('source') != instance.image.name:
+        queue_image_renditions([instance.pk])
+
+
+@receiver(post_delete, sender=ProductImage)
+def delete_product_image_renditions(sender, instance, **kwargs):
+    from .utils import delete_renditions
+    if instance.renditions.get('sizes'):
+        transaction.on_commit(
+            lambda: delete_renditions(instance.renditions['sizes'], instance.image.storage),
+            robust=True
+        )
+
+
+# Signal handlers keeping TagUsage counts current
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def refresh_tag_usage_from_tagged_item(sender, instance, **kwargs):
+    if ContentType.objects.get_for_id(instance.content_type_id).model_class() is Product:
+        TagUsage.refresh([instance.tag_id])
+
+
+@receiver(post_save, sender=Tag)
+def refresh_tag_usage_from_tag(sender, instance, **kwargs):
+    TagUsage.refresh([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def refresh_tag_usage_from_product(sender, instance, created=False, update_fields=None, **kwargs):
+    # New products are tagged after they are saved, which is counted per tagged item
+    if created or (update_fields and 'status' not in update_fields):
+        return
+    TagUsage.refresh_for_products([instance.pk])
+
+
+# Reservations deleted through the ORM (e.g. with their user) give their units
+# back here; apps.products.inventory deletes them in SQL and gives back itself
+@receiver(post_delete, sender=StockReservation)
+def give_back_deleted_reservation(sender, instance, **kwargs):
+    from .inventory import give_back
+    give_back([(instance.product_id, instance.variant_id, instance.quantity)])
@@ -0,0 +1,86 @@
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest, Round
+from django.utils import timezone
+
+from justclothing.cache import invalidate_namespaces
+from .models import Product, ProductOffer, touch_products
+
+
+PRICE_BATCH_SIZE = 1000
+
+
+def live_offers(now):
+    """Offers shoppers get at `now`"""
+    return ProductOffer.objects.filter(status='active', start_date__lte=now, end_date__gte=now)
+
+
+def offer_price(price):
+    """SQL for `price` under the offer of the row, like ProductOffer.discounted_price"""
+    return Case(
+        When(
+            offer_type='percentage', discount_percentage__gt=0,
+            then=Round(price * (100 - F('discount_percentage')) / 100, 2)
+        ),
+        When(
+            offer_type='flat', discount_amount__gt=0,
+            then=Greatest(price - F('discount_amount'), Value(0))
+        ),
+        default=price,
+        output_field=DecimalField(max_digits=10, decimal_places=2)
+    )
+
+
+def refresh_effective_prices(product_ids=None, now=None, batch_size=PRICE_BATCH_SIZE):
+    """
+    Point products (all by default) at their live offer and store the price it gives.
+    
+    Like Product.active_offer, the newest live offer wins. Each batch is a
+    single UPDATE evaluating the offers in the database.
+    """
+    now = now or timezone.now()
+    if product_ids is None:
+        product_ids = Product.objects.values_list('id', flat=True)
+    product_ids = list(set(product_ids))
+    
+    offers = live_offers(now).filter(product=OuterRef('pk')).order_by('-created_at')
+    for start in range(0, len(product_ids), batch_size):
+        Product.objects.filter(id__in=product_ids[start:start + batch_size]).update(
+            current_offer=Subquery(offers.values('id')[:1]),
+            effective_price=Coalesce(
+                Subquery(offers.annotate(offer_price=offer_price(OuterRef('price'))).values('offer_price')[:1]),
+                F('price')
+            )
+        )
+
+
+def apply_offer_lifecycle(now=None):
+    """
+    Move offers and prices across their start and end dates.
+    
+    Offers past their end are marked expired. Products whose current offer is no
+    longer live, or that got a newer live offer, are re-priced and their cards
+    rebuilt. Both are read from the offers themselves, so a missed run is caught
+    up by the next one. Returns the IDs of the re-priced products.
+    """
+    from .cards import refresh_product_cards
+    now = now or timezone.now()
+    
+    expired = ProductOffer.objects.filter(status='active', end_date__lt=now).update(
+        status='expired', updated_at=now
+    )
+    
+    product_ids = set(Product.objects.filter(current_offer__isnull=False).exclude(
+        current_offer__in=live_offers(now)
+    ).values_list('id', flat=True))
+    product_ids.update(live_offers(now).exclude(
+        product__current_offer__created_at__gte=F('created_at')
+    ).values_list('product_id', flat=True))
+    
+    if product_ids:
+        refresh_effective_prices(product_ids, now)
+        # update() skips the signal handlers of what shows the prices
+        touch_products(product_ids)
+        refresh_product_cards(product_ids)
+    if expired or product_ids:
+        invalidate_namespaces('products', 'offers')
+    return product_ids
@@ -1,9 +1,187 @@
-from rest_framework.pagination import PageNumberPagination, CursorPagination
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from djmoney.money import Money
+from base64 import b64decode, b64encode
 from collections import OrderedDict
+from decimal import Decimal
+import datetime
+import hashlib
+import json
+import logging
+import redis
 
 
-class ProductPageNumberPagination(PageNumberPagination):
+logger = logging.getLogger(__name__)
+
+
+class LookaheadPage(Page):
+    """Page whose neighbours are known from a limit+1 fetch instead of a count"""
+    
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+    
+    def has_next(self):
+        return self._has_next
+    
+    def has_previous(self):
+        return self.number > 1
+    
+    def next_page_number(self):
+        return self.number + 1
+    
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class ProductPaginator(Paginator):
+    """
+    Paginator with configurable count strategies for large product listings.
+    
+    Count modes:
+        exact    - COUNT(*) cached per query signature for `count_cache_timeout`
+        estimate - row estimate from the query planner
+        auto     - cached exact count, or the planner estimate once it exceeds
+                   `estimate_threshold` rows
+        none     - no count; pages are fetched with limit+1 to detect a next page
+    
+    Estimates are only reported: page numbers and `has_next` then come from the
+    limit+1 fetch as in `none` mode, so pages past a low estimate still load
+    and a high one never links to empty pages.
+    """
+    count_cache_timeout = 60
+    estimate_threshold = 10000
+    
+    def __init__(self, object_list, per_page, count_mode='auto', **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_mode = count_mode
+        self.count_is_estimate = False
+        self._lookahead_pages = None
+    
+    @cached_property
+    def count(self):
+        if self.count_mode == 'none':
+            return None
+        if self.object_list.query.is_empty():
+            # none() querysets have no SQL to key or explain
+            return 0
+        
+        cache_key = self.get_count_cache_key()
+        try:
+            cached = cache.get(cache_key)
+        except redis.RedisError as e:
+            logger.warning(f"Cache unavailable, counting uncached: {e}")
+            cache_key, cached = None, None
+        if cached is not None:
+            self.count_is_estimate, count = cached
+            return count
+        
+        count = None
+        if self.count_mode in ('auto', 'estimate'):
+            estimate = self.estimate_count()
+            if estimate is not None and (self.count_mode == 'estimate' or estimate > self.estimate_threshold):
+                self.count_is_estimate, count = True, estimate
+        if count is None:
+            count = self.object_list.count()
+        
+        if cache_key is not None:
+            try:
+                cache.set(cache_key, (self.count_is_estimate, count), self.count_cache_timeout)
+            except redis.RedisError as e:
+                logger.warning(f"Cache unavailable, could not store count: {e}")
+        return count
+    
+    @property
+    def has_exact_count(self):
+        """Whether page numbers can be checked against the count"""
+        return self.count is not None and not self.count_is_estimate
+    
+    @cached_property
+    def num_pages(self):
+        if self.count_mode == 'none':
+            # Only the pages seen so far are known
+            return self._lookahead_pages
+        return super().num_pages
+    
+    def get_count_cache_key(self):
+        """Cache key derived from the SQL of the filtered, unordered queryset"""
+        sql, params = self.object_list.order_by().query.sql_with_params()
+        signature = hashlib.md5(f'{sql}|{params!r}'.encode('utf-8')).hexdigest()
+        return f'products:count:{self.count_mode}:{signature}'
+    
+    def estimate_count(self):
+        """Row estimate from EXPLAIN; None when the database cannot provide one"""
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+        
+        sql, params = self.object_list.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        if self.has_exact_count:
+            # The count may come from the cache, so pages are not cut short at it
+            return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+        
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        
+        has_next = len(rows) > self.per_page
+        self._lookahead_pages = number + 1 if has_next else number
+        return LookaheadPage(rows[:self.per_page], number, self, has_next)
+    
+    def validate_number(self, number):
+        if self.has_exact_count:
+            return super().validate_number(number)
+        
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+
+class CountModePaginationMixin:
+    """
+    Lets clients pick the count strategy with `?count=exact|estimate|none`.
+    Infinite scroll only needs `has_next`, so `none` skips counting entirely.
+    """
+    count_query_param = 'count'
+    default_count_mode = 'auto'
+    count_modes = ('auto', 'exact', 'estimate', 'none')
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_mode = self.get_count_mode(request)
+        return super().paginate_queryset(queryset, request, view)
+    
+    def get_count_mode(self, request):
+        count_mode = request.query_params.get(self.count_query_param, self.default_count_mode)
+        return count_mode if count_mode in self.count_modes else self.default_count_mode
+    
+    def django_paginator_class(self, object_list, per_page):
+        # Called by PageNumberPagination.paginate_queryset in place of a Paginator class
+        return ProductPaginator(object_list, per_page, count_mode=self.count_mode)
+
+
+class ProductPageNumberPagination(CountModePaginationMixin, PageNumberPagination):
     """
     Custom pagination class for products with enhanced metadata
     that works with infinite scroll frontend implementation.
@@ -22,6 +200,7 @@ class ProductPageNumberPagination(PageNumberPagination):
             ('count', self.page.paginator.count),
             ('current_page', self.page.number),
             ('total_pages', self.page.paginator.num_pages),
+            ('count_is_estimate', self.page.paginator.count_is_estimate),
             ('has_next', self.page.has_next()),
             ('has_previous', self.page.has_previous()),
             ('next', self.get_next_link()),
@@ -29,16 +208,114 @@ class ProductPageNumberPagination(PageNumberPagination):
         ]))
 
 
-class ProductCursorPagination(CursorPagination):
+class ProductCursorPagination(BasePagination):
     """
-    Cursor-based pagination for better performance with large datasets
-    and real-time data consistency.
+    Keyset pagination for product listings.
+    
+    Works with any ordering applied to the queryset (including search rank):
+    the cursor stores the ordering values of the last row plus its id, and the
+    next page is fetched with a WHERE clause on those values instead of OFFSET,
+    so deep pages cost the same as the first one.
     """
     page_size = 20
-    ordering = '-created_at'  # Most recent products first
     cursor_query_param = 'cursor'
     page_size_query_param = 'limit'
     max_page_size = 100
+    default_ordering = ('-created_at',)
+    invalid_cursor_message = 'Invalid cursor'
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.has_previous = bool(request.query_params.get(self.cursor_query_param))
+        
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.get_position_filter(position))
+            except (ValidationError, TypeError, ValueError):
+                # Cursor values that do not fit their fields
+                raise NotFound(self.invalid_cursor_message)
+        
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+    
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+    
+    def get_ordering(self, queryset):
+        """Ordering of the queryset with an id tiebreaker in the leading direction"""
+        ordering = [
+            field for field in (queryset.query.order_by or self.default_ordering)
+            if isinstance(field, str) and field.lstrip('-') not in ('id', 'pk')
+        ] or list(self.default_ordering)
+        ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+    
+    def get_position_filter(self, position):
+        """
+        Rows strictly after `position` in the current ordering.
+        
+        The lexicographic comparison is expanded into OR-ed equality prefixes;
+        the leading range condition lets the planner start the index scan at
+        the cursor position.
+        """
+        conditions = Q()
+        equal_prefix = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            conditions |= equal_prefix & Q(**{f'{name}__{lookup}': value})
+            equal_prefix &= Q(**{name: value})
+        
+        first_field = self.ordering[0]
+        first_name = first_field.lstrip('-')
+        bound = 'lte' if first_field.startswith('-') else 'gte'
+        return Q(**{f'{first_name}__{bound}': position[0]}) & conditions
+    
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        
+        try:
+            position = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+    
+    def encode_cursor(self, instance):
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip('-'))
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = str(value)
+            elif isinstance(value, Money):
+                # Money fields are ordered and filtered on their amount column
+                value = str(value.amount)
+            position.append(value)
+        return b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+    
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
     
     def get_paginated_response(self, data):
         """
@@ -47,13 +324,13 @@ class ProductCursorPagination(CursorPagination):
         return Response(OrderedDict([
             ('results', data),
             ('next', self.get_next_link()),
-            ('previous', self.get_previous_link()),
-            ('has_next', self.get_next_link() is not None),
-            ('has_previous', self.get_previous_link() is not None),
+            ('previous', None),
+            ('has_next', self.has_next),
+            ('has_previous', self.has_previous),
         ]))
 
 
-class SearchResultsPagination(PageNumberPagination):
+class SearchResultsPagination(CountModePaginationMixin, PageNumberPagination):
     """
     Special pagination for search results with relevance scoring.
     """
@@ -68,6 +345,7 @@ class SearchResultsPagination(PageNumberPagination):
             ('count', self.page.paginator.count),
             ('current_page', self.page.number),
             ('total_pages', self.page.paginator.num_pages),
+            ('count_is_estimate', self.page.paginator.count_is_estimate),
             ('has_next', self.page.has_next()),
             ('has_previous', self.page.has_previous()),
             ('next', self.get_next_link()),
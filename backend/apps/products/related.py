@@ -0,0 +1,153 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+from taggit.models import TaggedItem
+
+from .models import Product, RelatedProducts
+
+
+RELATED_LIMIT = 20
+BATCH_SIZE = 500
+
+# Relative weight of each signal in the related score
+TAG_WEIGHT = 1.0
+CO_PURCHASE_WEIGHT = 0.5
+CATEGORY_WEIGHT = 0.3
+SELLER_WEIGHT = 0.1
+
+# Tags on more products than this carry almost no signal and would make
+# candidate generation quadratic, so they are ignored
+MAX_TAG_PRODUCTS = 1000
+# Orders considered for co-purchase signals
+CO_PURCHASE_DAYS = 180
+MAX_BASKET_SIZE = 50
+# Same-category best sellers used to fill up short candidate lists
+CATEGORY_FILL_SIZE = 50
+
+
+def load_tag_vectors(active_ids):
+    """Sparse tf-idf tag vectors (tag id -> weight), normalized to unit length"""
+    content_type = ContentType.objects.get_for_model(Product)
+    product_tags = defaultdict(set)
+    for product_id, tag_id in TaggedItem.objects.filter(
+        content_type=content_type
+    ).values_list('object_id', 'tag_id').iterator():
+        if product_id in active_ids:
+            product_tags[product_id].add(tag_id)
+    
+    document_frequency = Counter(tag_id for tags in product_tags.values() for tag_id in tags)
+    total = len(active_ids)
+    idf = {
+        tag_id: math.log((1 + total) / (1 + frequency)) + 1
+        for tag_id, frequency in document_frequency.items()
+        if frequency <= MAX_TAG_PRODUCTS
+    }
+    
+    vectors = {}
+    tag_postings = defaultdict(list)
+    for product_id, tags in product_tags.items():
+        weights = {tag_id: idf[tag_id] for tag_id in tags if tag_id in idf}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        if not norm:
+            continue
+        vectors[product_id] = {tag_id: weight / norm for tag_id, weight in weights.items()}
+        for tag_id in weights:
+            tag_postings[tag_id].append(product_id)
+    return vectors, tag_postings
+
+
+def load_co_purchases(active_ids):
+    """Number of recent orders containing each pair of products"""
+    from apps.orders.models import OrderItem
+    
+    baskets = defaultdict(set)
+    for order_id, product_id in OrderItem.objects.filter(
+        created_at__gte=timezone.now() - timedelta(days=CO_PURCHASE_DAYS)
+    ).values_list('order_id', 'product_id').iterator():
+        if product_id in active_ids:
+            baskets[order_id].add(product_id)
+    
+    co_purchases = defaultdict(Counter)
+    for products in baskets.values():
+        if len(products) < 2 or len(products) > MAX_BASKET_SIZE:
+            continue
+        for product_id in products:
+            for other_id in products:
+                if other_id != product_id:
+                    co_purchases[product_id][other_id] += 1
+    return co_purchases
+
+
+def score_related(product_id, products, vectors, tag_postings, co_purchases, category_fill):
+    """Top related products for one product as a list of (score, product id)"""
+    category_id, seller_id = products[product_id]
+    scores = defaultdict(float)
+    
+    # Cosine similarity of the tag vectors, accumulated over shared tags only
+    vector = vectors.get(product_id, {})
+    for tag_id, weight in vector.items():
+        for other_id in tag_postings[tag_id]:
+            scores[other_id] += TAG_WEIGHT * weight * vectors[other_id][tag_id]
+    
+    for other_id, count in co_purchases.get(product_id, {}).items():
+        scores[other_id] += CO_PURCHASE_WEIGHT * math.log1p(count)
+    
+    # Same-category best sellers fill up lists with few tag or co-purchase matches
+    for other_id in category_fill.get(category_id, ()):
+        scores.setdefault(other_id, 0.0)
+    
+    scores.pop(product_id, None)
+    for other_id in scores:
+        other_category_id, other_seller_id = products[other_id]
+        if category_id and other_category_id == category_id:
+            scores[other_id] += CATEGORY_WEIGHT
+        if other_seller_id == seller_id:
+            scores[other_id] += SELLER_WEIGHT
+    
+    return heapq.nlargest(RELATED_LIMIT, ((score, other_id) for other_id, score in scores.items() if score > 0))
+
+
+def rebuild_related_products():
+    """Recompute the related products index of every active product in batches"""
+    products = {
+        product_id: (category_id, seller_id)
+        for product_id, category_id, seller_id in Product.objects.filter(
+            status='active'
+        ).values_list('id', 'category_id', 'seller_id').iterator()
+    }
+    product_ids = list(products)
+    vectors, tag_postings = load_tag_vectors(products)
+    co_purchases = load_co_purchases(products)
+    
+    category_fill = defaultdict(list)
+    for product_id, category_id in Product.objects.filter(
+        status='active', category__isnull=False
+    ).order_by('category_id', '-sales_count', '-created_at').values_list('id', 'category_id').iterator():
+        if len(category_fill[category_id]) < CATEGORY_FILL_SIZE:
+            category_fill[category_id].append(product_id)
+    
+    now = timezone.now()
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        entries = []
+        for product_id in product_ids[start:start + BATCH_SIZE]:
+            ranked = score_related(product_id, products, vectors, tag_postings, co_purchases, category_fill)
+            entries.append(RelatedProducts(
+                product_id=product_id,
+                related_ids=[other_id for _, other_id in ranked],
+                scores=[round(score, 4) for score, _ in ranked],
+                computed_at=now
+            ))
+        RelatedProducts.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['related_ids', 'scores', 'computed_at']
+        )
+    
+    # Drop entries of products that are no longer active
+    RelatedProducts.objects.exclude(product__status='active').delete()
+    return len(product_ids)
@@ -0,0 +1,88 @@
+from django.db import transaction
+from django.utils import timezone
+
+from justclothing.cache import invalidate_namespaces
+from .models import Product, ProductImage
+from .utils import IMAGE_RENDITION_FORMATS, delete_renditions, generate_renditions
+
+
+def build_image_renditions(image_id):
+    """
+    Generate the renditions of a product image and record them on it.
+    
+    Images replaced or deleted while their renditions were being made keep
+    their current state and the new files are dropped.
+    """
+    image = ProductImage.objects.filter(pk=image_id).first()
+    if not image or not image.image:
+        return False
+    
+    source = image.image.name
+    if image.renditions.get('source') == source:
+        return False
+    
+    sizes = generate_renditions(image.image)
+    updated = ProductImage.objects.filter(pk=image_id, image=source).update(
+        renditions={'source': source, 'sizes': sizes}
+    )
+    if not updated:
+        delete_renditions(sizes, image.image.storage)
+        return False
+    
+    # Files of an earlier version of the image
+    delete_renditions(image.renditions.get('sizes', {}), image.image.storage)
+    
+    # update() skips the signal handlers refreshing what shows the image
+    from .cards import refresh_product_cards
+    Product.objects.filter(id=image.product_id).update(updated_at=timezone.now())
+    invalidate_namespaces('products')
+    refresh_product_cards([image.product_id])
+    return True
+
+
+def queue_image_renditions(image_ids):
+    """Generate renditions in the image workers once the current transaction commits"""
+    from .tasks import generate_image_renditions_task
+    
+    def queue():
+        for image_id in image_ids:
+            generate_image_renditions_task.delay(image_id)
+    
+    transaction.on_commit(queue, robust=True)
+
+
+def image_srcset(image, request=None):
+    """
+    `srcset` values of a product image per format, e.g.
+    {"webp": "<url> 200w, <url> 480w, <url> 1600w", "jpeg": "..."}.
+    
+    None until the renditions are generated; clients then fall back to the original.
+    """
+    sizes = (image.renditions or {}).get('sizes') if image else None
+    if not sizes:
+        return None
+    
+    storage = image.image.storage
+    srcset = {}
+    for _, extension, _ in IMAGE_RENDITION_FORMATS:
+        candidates = {}
+        for rendition in sorted(sizes.values(), key=lambda rendition: rendition['width']):
+            # Small originals give several renditions of the same width
+            if extension in rendition and rendition['width'] not in candidates:
+                url = storage.url(rendition[extension])
+                candidates[rendition['width']] = request.build_absolute_uri(url) if request else url
+        srcset[extension] = ', '.join(f"{url} {width}w" for width, url in candidates.items())
+    return srcset
+
+
+def absolute_srcset(srcset, request):
+    """Make the URLs of srcset values built without a request absolute"""
+    if not srcset:
+        return srcset
+    return {
+        extension: ', '.join(
+            f"{request.build_absolute_uri(url)} {width}"
+            for url, width in (candidate.rsplit(' ', 1) for candidate in value.split(', ') if candidate)
+        )
+        for extension, value in srcset.items()
+    }
@@ -0,0 +1,213 @@
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.db.models.functions import Lower
+from import_export import fields, resources, widgets
+
+from .models import Category, Collection, Product, ProductVariant, allocate_product_slugs
+
+
+IMPORT_BATCH_SIZE = 500
+# Images beyond this are ignored, like in the product form
+MAX_IMPORT_IMAGES = 6
+
+
+def split_values(value, separator=','):
+    """Non-empty, stripped items of a separated cell"""
+    if value in (None, ''):
+        return []
+    return [item.strip() for item in str(value).split(separator) if item.strip()]
+
+
+class ProductImportResource(resources.ModelResource):
+    """
+    Creates products from catalog rows in bulk, for one seller.
+    
+    Columns: name, description, short_description, price, stock_quantity, status,
+    category (slug or name), collection (slug or name), tags, sizes and colors
+    (comma separated), features (separated by "|"), image_urls (whitespace or
+    comma separated) and variants (a JSON list of objects with sku, size, color,
+    price and stock_quantity).
+    
+    Relations are resolved once per dataset, slugs are allocated once per batch,
+    and products, variants and tag links are written with bulk_create.
+    Images are downloaded afterwards by Celery workers.
+    """
+    
+    sizes = fields.Field(attribute='availableSizes', column_name='sizes', widget=widgets.SimpleArrayWidget(','))
+    colors = fields.Field(attribute='availableColors', column_name='colors', widget=widgets.SimpleArrayWidget(','))
+    features = fields.Field(attribute='features', column_name='features', widget=widgets.SimpleArrayWidget('|'))
+
+    class Meta:
+        model = Product
+        fields = (
+            'name', 'description', 'short_description', 'price', 'stock_quantity', 'status',
+            'sizes', 'colors', 'features', 'meta_title', 'meta_description'
+        )
+        # Every row is a new product: no per-row lookup of existing instances
+        force_init_instance = True
+        use_bulk = True
+        batch_size = IMPORT_BATCH_SIZE
+        skip_diff = True
+        # Validation is done in import_instance() without per-row queries
+        clean_model_instances = False
+    
+    def __init__(self, seller, **kwargs):
+        super().__init__(**kwargs)
+        self.seller = seller
+        self.default_category = seller.category
+    
+    def before_import(self, dataset, **kwargs):
+        """Resolve categories, collections and taken SKUs of the dataset in one query each"""
+        rows = [dict(zip(dataset.headers, values)) for values in dataset]
+        
+        self.categories = self.load_lookup(Category.objects.filter(is_active=True), rows, 'category')
+        self.collections = self.load_lookup(Collection.objects.filter(is_active=True), rows, 'collection')
+        
+        skus = {
+            str(variant.get('sku') or '').strip()
+            for row in rows
+            for variant in self.parse_variants(row.get('variants'), strict=False)
+        }
+        self.taken_skus = set(ProductVariant.objects.filter(sku__in=skus).values_list('sku', flat=True))
+    
+    def load_lookup(self, queryset, rows, column):
+        """Map of lowercased slugs and names to IDs for the values of a column"""
+        values = {str(row.get(column)).strip().lower() for row in rows if row.get(column)}
+        if not values:
+            return {}
+        
+        lookup = {}
+        for object_id, slug, name in queryset.annotate(
+            lower_slug=Lower('slug'), lower_name=Lower('name')
+        ).filter(Q(lower_slug__in=values) | Q(lower_name__in=values)).values_list('id', 'lower_slug', 'lower_name'):
+            lookup[slug] = object_id
+            lookup.setdefault(name, object_id)
+        return lookup
+    
+    def parse_variants(self, value, strict=True):
+        if value in (None, ''):
+            return []
+        try:
+            variants = json.loads(value) if isinstance(value, str) else value
+        except ValueError:
+            if strict:
+                raise ValidationError({'variants': 'Enter a JSON list of variants.'})
+            return []
+        if not isinstance(variants, list) or not all(isinstance(variant, dict) for variant in variants):
+            if strict:
+                raise ValidationError({'variants': 'Enter a JSON list of variants.'})
+            return []
+        return variants
+    
+    def build_variants(self, row):
+        variants = []
+        seen = set()
+        for variant in self.parse_variants(row.get('variants')):
+            sku = str(variant.get('sku') or '').strip()
+            if not sku:
+                raise ValidationError({'variants': 'Every variant needs a SKU.'})
+            if sku in self.taken_skus or sku in seen:
+                raise ValidationError({'variants': f'SKU "{sku}" is already in use.'})
+            seen.add(sku)
+            
+            size = str(variant.get('size') or '').strip()
+            color = str(variant.get('color') or '').strip()
+            if (size, color) in seen:
+                raise ValidationError({'variants': f'Duplicate variant {size}/{color}.'})
+            seen.add((size, color))
+            
+            try:
+                price = Decimal(str(variant['price'])) if variant.get('price') not in (None, '') else None
+                stock_quantity = int(variant.get('stock_quantity') or 0)
+            except (InvalidOperation, TypeError, ValueError):
+                raise ValidationError({'variants': f'Invalid price or stock for SKU "{sku}".'})
+            if stock_quantity < 0:
+                raise ValidationError({'variants': f'Invalid price or stock for SKU "{sku}".'})
+            
+            variants.append(ProductVariant(
+                sku=sku,
+                size=size,
+                color=color,
+                price=price,
+                stock_quantity=stock_quantity
+            ))
+        return variants
+    
+    def import_field(self, field, instance, row, is_m2m=False, **kwargs):
+        try:
+            super().import_field(field, instance, row, is_m2m=is_m2m, **kwargs)
+        except (InvalidOperation, TypeError):
+            # Number widgets let these escape; import_instance() collects ValueErrors per field
+            raise ValueError('Enter a valid number.')
+    
+    def import_instance(self, instance, row, **kwargs):
+        errors = {}
+        try:
+            super().import_instance(instance, row, **kwargs)
+        except ValidationError as e:
+            errors = e.update_error_dict(errors)
+        
+        if not (instance.name or '').strip():
+            errors['name'] = 'This field is required.'
+        if instance.price is None or instance.price < 0:
+            errors.setdefault('price', 'Enter a valid price.')
+        if instance.stock_quantity is None or instance.stock_quantity < 0:
+            errors.setdefault('stock_quantity', 'Enter a valid stock quantity.')
+        if not instance.status:
+            instance.status = 'active'
+        elif instance.status not in dict(Product.PRODUCT_STATUS):
+            errors['status'] = f'Unknown status "{instance.status}".'
+        
+        instance.category_id = self.default_category.id if self.default_category else None
+        category = str(row.get('category') or '').strip().lower()
+        if category:
+            instance.category_id = self.categories.get(category)
+            if instance.category_id is None:
+                errors['category'] = f'Unknown category "{row["category"]}".'
+        
+        collection = str(row.get('collection') or '').strip().lower()
+        if collection:
+            instance.collection_id = self.collections.get(collection)
+            if instance.collection_id is None:
+                errors['collection'] = f'Unknown collection "{row["collection"]}".'
+        
+        tags = split_values(row.get('tags'))
+        if any(len(tag) > 100 for tag in tags):
+            errors['tags'] = 'Tags can have at most 100 characters.'
+        
+        try:
+            variants = self.build_variants(row)
+        except ValidationError as e:
+            errors = e.update_error_dict(errors)
+            variants = []
+        
+        if errors:
+            raise ValidationError(errors)
+        
+        # What Product.save() would have filled in
+        instance.seller = self.seller
+        instance.storeId = self.seller.id
+        instance.base_price = instance.price
+        instance.effective_price = instance.price
+        
+        # Written after the product rows exist, see save_import_relations()
+        instance.import_tags = tags
+        instance.import_variants = variants
+        instance.import_image_urls = str(row.get('image_urls') or '').replace(',', ' ').split()[:MAX_IMPORT_IMAGES]
+        self.taken_skus.update(variant.sku for variant in variants)
+    
+    def bulk_create(self, using_transactions, dry_run, raise_errors, batch_size=None, result=None):
+        products = list(self.create_instances)
+        if products and (using_transactions or not dry_run):
+            for product, slug in zip(products, allocate_product_slugs([product.name for product in products])):
+                product.slug = slug
+        
+        super().bulk_create(using_transactions, dry_run, raise_errors, batch_size=batch_size, result=result)
+        
+        # Products only get a primary key once the batch was written
+        if not dry_run and products and all(product.pk for product in products):
+            from .imports import save_import_relations
+            save_import_relations(products)
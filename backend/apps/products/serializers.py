@@ -1,10 +1,144 @@
+from djmoney.models.fields import MoneyField
+from djmoney.utils import get_currency_field_name
 from rest_framework import serializers
 from taggit.serializers import TagListSerializerField, TaggitSerializer
 from .models import (
     Category, ProductAttributeType, Product, ProductAttribute, 
-    ProductVariant, ProductVariantAttribute, ProductImage, ProductVideo, Collection, ProductOffer
+    ProductVariant, ProductVariantAttribute, ProductImage, ProductVideo, Collection, ProductOffer,
+    ProductImportJob, active_offer_prefetch, load_category_subtrees, primary_image_prefetch
 )
 from apps.users.models import SellerProfile
+from .renditions import image_srcset
+
+
+def primary_image_url(product, request=None):
+    """
+    Return the primary image URL of a product (absolute when a request is given).
+    
+    Goes through Product.primary_image, so it reads prefetched images instead
+    of querying once per row.
+    """
+    primary_image = product.primary_image
+    if not primary_image or not primary_image.image:
+        return None
+    if request:
+        return request.build_absolute_uri(primary_image.image.url)
+    return primary_image.image.url
+
+
+def primary_image_srcset(product, request=None):
+    """`srcset` values of the primary image per format (see renditions.image_srcset)"""
+    return image_srcset(product.primary_image, request)
+
+
+def parse_field_list(value):
+    """Names of a comma separated query parameter"""
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def sparse_fields_from_request(request):
+    """The `fields` and `expand` query parameters of a request as lists (None when absent)"""
+    if request is None:
+        return None, None
+    return (
+        parse_field_list(request.query_params.get('fields')) or None,
+        parse_field_list(request.query_params.get('expand')) or None
+    )
+
+
+class SparseFieldsMixin:
+    """
+    Sparse fieldsets for product serializers.
+    
+    `fields` keeps only the named fields (and id); `expand` adds the optional
+    fields listed in Meta.expandable_fields, which are left out by default.
+    Meta.field_queries says what fields other than plain columns read, so that
+    sparse_queryset() loads only what the kept fields need.
+    """
+    
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, 'expandable_fields', [])
+        expand = set(expand or [])
+        
+        unknown = expand - set(expandable)
+        if unknown:
+            raise serializers.ValidationError({'expand': f"Unknown expansions: {', '.join(sorted(unknown))}."})
+        for name in set(expandable) - expand:
+            self.fields.pop(name)
+        
+        if fields:
+            unknown = set(fields) - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}."})
+            for name in set(self.fields) - set(fields) - expand - {'id'}:
+                self.fields.pop(name)
+
+
+def sparse_queryset(queryset, serializer, columns=()):
+    """
+    Trim a queryset to what the fields of a SparseFieldsMixin serializer read:
+    only() their columns, and only the joins and prefetches they need.
+    `columns` are loaded as well (e.g. those read by cursor pagination).
+    """
+    serializer = getattr(serializer, 'child', serializer)
+    field_queries = getattr(serializer.Meta, 'field_queries', {})
+    model_columns = {field.name for field in queryset.model._meta.concrete_fields}
+    
+    only = {'id', *columns}
+    select_related = set()
+    # Prefetch factories are called last, so live offers are resolved as of now
+    prefetches = {}
+    for name, field in serializer.fields.items():
+        query = field_queries.get(name)
+        if query is None:
+            if field.source in model_columns:
+                only.add(field.source)
+            continue
+        
+        only.update(query.get('only', []))
+        for relation in query.get('select_related', []):
+            only.add(relation)
+            select_related.add(relation)
+        for lookup in query.get('prefetch_related', []):
+            prefetches.setdefault(lookup, lookup)
+    
+    # Money amounts are read together with their currency column
+    only.update(
+        get_currency_field_name(name) for name in list(only)
+        if isinstance(queryset.model._meta.get_field(name), MoneyField)
+    )
+    
+    queryset = queryset.select_related(None).prefetch_related(None).only(*only)
+    if select_related:
+        # select_related() without arguments would follow every relation
+        queryset = queryset.select_related(*select_related)
+    return queryset.prefetch_related(*[lookup() if callable(lookup) else lookup for lookup in prefetches.values()])
+
+
+# What the computed fields of product serializers read, for sparse_queryset()
+PRODUCT_FIELD_QUERIES = {
+    'image': {'prefetch_related': [primary_image_prefetch]},
+    'image_srcset': {'prefetch_related': [primary_image_prefetch]},
+    'store': {'select_related': ['seller']},
+    'business_type': {'select_related': ['seller']},
+    'store_name': {'select_related': ['seller']},
+    'category_name': {'select_related': ['category']},
+    'category_data': {'select_related': ['category']},
+    'collection_name': {'select_related': ['collection']},
+    'collection_data': {'select_related': ['collection']},
+    'tags_list': {'prefetch_related': ['tags']},
+    'original_price': {'only': ['price']},
+    'discounted_price': {'only': ['price'], 'prefetch_related': [active_offer_prefetch]},
+    'has_active_offer': {'prefetch_related': [active_offer_prefetch]},
+    'savings_amount': {'only': ['price'], 'prefetch_related': [active_offer_prefetch]},
+    'is_in_stock': {'only': ['stock_quantity', 'reserved_quantity', 'status']},
+    'is_low_stock': {'only': ['stock_quantity', 'track_inventory', 'low_stock_threshold']},
+    'images': {'prefetch_related': ['images']},
+    'variants': {'prefetch_related': ['variants']},
+    'attributes': {'prefetch_related': ['attributes__attribute_type']},
+    'videos': {'prefetch_related': ['videos']},
+}
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -18,9 +152,23 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'description', 'parent', 'parent_name', 'is_active', 'subcategories']
     
     def get_subcategories(self, obj):
-        if hasattr(obj, 'children'):
-            return CategorySerializer(obj.children.all(), many=True).data
-        return []
+        if not hasattr(obj, 'tree_children'):
+            # Views load the subtrees of all listed categories at once
+            load_category_subtrees([obj])
+        return CategorySerializer(obj.tree_children, many=True, context=self.context).data
+
+
+class CategoryTreeSerializer(serializers.ModelSerializer):
+    """Node of the category tree, with its children linked by link_category_tree()"""
+    
+    children = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'slug', 'depth', 'children']
+    
+    def get_children(self, obj):
+        return CategoryTreeSerializer(obj.tree_children, many=True).data
 
 
 class ProductAttributeTypeSerializer(serializers.ModelSerializer):
@@ -45,9 +193,14 @@ class ProductAttributeSerializer(serializers.ModelSerializer):
 class ProductImageSerializer(serializers.ModelSerializer):
     """Serializer for product images"""
     
+    srcset = serializers.SerializerMethodField()
+    
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'alt_text', 'is_primary', 'sort_order']
+        fields = ['id', 'image', 'srcset', 'alt_text', 'is_primary', 'sort_order']
+    
+    def get_srcset(self, obj):
+        return image_srcset(obj, self.context.get('request'))
 
 
 class ProductVideoSerializer(serializers.ModelSerializer):
@@ -94,11 +247,12 @@ class SellerBasicSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'bio', 'verified', 'rating', 'followers', 'productsCount', 'joinedDate', 'logo']
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Product serializer for list views - matches frontend product structure"""
     
     # Frontend compatibility fields
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     store = SellerBasicSerializer(source='seller', read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     collection_name = serializers.CharField(source='collection.name', read_only=True)
@@ -111,6 +265,10 @@ class ProductListSerializer(serializers.ModelSerializer):
     has_active_offer = serializers.ReadOnlyField()
     savings_amount = serializers.ReadOnlyField()
     
+    # Only included with `expand`
+    images = ProductImageSerializer(many=True, read_only=True)
+    variants = ProductVariantSerializer(many=True, read_only=True)
+    
     class Meta:
         model = Product
         fields = [
@@ -120,35 +278,40 @@ class ProductListSerializer(serializers.ModelSerializer):
             'category', 'category_name', 'collection', 'collection_name',
             'tags_list', 'availableSizes', 'availableColors', 'features',
             'is_featured', 'status', 'storeId', 'store', 'business_type',
-            'image', 'created_at', 'updated_at',
-            'stock_quantity', 'is_in_stock', 'is_low_stock', 'track_inventory'
+            'image', 'image_srcset', 'created_at', 'updated_at',
+            'stock_quantity', 'is_in_stock', 'is_low_stock', 'track_inventory',
+            'images', 'variants'
         ]
+        expandable_fields = ['images', 'variants']
+        field_queries = PRODUCT_FIELD_QUERIES
     
     def get_image(self, obj):
         """Get primary image URL for frontend compatibility"""
-        primary_image = obj.images.filter(is_primary=True).first()
-        if primary_image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(primary_image.image.url)
-            return primary_image.image.url
-        return None
+        return primary_image_url(obj, self.context.get('request'))
+    
+    def get_image_srcset(self, obj):
+        return primary_image_srcset(obj, self.context.get('request'))
     
     def get_tags_list(self, obj):
         """Convert tags to list format for frontend"""
         return [tag.name for tag in obj.tags.all()]
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Detailed product serializer - matches frontend product detail structure"""
     
     # Images
     images = ProductImageSerializer(many=True, read_only=True)
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     
     # Variants
     variants = ProductVariantSerializer(many=True, read_only=True)
     
+    # Only included with `expand`
+    attributes = ProductAttributeSerializer(many=True, read_only=True)
+    videos = ProductVideoSerializer(many=True, read_only=True)
+    
     # Related data
     category_data = CategorySerializer(source='category', read_only=True)
     collection_data = CollectionSerializer(source='collection', read_only=True)
@@ -179,20 +342,20 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'is_featured', 'status', 'storeId', 'store',
             'stock_quantity', 'is_in_stock', 'is_low_stock',
             'weight', 'shipping_days_min', 'shipping_days_max',
-            'images', 'image', 'variants',
+            'images', 'image', 'image_srcset', 'variants',
             'views_count', 'meta_title', 'meta_description',
-            'created_at', 'updated_at'
+            'created_at', 'updated_at',
+            'attributes', 'videos'
         ]
+        expandable_fields = ['attributes', 'videos']
+        field_queries = PRODUCT_FIELD_QUERIES
     
     def get_image(self, obj):
         """Get primary image URL"""
-        primary_image = obj.images.filter(is_primary=True).first()
-        if primary_image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(primary_image.image.url)
-            return primary_image.image.url
-        return None
+        return primary_image_url(obj, self.context.get('request'))
+    
+    def get_image_srcset(self, obj):
+        return primary_image_srcset(obj, self.context.get('request'))
     
     def get_tags_list(self, obj):
         """Convert tags to list format"""
@@ -298,6 +461,7 @@ class ProductSearchSerializer(serializers.ModelSerializer):
     """Lightweight serializer for search results"""
     
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     store_name = serializers.CharField(source='seller.name', read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     
@@ -305,17 +469,14 @@ class ProductSearchSerializer(serializers.ModelSerializer):
         model = Product
         fields = [
             'id', 'name', 'slug', 'price', 'rating', 'review_count',
-            'image', 'store_name', 'category_name', 'is_featured'
+            'image', 'image_srcset', 'store_name', 'category_name', 'is_featured'
         ]
     
     def get_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
-        if primary_image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(primary_image.image.url)
-            return primary_image.image.url
-        return None
+        return primary_image_url(obj, self.context.get('request'))
+    
+    def get_image_srcset(self, obj):
+        return primary_image_srcset(obj, self.context.get('request'))
 
 
 class CategoryCreateSerializer(serializers.ModelSerializer):
@@ -421,5 +582,33 @@ class ProductWithOfferSerializer(serializers.ModelSerializer):
         ]
 
 
+class ProductImportJobSerializer(serializers.ModelSerializer):
+    """Upload of a catalog file and progress of its import"""
+    
+    progress = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = ProductImportJob
+        fields = [
+            'id', 'file', 'file_format', 'status', 'progress',
+            'total_rows', 'processed_rows', 'created_count', 'error_count', 'errors',
+            'started_at', 'finished_at', 'created_at'
+        ]
+        read_only_fields = [
+            'file_format', 'status', 'total_rows', 'processed_rows', 'created_count',
+            'error_count', 'errors', 'started_at', 'finished_at', 'created_at'
+        ]
+    
+    def validate_file(self, value):
+        extension = value.name.rsplit('.', 1)[-1].lower()
+        if extension not in dict(ProductImportJob.FORMAT_CHOICES):
+            raise serializers.ValidationError("Upload a .csv or .xlsx file.")
+        return value
+    
+    def create(self, validated_data):
+        validated_data['file_format'] = validated_data['file'].name.rsplit('.', 1)[-1].lower()
+        return super().create(validated_data)
+
+
 # Offer fields are already defined in the serializers without the active_offer field reference
 # The active_offer field will be handled via the model property 
\ No newline at end of file
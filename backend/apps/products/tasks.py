@@ -0,0 +1,65 @@
+from celery import shared_task
+from taggit.models import Tag
+
+from .cards import refresh_product_cards
+from .imports import fetch_product_images, run_product_import
+from .inventory import release_expired_reservations
+from .models import TagUsage
+from .offers import apply_offer_lifecycle
+from .related import rebuild_related_products
+from .renditions import build_image_renditions
+from .view_counts import flush_product_views
+
+
+@shared_task
+def flush_product_view_counts():
+    """Write buffered product views to the database"""
+    return flush_product_views()
+
+
+@shared_task
+def rebuild_related_products_index():
+    """Recompute the related products of every active product"""
+    return rebuild_related_products()
+
+
+@shared_task
+def refresh_product_cards_task(product_ids=None):
+    """Rebuild the listing cards of the given products (all products by default)"""
+    return refresh_product_cards(product_ids)
+
+
+@shared_task
+def apply_offer_lifecycle_task():
+    """Expire ended offers and re-price the products whose offers started or ended"""
+    return len(apply_offer_lifecycle())
+
+
+@shared_task
+def release_expired_stock_reservations():
+    """Hand back the stock of checkout holds that ran out"""
+    return release_expired_reservations()
+
+
+@shared_task
+def run_product_import_task(job_id):
+    """Process an uploaded catalog file"""
+    return run_product_import(job_id)
+
+
+@shared_task
+def fetch_product_images_task(product_id, urls):
+    """Download the images listed for an imported product"""
+    return fetch_product_images(product_id, urls)
+
+
+@shared_task
+def generate_image_renditions_task(image_id):
+    """Make the resized WebP/JPEG renditions of a product image (routed to the images queue)"""
+    return build_image_renditions(image_id)
+
+
+@shared_task
+def reconcile_tag_usage():
+    """Recount every tag, catching status changes made with queryset updates"""
+    TagUsage.refresh(Tag.objects.values_list('id', flat=True))
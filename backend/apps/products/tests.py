@@ -1,3 +1,1230 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import socket
+import tempfile
+from base64 import b64encode
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import redis
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.contrib.postgres.search import SearchQuery
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.analytics.models import ProductActivityBucket
+from apps.users.models import User, SellerProfile
+from .imports import MAX_IMAGE_REDIRECTS, download_image, pinned_get, public_address, run_product_import
+from .inventory import (
+    InsufficientStock, StockLine, decrement_stock, release_expired_reservations,
+    release_reservations, reserve_stock
+)
+from .models import (
+    Category, Product, ProductAttribute, ProductAttributeType, ProductCard, ProductImage, ProductOffer,
+    ProductImportJob, ProductVariant, RelatedProducts, SearchSuggestion, StockReservation, TagUsage
+)
+from .cards import refresh_product_cards, serialize_product_cards
+from .offers import apply_offer_lifecycle
+from .pagination import ProductCursorPagination, ProductPaginator
+from .related import rebuild_related_products
+from .renditions import build_image_renditions, image_srcset
+from .serializers import ProductListSerializer
+from .view_counts import flush_product_views, record_product_view
+
+
+def create_seller():
+    user = User.objects.create(email='seller@example.com', username='seller')
+    return SellerProfile.objects.create(
+        user=user, business_name='Shop', business_description='Clothes',
+        phone_number='+8801711111111', business_address='Dhaka', status='approved'
+    )
+
+
+def create_product(seller, name, stock_quantity, **kwargs):
+    return Product.objects.create(
+        seller=seller, name=name, description=name, price=100, base_price=100,
+        stock_quantity=stock_quantity, **kwargs
+    )
+
+
+def stock(instance):
+    instance.refresh_from_db(fields=['stock_quantity', 'reserved_quantity'])
+    return instance.stock_quantity, instance.reserved_quantity
+
+
+class DecrementStockTests(TestCase):
+    """Guarded batched decrements of product and variant stock"""
+    
+    def setUp(self):
+        seller = create_seller()
+        self.shirt = create_product(seller, 'Shirt', 5)
+        self.shirt_m = ProductVariant.objects.create(product=self.shirt, sku='SHIRT-M', size='M', stock_quantity=2)
+        self.cap = create_product(seller, 'Cap', 3)
+    
+    def test_takes_every_line_off_stock(self):
+        decrement_stock([
+            StockLine(self.shirt.id, 'M', '', 1),
+            StockLine(self.shirt.id, 'M', '', 1),
+            StockLine(self.cap.id, '', '', 3),
+        ])
+        
+        self.assertEqual(stock(self.shirt), (3, 0))
+        self.assertEqual(stock(self.shirt_m), (0, 0))
+        self.assertEqual(stock(self.cap), (0, 0))
+    
+    def test_short_product_changes_nothing(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            decrement_stock([StockLine(self.shirt.id, 'M', '', 1), StockLine(self.cap.id, '', '', 4)])
+        
+        self.assertEqual([line.product_id for line in raised.exception.lines], [self.cap.id])
+        self.assertEqual(raised.exception.available, [3])
+        self.assertEqual(stock(self.shirt), (5, 0))
+        self.assertEqual(stock(self.shirt_m), (2, 0))
+        self.assertEqual(stock(self.cap), (3, 0))
+    
+    def test_short_variant_changes_nothing(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            decrement_stock([StockLine(self.shirt.id, 'M', '', 3), StockLine(self.cap.id, '', '', 1)])
+        
+        self.assertEqual([line.product_id for line in raised.exception.lines], [self.shirt.id])
+        self.assertEqual(raised.exception.available, [2])
+        self.assertEqual(stock(self.shirt), (5, 0))
+        self.assertEqual(stock(self.cap), (3, 0))
+    
+    def test_held_units_are_not_available(self):
+        Product.objects.filter(id=self.cap.id).update(reserved_quantity=2)
+        
+        with self.assertRaises(InsufficientStock) as raised:
+            decrement_stock([StockLine(self.cap.id, '', '', 2)])
+        
+        self.assertEqual(raised.exception.available, [1])
+        self.assertEqual(stock(self.cap), (3, 2))
+    
+    def test_untracked_products_and_their_variants_are_left_alone(self):
+        Product.objects.filter(id=self.shirt.id).update(track_inventory=False)
+        
+        decrement_stock([StockLine(self.shirt.id, 'M', '', 10)])
+        
+        self.assertEqual(stock(self.shirt), (5, 0))
+        self.assertEqual(stock(self.shirt_m), (2, 0))
+
+
+class StockReservationTests(TestCase):
+    """Checkout holds and how orders and the sweeper treat them"""
+    
+    def setUp(self):
+        seller = create_seller()
+        self.shirt = create_product(seller, 'Shirt', 5)
+        self.shirt_m = ProductVariant.objects.create(product=self.shirt, sku='SHIRT-M', size='M', stock_quantity=2)
+        self.cap = create_product(seller, 'Cap', 3)
+        self.alice = User.objects.create(email='alice@example.com', username='alice')
+        self.bob = User.objects.create(email='bob@example.com', username='bob')
+    
+    def test_holds_are_counted_as_reserved(self):
+        reserve_stock(self.alice, [StockLine(self.shirt.id, 'M', '', 2), StockLine(self.cap.id, '', '', 1)])
+        
+        self.assertEqual(stock(self.shirt), (5, 2))
+        self.assertEqual(stock(self.shirt_m), (2, 2))
+        self.assertEqual(stock(self.cap), (3, 1))
+        self.assertEqual(StockReservation.objects.filter(user=self.alice).count(), 2)
+    
+    def test_reserving_again_replaces_previous_holds(self):
+        reserve_stock(self.alice, [StockLine(self.cap.id, '', '', 2)])
+        reserve_stock(self.alice, [StockLine(self.cap.id, '', '', 3)])
+        
+        self.assertEqual(stock(self.cap), (3, 3))
+        self.assertEqual(StockReservation.objects.filter(user=self.alice).count(), 1)
+    
+    def test_short_product_keeps_previous_holds(self):
+        reserve_stock(self.alice, [StockLine(self.cap.id, '', '', 1)])
+        
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_stock(self.alice, [StockLine(self.shirt.id, 'M', '', 1), StockLine(self.cap.id, '', '', 4)])
+        
+        # Alice's own hold counts towards what Alice could get
+        self.assertEqual(raised.exception.available, [3])
+        self.assertEqual(stock(self.shirt), (5, 0))
+        self.assertEqual(stock(self.cap), (3, 1))
+        self.assertEqual(StockReservation.objects.get(user=self.alice).quantity, 1)
+    
+    def test_short_variant_holds_nothing(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_stock(self.alice, [StockLine(self.shirt.id, 'M', '', 3)])
+        
+        self.assertEqual(raised.exception.available, [2])
+        self.assertEqual(stock(self.shirt), (5, 0))
+        self.assertEqual(stock(self.shirt_m), (2, 0))
+        self.assertFalse(StockReservation.objects.exists())
+    
+    def test_other_shoppers_holds_are_respected(self):
+        reserve_stock(self.alice, [StockLine(self.shirt.id, 'M', '', 2)])
+        
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_stock(self.bob, [StockLine(self.shirt.id, 'M', '', 1)])
+        self.assertEqual(raised.exception.available, [0])
+        
+        with self.assertRaises(InsufficientStock):
+            decrement_stock([StockLine(self.shirt.id, 'M', '', 1)], user=self.bob)
+        self.assertEqual(stock(self.shirt_m), (2, 2))
+    
+    def test_order_consumes_own_holds(self):
+        reserve_stock(self.alice, [StockLine(self.shirt.id, 'M', '', 2), StockLine(self.cap.id, '', '', 1)])
+        
+        # Ordering the held shirts uses their holds; the cap left out of the order stays held
+        decrement_stock([StockLine(self.shirt.id, 'M', '', 2)], user=self.alice)
+        
+        self.assertEqual(stock(self.shirt), (3, 0))
+        self.assertEqual(stock(self.shirt_m), (0, 0))
+        self.assertEqual(stock(self.cap), (3, 1))
+        self.assertEqual(list(StockReservation.objects.values_list('product_id', flat=True)), [self.cap.id])
+    
+    def test_order_releases_holds_on_other_variants_of_ordered_products(self):
+        shirt_l = ProductVariant.objects.create(product=self.shirt, sku='SHIRT-L', size='L', stock_quantity=2)
+        reserve_stock(self.alice, [StockLine(self.shirt.id, 'M', '', 1), StockLine(self.shirt.id, 'L', '', 1)])
+        
+        decrement_stock([StockLine(self.shirt.id, 'M', '', 1)], user=self.alice)
+        
+        self.assertEqual(stock(self.shirt), (4, 0))
+        self.assertEqual(stock(self.shirt_m), (1, 0))
+        self.assertEqual(stock(shirt_l), (2, 0))
+        self.assertFalse(StockReservation.objects.exists())
+    
+    def test_release_gives_units_back(self):
+        reserve_stock(self.alice, [StockLine(self.shirt.id, 'M', '', 2)])
+        
+        self.assertEqual(release_reservations(self.alice), 1)
+        self.assertEqual(stock(self.shirt), (5, 0))
+        self.assertEqual(stock(self.shirt_m), (2, 0))
+    
+    def test_sweeper_releases_only_expired_holds(self):
+        reserve_stock(self.alice, [StockLine(self.shirt.id, 'M', '', 1)], ttl=timedelta(minutes=-1))
+        reserve_stock(self.bob, [StockLine(self.cap.id, '', '', 2)])
+        
+        self.assertEqual(release_expired_reservations(), 1)
+        self.assertEqual(stock(self.shirt), (5, 0))
+        self.assertEqual(stock(self.shirt_m), (2, 0))
+        self.assertEqual(stock(self.cap), (3, 2))
+        self.assertEqual(release_expired_reservations(timezone.now() + timedelta(hours=1)), 1)
+        self.assertEqual(stock(self.cap), (3, 0))
+    
+    def test_listing_cards_follow_holds(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_stock(self.alice, [StockLine(self.cap.id, '', '', 3)])
+        self.assertFalse(ProductCard.objects.get(product=self.cap).payload['is_in_stock'])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            release_reservations(self.alice)
+        self.assertTrue(ProductCard.objects.get(product=self.cap).payload['is_in_stock'])
+
+
+class CursorPaginationTests(TestCase):
+    """Keyset pages over orderings with ties"""
+    
+    def setUp(self):
+        seller = create_seller()
+        self.products = [create_product(seller, f'Tee {i}', 1) for i in range(7)]
+        # Ties on created_at must be broken by id
+        Product.objects.filter(id__in=[p.id for p in self.products[2:5]]).update(
+            created_at=self.products[2].created_at
+        )
+    
+    def paginate(self, ordering, cursor=''):
+        paginator = ProductCursorPagination()
+        request = Request(APIRequestFactory().get('/products/', {'cursor': cursor, 'limit': 3}))
+        page = paginator.paginate_queryset(Product.objects.order_by(*ordering), request)
+        next_link = paginator.get_paginated_response([]).data['next']
+        return [product.id for product in page], next_link and parse_qs(urlparse(next_link).query)['cursor'][0]
+    
+    def walk(self, ordering):
+        ids, cursor = self.paginate(ordering)
+        while cursor:
+            page, cursor = self.paginate(ordering, cursor)
+            ids.extend(page)
+        return ids
+    
+    def test_pages_cover_every_row_once_in_order(self):
+        for ordering, tiebreaker in ((['-created_at'], '-id'), (['price', 'created_at'], 'id'), (['-price'], '-id')):
+            expected = list(Product.objects.order_by(*ordering, tiebreaker).values_list('id', flat=True))
+            self.assertEqual(self.walk(ordering), expected)
+    
+    def test_last_page_has_no_next_link(self):
+        ids, cursor = self.paginate(['-created_at'])
+        ids, cursor = self.paginate(['-created_at'], cursor)
+        ids, cursor = self.paginate(['-created_at'], cursor)
+        
+        self.assertEqual(len(ids), 1)
+        self.assertIsNone(cursor)
+    
+    def test_invalid_cursor_is_not_found(self):
+        with self.assertRaises(NotFound):
+            self.paginate(['-created_at'], 'not-a-cursor')
+    
+    def test_cursor_values_that_do_not_fit_their_fields_are_not_found(self):
+        for position in (['abc', 1], [None, 1], ['2024-01-01T00:00:00', 'abc']):
+            cursor = b64encode(json.dumps(position).encode()).decode()
+            with self.subTest(position=position), self.assertRaises(NotFound):
+                self.paginate(['-created_at'], cursor)
+    
+    def test_money_ordering(self):
+        for i, product in enumerate(self.products):
+            Product.objects.filter(id=product.id).update(base_price=100 + i % 3)
+        
+        expected = list(Product.objects.order_by('base_price', 'id').values_list('id', flat=True))
+        self.assertEqual(self.walk(['base_price']), expected)
+
+
+class CountPaginationTests(TestCase):
+    """Page numbers under each count mode of ProductPaginator"""
+    
+    def setUp(self):
+        cache.clear()
+        seller = create_seller()
+        for i in range(25):
+            create_product(seller, f'Tee {i}', 1)
+        self.queryset = Product.objects.order_by('id')
+    
+    def test_exact_count(self):
+        paginator = ProductPaginator(self.queryset, 10, count_mode='exact')
+        
+        self.assertEqual(paginator.count, 25)
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertFalse(paginator.page(3).has_next())
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+    
+    def test_pages_are_not_cut_short_by_a_cached_count(self):
+        ProductPaginator(self.queryset, 10, count_mode='exact').count
+        create_product(Product.objects.first().seller, 'Tee 25', 1)
+        
+        paginator = ProductPaginator(self.queryset, 10, count_mode='exact')
+        self.assertEqual(paginator.count, 25)
+        self.assertEqual(len(paginator.page(3)), 6)
+    
+    def test_count_is_cached(self):
+        ProductPaginator(self.queryset, 10, count_mode='exact').count
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(ProductPaginator(self.queryset, 10, count_mode='exact').count, 25)
+    
+    def test_estimates_do_not_drive_page_numbers(self):
+        for estimate in (3, 5000):
+            cache.clear()
+            with mock.patch.object(ProductPaginator, 'estimate_count', return_value=estimate):
+                paginator = ProductPaginator(self.queryset, 10, count_mode='estimate')
+                
+                # Reported as is, but pages past a low estimate still load and a high one ends on time
+                self.assertEqual(paginator.count, estimate)
+                self.assertTrue(paginator.count_is_estimate)
+                self.assertTrue(paginator.page(2).has_next())
+                page = paginator.page(3)
+                self.assertEqual(len(page), 5)
+                self.assertFalse(page.has_next())
+                with self.assertRaises(EmptyPage):
+                    paginator.page(4)
+    
+    def test_auto_estimates_only_past_threshold(self):
+        with mock.patch.object(ProductPaginator, 'estimate_count', return_value=30):
+            paginator = ProductPaginator(self.queryset, 10, count_mode='auto')
+            self.assertEqual(paginator.count, 25)
+            self.assertFalse(paginator.count_is_estimate)
+            
+            cache.clear()
+            with mock.patch.object(ProductPaginator, 'estimate_threshold', 20):
+                paginator = ProductPaginator(self.queryset, 10, count_mode='auto')
+                self.assertEqual(paginator.count, 30)
+                self.assertTrue(paginator.count_is_estimate)
+    
+    def test_no_count_uses_lookahead(self):
+        paginator = ProductPaginator(self.queryset, 10, count_mode='none')
+        
+        with self.assertNumQueries(1):
+            page = paginator.page(2)
+        self.assertIsNone(paginator.count)
+        self.assertTrue(page.has_next())
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertFalse(paginator.page(3).has_next())
+
+
+class InStockFilterTests(TestCase):
+    """`in_stock` leaves out products whose stock is all held"""
+    
+    def test_fully_held_products_are_not_in_stock(self):
+        seller = create_seller()
+        with self.captureOnCommitCallbacks(execute=True):
+            shirt = create_product(seller, 'Shirt', 2)
+            cap = create_product(seller, 'Cap', 2)
+        Product.objects.filter(id=cap.id).update(reserved_quantity=2)
+        
+        response = APIClient().get('/api/v1/products/', {'in_stock': 'true'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product['id'] for product in response.data['results']], [shirt.id])
+
+
+class CategoryConditionalGetTests(TestCase):
+    """ETags of category pages"""
+    
+    def setUp(self):
+        cache.clear()
+        self.parent = Category.objects.create(name='Men', slug='men')
+        self.child = Category.objects.create(name='Shirts', slug='shirts', parent=self.parent)
+        self.client = APIClient()
+    
+    def test_unchanged_category_is_not_modified(self):
+        etag = self.client.get('/api/v1/products/categories/men/')['ETag']
+        
+        response = self.client.get('/api/v1/products/categories/men/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+    
+    def test_etag_follows_the_subtree_rows(self):
+        etag = self.client.get('/api/v1/products/categories/men/')['ETag']
+        # Neither signals nor the cache namespace see this change
+        Category.objects.filter(id=self.child.id).update(name='Tees')
+        
+        response = self.client.get('/api/v1/products/categories/men/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['subcategories'][0]['name'], 'Tees')
+    
+    def test_no_etag_while_the_cache_is_down(self):
+        with mock.patch('apps.products.views.get_namespace_version', return_value=None):
+            response = self.client.get('/api/v1/products/categories/men/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+class ProductConditionalGetTests(TestCase):
+    """ETags of product pages"""
+    
+    def setUp(self):
+        cache.clear()
+        self.seller = create_seller()
+        self.product = create_product(self.seller, 'Shirt', 5)
+        self.url = f'/api/v1/products/{self.product.id}/'
+        self.client = APIClient()
+        patcher = mock.patch('apps.products.views.record_product_view', return_value=0)
+        self.record_view = patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_unchanged_product_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Revalidated pages still count as views
+        self.assertEqual(self.record_view.call_count, 2)
+    
+    def test_saved_product_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.product.name = 'Tee'
+        self.product.save()
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Tee')
+    
+    def test_bulk_update_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(self.seller.user)
+        self.client.post(
+            '/api/v1/products/seller/products/bulk-update/',
+            {'product_ids': [self.product.id], 'update_data': {'is_featured': True}}, format='json'
+        )
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_featured'])
+    
+    def test_unknown_product_is_not_found(self):
+        response = self.client.get(f'/api/v1/products/{self.product.id + 1}/')
+        self.assertEqual(response.status_code, 404)
+
+
+class TrendingProductsTests(TestCase):
+    """Validation of the trending window"""
+    
+    def test_hours_must_be_a_number(self):
+        response = APIClient().get('/api/v1/products/trending/', {'hours': 'abc'})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_negative_hours_use_the_smallest_window(self):
+        response = APIClient().get('/api/v1/products/trending/', {'hours': -5})
+        self.assertEqual(response.status_code, 200)
+
+
+class ActiveOfferTests(TestCase):
+    """Offers of listed products are resolved in one query"""
+    
+    def setUp(self):
+        self.seller = create_seller()
+        self.now = timezone.now()
+    
+    def create_products(self, count):
+        for i in range(count):
+            product = create_product(self.seller, f'Tee {i}', 1)
+            ProductOffer.objects.create(
+                product=product, seller=self.seller, offer_type='percentage', discount_percentage=10,
+                start_date=self.now - timedelta(days=1), end_date=self.now + timedelta(days=1)
+            )
+        # Ended offers are ignored
+        ProductOffer.objects.create(
+            product=product, seller=self.seller, offer_type='percentage', discount_percentage=50,
+            start_date=self.now - timedelta(days=3), end_date=self.now - timedelta(days=2)
+        )
+    
+    def serialize(self):
+        return ProductListSerializer(
+            Product.objects.order_by('id').with_active_offer(), many=True,
+            fields=['id', 'discounted_price', 'has_active_offer', 'savings_amount']
+        ).data
+    
+    def test_offer_fields_take_two_queries_for_any_page_size(self):
+        for count in (2, 8):
+            Product.objects.all().delete()
+            self.create_products(count)
+            
+            with self.assertNumQueries(2):
+                data = self.serialize()
+            self.assertEqual(len(data), count)
+            self.assertEqual({(row['discounted_price'], row['has_active_offer']) for row in data}, {(90.0, True)})
+
+
+class PrimaryImageTests(TestCase):
+    """Primary images of listed products are resolved in one query"""
+    
+    def test_image_takes_two_queries_for_any_page_size(self):
+        seller = create_seller()
+        for count in (2, 8):
+            Product.objects.all().delete()
+            primary_urls = []
+            for i in range(count):
+                product = create_product(seller, f'Tee {i}', 1)
+                ProductImage.objects.create(product=product, image=f'products/images/{i}-back.jpg', sort_order=0)
+                primary = ProductImage.objects.create(
+                    product=product, image=f'products/images/{i}.jpg', is_primary=True, sort_order=1
+                )
+                primary_urls.append(primary.image.url)
+            
+            with self.assertNumQueries(2):
+                data = ProductListSerializer(
+                    Product.objects.order_by('id').with_primary_image(), many=True, fields=['id', 'image']
+                ).data
+            self.assertEqual([row['image'] for row in data], primary_urls)
+
+
+class SearchDocumentTests(TestCase):
+    """Triggers keep Product.search_document current"""
+    
+    def setUp(self):
+        self.seller = create_seller()
+        self.product = create_product(self.seller, 'Linen Shirt', 1)
+    
+    def matches(self, term):
+        return Product.objects.filter(id=self.product.id, search_document=SearchQuery(term)).exists()
+    
+    def test_document_follows_product_tags_and_seller(self):
+        self.assertTrue(self.matches('linen'))
+        
+        Product.objects.filter(id=self.product.id).update(name='Denim Jacket', description='Heavy')
+        self.assertFalse(self.matches('linen'))
+        self.assertTrue(self.matches('denim'))
+        
+        self.product.tags.add('festival')
+        self.assertTrue(self.matches('festival'))
+        
+        SellerProfile.objects.filter(id=self.seller.id).update(business_name='Northwind')
+        self.assertTrue(self.matches('northwind'))
+    
+    def test_name_ranks_above_description(self):
+        other = create_product(self.seller, 'Shirt', 1)
+        Product.objects.filter(id=other.id).update(description='Woven from linen')
+        
+        response = APIClient().get('/api/v1/products/', {'search': 'linen'})
+        
+        self.assertEqual([product['id'] for product in response.data['results']][:2], [self.product.id, other.id])
+
+
+class SearchSuggestionTests(TestCase):
+    """Suggestions are kept in sync with the catalog and matched fuzzily"""
+    
+    def setUp(self):
+        self.seller = create_seller()
+        self.shirt = create_product(self.seller, 'Linen Shirt', 1)
+        self.trousers = create_product(self.seller, 'Linen Trousers', 1)
+        Category.objects.create(name='Linens', slug='linens')
+    
+    def suggest(self, query, limit=5):
+        return APIClient().get('/api/v1/products/search/suggestions/', {'q': query, 'limit': limit}).data['suggestions']
+    
+    def test_matches_every_kind(self):
+        suggestions = self.suggest('LINEN')
+        
+        self.assertCountEqual(suggestions['products'], ['Linen Shirt', 'Linen Trousers'])
+        self.assertEqual(suggestions['categories'], ['Linens'])
+        self.assertEqual(suggestions['sellers'], [])
+    
+    def test_limit_applies_per_kind(self):
+        suggestions = self.suggest('linen', limit=1)
+        
+        self.assertEqual(len(suggestions['products']), 1)
+        self.assertEqual(suggestions['categories'], ['Linens'])
+    
+    def test_saved_products_are_synced(self):
+        self.shirt.status = 'inactive'
+        self.shirt.save()
+        self.trousers.name = 'Linen Chinos'
+        self.trousers.save()
+        
+        self.assertEqual(self.suggest('linen')['products'], ['Linen Chinos'])
+    
+    def test_bulk_updated_products_are_synced(self):
+        Product.objects.filter(id=self.shirt.id).update(status='inactive')
+        Product.objects.filter(id=self.trousers.id).update(name='Linen Chinos')
+        
+        SearchSuggestion.sync_products([self.shirt.id, self.trousers.id])
+        self.assertEqual(self.suggest('linen')['products'], ['Linen Chinos'])
+
+
+class CatalogCacheTests(TestCase):
+    """Cached catalog responses and their invalidation"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Shirts', slug='shirts')
+    
+    def category_names(self):
+        return [category['name'] for category in self.client.get('/api/v1/products/categories/').data['results']]
+    
+    def test_responses_are_served_from_cache_until_invalidated(self):
+        self.assertEqual(self.category_names(), ['Shirts'])
+        
+        # Queryset updates send no signals, so the cached response stays
+        Category.objects.filter(id=self.category.id).update(name='Tees')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.category_names(), ['Shirts'])
+        
+        self.category.refresh_from_db()
+        self.category.save()
+        self.assertEqual(self.category_names(), ['Tees'])
+    
+    def test_bulk_product_updates_invalidate_products(self):
+        seller = create_seller()
+        product = create_product(seller, 'Shirt', 1, is_featured=True)
+        self.client.force_authenticate(seller.user)
+        self.assertEqual(len(self.client.get('/api/v1/products/featured/').data), 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                '/api/v1/products/seller/products/bulk-update/',
+                {'product_ids': [product.id], 'update_data': {'status': 'inactive'}}, format='json'
+            )
+        self.assertEqual(self.client.get('/api/v1/products/featured/').data, [])
+    
+    def test_responses_are_served_uncached_while_redis_is_down(self):
+        down = redis.ConnectionError('Connection refused')
+        with mock.patch.object(cache, 'get', side_effect=down), \
+                mock.patch.object(cache, 'get_or_set', side_effect=down), \
+                mock.patch.object(cache, 'set', side_effect=down), \
+                mock.patch.object(cache, 'incr', side_effect=down):
+            self.assertEqual(self.category_names(), ['Shirts'])
+            self.category.name = 'Tees'
+            self.category.save()
+            self.assertEqual(self.category_names(), ['Tees'])
+
+
+class InMemoryRedis:
+    """The hash commands used by the view count buffer, kept in a dict"""
+    
+    def __init__(self):
+        self.hashes = {}
+    
+    def hincrby(self, name, key, amount=1):
+        values = self.hashes.setdefault(name, {})
+        values[str(key)] = values.get(str(key), 0) + amount
+        return values[str(key)]
+    
+    def hgetall(self, name):
+        return dict(self.hashes.get(name, {}))
+    
+    def exists(self, name):
+        return int(name in self.hashes)
+    
+    def rename(self, source, destination):
+        if source not in self.hashes:
+            raise redis.ResponseError('no such key')
+        self.hashes[destination] = self.hashes.pop(source)
+    
+    def delete(self, name):
+        self.hashes.pop(name, None)
+
+
+class ProductViewCountTests(TestCase):
+    """Views are buffered in Redis and written to products in bulk"""
+    
+    def setUp(self):
+        seller = create_seller()
+        self.shirt = create_product(seller, 'Shirt', 1)
+        self.cap = create_product(seller, 'Cap', 1)
+        self.redis = InMemoryRedis()
+        patcher = mock.patch('apps.products.view_counts.get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def views(self):
+        return dict(Product.objects.values_list('id', 'views_count'))
+    
+    def test_views_are_written_on_flush(self):
+        self.assertEqual([record_product_view(self.shirt.id) for _ in range(3)], [1, 2, 3])
+        record_product_view(self.cap.id)
+        self.assertEqual(self.views(), {self.shirt.id: 0, self.cap.id: 0})
+        
+        # The same few statements for the whole batch, in a transaction
+        with self.assertNumQueries(6):
+            self.assertEqual(flush_product_views(), 2)
+        self.assertEqual(self.views(), {self.shirt.id: 3, self.cap.id: 1})
+        self.assertEqual(
+            dict(ProductActivityBucket.objects.values_list('product_id', 'views')),
+            {self.shirt.id: 3, self.cap.id: 1}
+        )
+        self.assertEqual(flush_product_views(), 0)
+    
+    def test_interrupted_flush_is_retried(self):
+        record_product_view(self.shirt.id)
+        # A flush that took the pending views but died before writing them
+        self.redis.rename('products:views:pending', 'products:views:flushing')
+        record_product_view(self.cap.id)
+        
+        flush_product_views()
+        self.assertEqual(self.views(), {self.shirt.id: 1, self.cap.id: 0})
+        flush_product_views()
+        self.assertEqual(self.views(), {self.shirt.id: 1, self.cap.id: 1})
+    
+    def test_views_are_dropped_while_redis_is_down(self):
+        with mock.patch.object(self.redis, 'hincrby', side_effect=redis.ConnectionError('Connection refused')):
+            self.assertEqual(record_product_view(self.shirt.id), 0)
+
+
+class RelatedProductsTests(TestCase):
+    """The precomputed related products index"""
+    
+    def setUp(self):
+        seller = create_seller()
+        shirts = Category.objects.create(name='Shirts', slug='shirts')
+        self.shirt = create_product(seller, 'Linen Shirt', 1, category=shirts)
+        self.shorts = create_product(seller, 'Linen Shorts', 1)
+        self.polo = create_product(seller, 'Polo', 1, category=shirts)
+        self.boots = create_product(seller, 'Boots', 1)
+        self.shirt.tags.add('linen', 'summer')
+        self.shorts.tags.add('linen', 'summer')
+    
+    def test_tags_rank_above_category_and_unrelated_products_are_left_out(self):
+        self.assertEqual(rebuild_related_products(), 4)
+        
+        entry = RelatedProducts.objects.get(product=self.shirt)
+        self.assertEqual(entry.related_ids, [self.shorts.id, self.polo.id])
+        self.assertEqual(entry.scores, sorted(entry.scores, reverse=True))
+    
+    def test_endpoint_skips_products_no_longer_active(self):
+        rebuild_related_products()
+        Product.objects.filter(id=self.shorts.id).update(status='inactive')
+        
+        response = APIClient().get(f'/api/v1/products/{self.shirt.id}/related/')
+        
+        self.assertEqual([product['id'] for product in response.data], [self.polo.id])
+    
+    def test_inactive_products_lose_their_entry(self):
+        rebuild_related_products()
+        Product.objects.filter(id=self.shorts.id).update(status='inactive')
+        
+        rebuild_related_products()
+        self.assertFalse(RelatedProducts.objects.filter(product=self.shorts).exists())
+        self.assertNotIn(self.shorts.id, RelatedProducts.objects.get(product=self.shirt).related_ids)
+
+
+class ProductFacetsTests(TestCase):
+    """Facet counts share the filters of the product list"""
+    
+    def setUp(self):
+        seller = create_seller()
+        self.shirts = Category.objects.create(name='Shirts', slug='shirts')
+        create_product(seller, 'Black Shirt', 1, category=self.shirts, availableSizes=['M', 'L'], availableColors=['Black'])
+        create_product(seller, 'White Shirt', 1, category=self.shirts, availableSizes=['M'], availableColors=['White'])
+        cap = create_product(seller, 'Cap', 1, availableSizes=['One size'], availableColors=['Black'])
+        cap.tags.add('summer')
+        # Legacy rows may hold a plain string
+        Product.objects.filter(id=cap.id).update(availableSizes='One size')
+    
+    def facets(self, **params):
+        response = APIClient().get('/api/v1/products/facets/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+    
+    def test_counts_per_facet(self):
+        facets = self.facets()
+        
+        self.assertEqual(facets['total'], 3)
+        self.assertEqual(facets['sizes'], [{'value': 'M', 'count': 2}, {'value': 'L', 'count': 1}])
+        self.assertEqual(facets['colors'], [{'value': 'Black', 'count': 2}, {'value': 'White', 'count': 1}])
+        # Products saved without a category get the default one
+        self.assertEqual(
+            [(row['slug'], row['count']) for row in facets['categories']], [('shirts', 2), ('general-clothing', 1)]
+        )
+        self.assertEqual([(row['name'], row['count']) for row in facets['tags']], [('summer', 1)])
+        self.assertEqual(sum(row['count'] for row in facets['price_ranges']), 3)
+    
+    def test_counts_follow_list_filters(self):
+        facets = self.facets(category=self.shirts.id)
+        
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(facets['colors'], [{'value': 'Black', 'count': 1}, {'value': 'White', 'count': 1}])
+        self.assertEqual(facets['tags'], [])
+
+
+class AttributeFilterTests(TestCase):
+    """Size, color and attribute filters on the attributes_doc JSONB document"""
+    
+    def setUp(self):
+        self.seller = create_seller()
+        self.shirt = create_product(self.seller, 'Shirt', 1, availableSizes=['M', 'L'], availableColors=['Black'])
+        self.tee = create_product(self.seller, 'Tee', 1, availableSizes=['S'], availableColors=['White'])
+        ProductVariant.objects.create(product=self.tee, sku='TEE-XL', size='XL', color='Navy')
+        sleeve = ProductAttributeType.objects.create(name='Sleeve', slug='sleeve', input_type='select')
+        ProductAttribute.objects.create(product=self.shirt, attribute_type=sleeve, value='Full sleeve')
+        ProductAttribute.objects.create(product=self.tee, attribute_type=sleeve, value='["Half sleeve"]')
+    
+    def listed(self, **params):
+        return sorted(product['id'] for product in APIClient().get('/api/v1/products/', params).data['results'])
+    
+    def test_sizes_and_colors_include_variants(self):
+        self.assertEqual(self.listed(size='m'), [self.shirt.id])
+        self.assertEqual(self.listed(size='XL'), [self.tee.id])
+        self.assertEqual(self.listed(size='m,xl'), sorted([self.shirt.id, self.tee.id]))
+        self.assertEqual(self.listed(color='navy'), [self.tee.id])
+    
+    def test_attributes_must_all_match(self):
+        self.assertEqual(self.listed(attributes='sleeve:half sleeve'), [self.tee.id])
+        self.assertEqual(
+            self.listed(attributes='sleeve:half sleeve,sleeve:full sleeve'), sorted([self.shirt.id, self.tee.id])
+        )
+        self.assertEqual(self.listed(attributes='sleeve:half sleeve', color='black'), [])
+    
+    def test_bulk_size_updates_are_filterable(self):
+        client = APIClient()
+        client.force_authenticate(self.seller.user)
+        client.post(
+            '/api/v1/products/seller/products/bulk-update/',
+            {'product_ids': [self.shirt.id], 'update_data': {'availableSizes': ['XXL']}}, format='json'
+        )
+        
+        self.assertEqual(self.listed(size='xxl'), [self.shirt.id])
+        self.assertEqual(self.listed(size='m'), [])
+
+
+class ProductCardTests(TestCase):
+    """Listing cards are rebuilt with their products and read in one query"""
+    
+    def setUp(self):
+        self.seller = create_seller()
+    
+    def test_cards_follow_saved_products(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = create_product(self.seller, 'Shirt', 1)
+        self.assertEqual(ProductCard.objects.get(product=product).payload['name'], 'Shirt')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = 'Linen Shirt'
+            product.save()
+        self.assertEqual(ProductCard.objects.get(product=product).payload['name'], 'Linen Shirt')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            product.status = 'inactive'
+            product.save()
+        self.assertFalse(ProductCard.objects.filter(product=product).exists())
+    
+    def test_cards_match_the_serializer(self):
+        product = create_product(self.seller, 'Shirt', 1)
+        refresh_product_cards([product.id])
+        
+        with self.assertNumQueries(1):
+            data = serialize_product_cards([product.id])
+        self.assertEqual(data, [dict(ProductListSerializer(Product.objects.get(id=product.id)).data)])
+    
+    def test_products_without_cards_are_serialized(self):
+        products = [create_product(self.seller, f'Tee {i}', 1) for i in range(3)]
+        refresh_product_cards([products[0].id])
+        ProductCard.objects.filter(product=products[0]).update(payload={'id': products[0].id, 'name': 'From card'})
+        
+        data = serialize_product_cards([products[2].id, products[0].id, products[1].id])
+        self.assertEqual([row['name'] for row in data], ['Tee 2', 'From card', 'Tee 1'])
+    
+    def test_offers_that_ended_are_dropped_on_read(self):
+        now = timezone.now()
+        product = create_product(self.seller, 'Shirt', 1)
+        ProductOffer.objects.create(
+            product=product, seller=self.seller, offer_type='percentage', discount_percentage=10,
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1)
+        )
+        refresh_product_cards([product.id])
+        self.assertTrue(serialize_product_cards([product.id])[0]['has_active_offer'])
+        
+        ProductCard.objects.filter(product=product).update(offer_ends_at=now - timedelta(minutes=1))
+        card = serialize_product_cards([product.id])[0]
+        self.assertFalse(card['has_active_offer'])
+        self.assertEqual(card['discounted_price'], card['original_price'])
+    
+    def test_listing_queries_do_not_grow_with_the_page(self):
+        client = APIClient()
+        query_counts = []
+        for count in (2, 8):
+            Product.objects.all().delete()
+            cache.clear()
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(count):
+                    create_product(self.seller, f'Tee {i}', 1)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(len(client.get('/api/v1/products/').data['results']), count)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4), 'red').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def fake_response(status_code=200, location=None, content=b''):
+    response = mock.MagicMock(status_code=status_code, is_redirect=location is not None)
+    response.headers = {'Location': location} if location else {}
+    response.raw.read.return_value = content
+    return response
+
+
+def resolve(addresses):
+    """getaddrinfo() stand-in mapping host names to addresses"""
+    def getaddrinfo(host, port):
+        if host not in addresses:
+            raise socket.gaierror('unknown host')
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (addresses[host], port or 0))]
+    return getaddrinfo
+
+
+class ImageDownloadTests(TestCase):
+    """Downloads of imported product images from public addresses only"""
+    
+    def setUp(self):
+        patcher = mock.patch('apps.products.imports.socket.getaddrinfo', side_effect=resolve({
+            'cdn.example.com': '93.184.216.34',
+            'mirror.example.com': '93.184.216.35',
+            'internal.example.com': '10.0.0.5',
+        }))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_private_addresses_are_rejected(self):
+        self.assertIsNone(public_address('http://internal.example.com/a.png'))
+        self.assertIsNone(public_address('http://127.0.0.1/a.png'))
+        self.assertIsNone(public_address('file:///etc/passwd'))
+        self.assertEqual(public_address('https://cdn.example.com/a.png'), '93.184.216.34')
+    
+    def test_request_is_pinned_to_the_checked_address(self):
+        with mock.patch('apps.products.imports.requests.Session') as session_class:
+            pinned_get('https://cdn.example.com:8443/a.png', '93.184.216.34')
+        
+        url = session_class.return_value.get.call_args.args[0]
+        kwargs = session_class.return_value.get.call_args.kwargs
+        self.assertEqual(url, 'https://93.184.216.34:8443/a.png')
+        self.assertEqual(kwargs['headers'], {'Host': 'cdn.example.com:8443'})
+        self.assertFalse(kwargs['allow_redirects'])
+    
+    def test_every_redirect_is_checked(self):
+        responses = [
+            fake_response(302, location='https://mirror.example.com/a.png'),
+            fake_response(content=png_bytes()),
+        ]
+        with mock.patch('apps.products.imports.pinned_get', side_effect=[
+            (mock.MagicMock(), response) for response in responses
+        ]) as get:
+            self.assertEqual(download_image('https://cdn.example.com/a.png'), png_bytes())
+        
+        self.assertEqual(
+            [call.args for call in get.call_args_list],
+            [('https://cdn.example.com/a.png', '93.184.216.34'), ('https://mirror.example.com/a.png', '93.184.216.35')]
+        )
+    
+    def test_redirect_to_a_private_address_is_not_followed(self):
+        redirect = fake_response(302, location='http://internal.example.com/a.png')
+        with mock.patch('apps.products.imports.pinned_get', return_value=(mock.MagicMock(), redirect)) as get:
+            with self.assertRaisesMessage(ValueError, 'not a public'):
+                download_image('https://cdn.example.com/a.png')
+        self.assertEqual(get.call_count, 1)
+    
+    def test_redirects_are_limited(self):
+        redirect = fake_response(302, location='/again.png')
+        with mock.patch('apps.products.imports.pinned_get', return_value=(mock.MagicMock(), redirect)) as get:
+            with self.assertRaisesMessage(ValueError, 'Too many redirects'):
+                download_image('https://cdn.example.com/a.png')
+        self.assertEqual(get.call_count, MAX_IMAGE_REDIRECTS + 1)
+
+
+class ProductImportTests(TestCase):
+    """Streaming catalog imports"""
+    
+    def test_rows_are_imported_chunk_by_chunk(self):
+        seller = create_seller()
+        job = ProductImportJob.objects.create(
+            seller=seller,
+            file=ContentFile(b'name,price,stock_quantity\nShirt,100,5\nTee,oops,2\n\nJeans,300,1\n', name='catalog.csv')
+        )
+        self.addCleanup(job.file.delete, save=False)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            created = run_product_import(job.pk, chunk_size=2)
+        
+        job.refresh_from_db()
+        self.assertEqual(created, 2)
+        self.assertEqual(
+            (job.status, job.total_rows, job.processed_rows, job.created_count, job.error_count),
+            ('completed', 3, 3, 2, 1)
+        )
+        self.assertEqual(job.errors[0]['row'], 3)
+        self.assertEqual(
+            sorted(Product.objects.filter(seller=seller).values_list('name', flat=True)), ['Jeans', 'Shirt']
+        )
+
+
+class ImageRenditionTests(TestCase):
+    """Responsive renditions of product images"""
+    
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.product = create_product(create_seller(), 'Shirt', 1)
+    
+    def create_image(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 600), 'red').save(buffer, format='PNG')
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(
+                product=self.product, image=ContentFile(buffer.getvalue(), name='shirt.png'), is_primary=True
+            )
+        image.refresh_from_db()
+        return image
+    
+    def test_renditions_are_generated_on_upload(self):
+        image = self.create_image()
+        
+        sizes = image.renditions['sizes']
+        # Renditions are never larger than the original
+        self.assertEqual({name: size['width'] for name, size in sizes.items()}, {'thumb': 200, 'card': 480, 'zoom': 800})
+        self.assertTrue(all(image.image.storage.exists(sizes['card'][extension]) for extension in ('webp', 'jpeg')))
+        self.assertEqual(image_srcset(image)['webp'].count('w, '), 2)
+        self.assertFalse(build_image_renditions(image.pk))
+    
+    def test_replaced_image_gets_new_renditions(self):
+        image = self.create_image()
+        old_card = image.renditions['sizes']['card']['webp']
+        
+        buffer = io.BytesIO()
+        Image.new('RGB', (300, 300), 'blue').save(buffer, format='PNG')
+        image.image = ContentFile(buffer.getvalue(), name='shirt-blue.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            image.save()
+        image.refresh_from_db()
+        
+        self.assertEqual(image.renditions['source'], image.image.name)
+        self.assertEqual(image.renditions['sizes']['card']['width'], 300)
+        self.assertFalse(image.image.storage.exists(old_card))
+
+
+class SparseFieldsTests(TestCase):
+    """`fields` and `expand` query parameters of product endpoints"""
+    
+    def setUp(self):
+        cache.clear()
+        self.product = create_product(create_seller(), 'Shirt', 5)
+        self.url = f'/api/v1/products/{self.product.id}/'
+        self.client = APIClient()
+        patcher = mock.patch('apps.products.views.record_product_view', return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_fields_keep_only_the_named_fields(self):
+        response = self.client.get(self.url, {'fields': 'name,price'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {'id', 'name', 'price'})
+    
+    def test_expandable_fields_are_left_out_by_default(self):
+        self.assertNotIn('attributes', self.client.get(self.url).data)
+        
+        response = self.client.get(self.url, {'fields': 'name', 'expand': 'attributes'})
+        self.assertEqual(set(response.data), {'id', 'name', 'attributes'})
+    
+    def test_unknown_fields_are_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'fields': 'name,secret'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'expand': 'seller'}).status_code, 400)
+    
+    def test_sparse_fields_load_less(self):
+        with CaptureQueriesContext(connection) as full:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as sparse:
+            self.client.get(self.url, {'fields': 'name'})
+        
+        self.assertLess(len(sparse), len(full))
+    
+    def test_listing_cards_are_trimmed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_product_cards([self.product.id])
+        
+        response = self.client.get('/api/v1/products/', {'fields': 'name,slug'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'slug'})
+
+
+class CategoryPathTests(TestCase):
+    """Materialized paths of the category tree"""
+    
+    def setUp(self):
+        self.men = Category.objects.create(name='Men', slug='men')
+        self.women = Category.objects.create(name='Women', slug='women')
+        self.shirts = Category.objects.create(name='Shirts', slug='shirts', parent=self.men)
+        self.formal = Category.objects.create(name='Formal', slug='formal', parent=self.shirts)
+    
+    def path_and_depth(self, category):
+        category.refresh_from_db(fields=['path', 'depth'])
+        return category.path, category.depth
+    
+    def test_new_categories_get_their_path(self):
+        self.assertEqual(self.path_and_depth(self.men), (f'{self.men.pk}/', 0))
+        self.assertEqual(self.path_and_depth(self.formal), (f'{self.men.pk}/{self.shirts.pk}/{self.formal.pk}/', 2))
+        self.assertEqual(set(self.men.get_descendants()), {self.shirts, self.formal})
+    
+    def test_reparenting_moves_the_subtree(self):
+        self.shirts.parent = self.women
+        self.shirts.save()
+        
+        self.assertEqual(self.path_and_depth(self.shirts), (f'{self.women.pk}/{self.shirts.pk}/', 1))
+        self.assertEqual(self.path_and_depth(self.formal), (f'{self.women.pk}/{self.shirts.pk}/{self.formal.pk}/', 2))
+        self.assertEqual(list(self.men.get_descendants()), [])
+    
+    def test_moving_to_the_root_shortens_descendants(self):
+        self.shirts.parent = None
+        self.shirts.save(update_fields=['parent'])
+        
+        self.assertEqual(self.path_and_depth(self.shirts), (f'{self.shirts.pk}/', 0))
+        self.assertEqual(self.path_and_depth(self.formal), (f'{self.shirts.pk}/{self.formal.pk}/', 1))
+    
+    def test_category_cannot_move_under_its_subtree(self):
+        self.men.parent = self.formal
+        with self.assertRaises(ValueError):
+            self.men.save()
+        self.assertEqual(self.path_and_depth(self.men), (f'{self.men.pk}/', 0))
+
+
+class TagUsageTests(TestCase):
+    """Active product counts per tag"""
+    
+    def setUp(self):
+        cache.clear()
+        self.seller = create_seller()
+        self.shirt = create_product(self.seller, 'Shirt', 1)
+        self.tee = create_product(self.seller, 'Tee', 1)
+        self.shirt.tags.add('cotton', 'summer')
+        self.tee.tags.add('cotton')
+    
+    def usage(self):
+        return dict(TagUsage.objects.values_list('name', 'product_count'))
+    
+    def test_tagging_updates_the_counts(self):
+        self.assertEqual(self.usage(), {'cotton': 2, 'summer': 1})
+        
+        self.tee.tags.remove('cotton')
+        self.assertEqual(self.usage(), {'cotton': 1, 'summer': 1})
+    
+    def test_only_active_products_are_counted(self):
+        self.shirt.status = 'inactive'
+        self.shirt.save()
+        self.assertEqual(self.usage(), {'cotton': 1, 'summer': 0})
+        
+        client = APIClient()
+        client.force_authenticate(self.seller.user)
+        client.post(
+            '/api/v1/products/seller/products/bulk-update/',
+            {'product_ids': [self.tee.id], 'update_data': {'status': 'inactive'}}, format='json'
+        )
+        self.assertEqual(self.usage(), {'cotton': 0, 'summer': 0})
+    
+    def test_tag_list_is_ranked_by_usage(self):
+        response = APIClient().get('/api/v1/products/tags/')
+        
+        self.assertEqual(
+            [(tag['name'], tag['usage_count']) for tag in response.data['results']], [('cotton', 2), ('summer', 1)]
+        )
+
+
+class OfferLifecycleTests(TestCase):
+    """Effective prices following offers across their start and end dates"""
+    
+    def setUp(self):
+        cache.clear()
+        self.seller = create_seller()
+        self.product = create_product(self.seller, 'Shirt', 1)
+        self.now = timezone.now()
+        self.offer = ProductOffer.objects.create(
+            product=self.product, seller=self.seller, offer_type='percentage', discount_percentage=20,
+            start_date=self.now + timedelta(hours=1), end_date=self.now + timedelta(hours=3)
+        )
+    
+    def effective_price(self):
+        self.product.refresh_from_db(fields=['effective_price', 'current_offer'])
+        return self.product.effective_price, self.product.current_offer_id
+    
+    def test_price_follows_the_offer_dates(self):
+        self.assertEqual(self.effective_price(), (100, None))
+        
+        self.assertEqual(apply_offer_lifecycle(self.now + timedelta(hours=2)), {self.product.id})
+        self.assertEqual(self.effective_price(), (80, self.offer.id))
+        
+        self.assertEqual(apply_offer_lifecycle(self.now + timedelta(hours=4)), {self.product.id})
+        self.assertEqual(self.effective_price(), (100, None))
+        self.offer.refresh_from_db()
+        self.assertEqual(self.offer.status, 'expired')
+    
+    def test_unchanged_offers_are_left_alone(self):
+        apply_offer_lifecycle(self.now + timedelta(hours=2))
+        
+        self.assertEqual(apply_offer_lifecycle(self.now + timedelta(hours=2, minutes=30)), set())
+    
+    def test_newer_live_offer_wins(self):
+        apply_offer_lifecycle(self.now + timedelta(hours=2))
+        newer = ProductOffer.objects.create(
+            product=self.product, seller=self.seller, offer_type='flat', discount_amount=30,
+            start_date=self.now, end_date=self.now + timedelta(hours=3)
+        )
+        
+        apply_offer_lifecycle(self.now + timedelta(hours=2))
+        self.assertEqual(self.effective_price(), (70, newer.id))
+    
+    def test_price_changes_keep_the_offer(self):
+        apply_offer_lifecycle(self.now + timedelta(hours=2))
+        product = Product.objects.get(id=self.product.id)
+        
+        with mock.patch('apps.products.offers.timezone.now', return_value=self.now + timedelta(hours=2)):
+            product.price = 200
+            product.save()
+        self.assertEqual(self.effective_price(), (160, self.offer.id))
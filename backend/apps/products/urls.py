@@ -2,14 +2,15 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from .views import (
-    CategoryListCreateView, CategoryDetailView,
-    ProductListView, ProductDetailView, ProductCreateView, 
+    CategoryListCreateView, CategoryTreeView, CategoryDetailView,
+    ProductListView, ProductFacetsView, ProductDetailView, ProductCreateView, 
     ProductUpdateView, ProductDeleteView, SellerProductListView,
     ProductImageListCreateView, ProductImageDetailView,
     ProductVideoListCreateView, ProductVideoDetailView,
     ProductAttributeTypeListView, TagListView,
     featured_products_view, trending_products_view, 
     related_products_view, bulk_update_products_view,
+    ProductImportListCreateView, ProductImportDetailView,
     ProductOfferListCreateView, ProductOfferDetailView,
     seller_products_for_offers_view, seller_active_offers_view, store_active_offers_view,
     search_suggestions, trending_searches
@@ -21,6 +22,7 @@ router = DefaultRouter()
 urlpatterns = [
     # Categories
     path('categories/', CategoryListCreateView.as_view(), name='category_list_create'),
+    path('categories/tree/', CategoryTreeView.as_view(), name='category_tree'),
     path('categories/<str:slug>/', CategoryDetailView.as_view(), name='category_detail'),
     
     # Tags (must come before product detail to avoid conflict)
@@ -32,6 +34,7 @@ urlpatterns = [
     
     # Products - Public
     path('', ProductListView.as_view(), name='product_list'),
+    path('facets/', ProductFacetsView.as_view(), name='product_facets'),
     path('featured/', featured_products_view, name='featured_products'),
     path('trending/', trending_products_view, name='trending_products'),
     path('<str:product_id>/related/', related_products_view, name='related_products'),
@@ -44,6 +47,8 @@ urlpatterns = [
     path('seller/products/<str:pk>/delete/', ProductDeleteView.as_view(), name='product_delete'),
     path('seller/products/bulk-update/', bulk_update_products_view, name='bulk_update_products'),
     path('seller/products/for-offers/', seller_products_for_offers_view, name='seller_products_for_offers'),
+    path('seller/products/imports/', ProductImportListCreateView.as_view(), name='product_import_list_create'),
+    path('seller/products/imports/<int:pk>/', ProductImportDetailView.as_view(), name='product_import_detail'),
     
     # Product Offers - Seller Management
     path('seller/offers/', ProductOfferListCreateView.as_view(), name='seller_offer_list_create'),
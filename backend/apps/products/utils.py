@@ -1,5 +1,5 @@
 import os
-from PIL import Image
+from PIL import Image, ImageOps
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from io import BytesIO
@@ -86,6 +86,87 @@ def generate_thumbnail(image_field, size=(300, 300)):
         return None
 
 
+# Longest edge in pixels of the renditions made for every product image
+IMAGE_RENDITION_SIZES = {
+    'thumb': 200,
+    'card': 480,
+    'zoom': 1600,
+}
+
+# Renditions are written in each of these formats: (Pillow format, file extension, quality)
+IMAGE_RENDITION_FORMATS = [
+    ('WEBP', 'webp', 80),
+    ('JPEG', 'jpeg', 85),
+]
+
+
+def rendition_name(original_name, size_name, extension):
+    """Storage name of a rendition, stored next to the original"""
+    root, _ = os.path.splitext(original_name)
+    return f"{root}_{size_name}.{extension}"
+
+
+def generate_renditions(image_field):
+    """
+    Generate the resized WebP and JPEG renditions of an image and save them
+    next to the original, in the same storage.
+    
+    The original is read once; renditions are never larger than it.
+    
+    Args:
+        image_field: Django ImageField instance
+    
+    Returns:
+        Dict of size name to {"width", "height", "webp", "jpeg"} with storage names
+    """
+    renditions = {}
+    
+    image_field.open('rb')
+    try:
+        with Image.open(image_field) as original:
+            original.load()
+    finally:
+        image_field.close()
+    
+    img = ImageOps.exif_transpose(original)
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+    
+    for size_name, max_edge in IMAGE_RENDITION_SIZES.items():
+        resized = img.copy()
+        resized.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        rendition = {'width': resized.width, 'height': resized.height}
+        
+        for image_format, extension, quality in IMAGE_RENDITION_FORMATS:
+            output_img = resized
+            # JPEG has no alpha channel: flatten transparent images on white
+            if image_format == 'JPEG' and resized.mode == 'RGBA':
+                output_img = Image.new('RGB', resized.size, (255, 255, 255))
+                output_img.paste(resized, mask=resized.getchannel('A'))
+            
+            output = BytesIO()
+            output_img.save(output, format=image_format, quality=quality, optimize=True)
+            
+            name = rendition_name(image_field.name, size_name, extension)
+            rendition[extension] = image_field.storage.save(name, ContentFile(output.getvalue()))
+        
+        renditions[size_name] = rendition
+    
+    return renditions
+
+
+def delete_renditions(renditions, storage=default_storage):
+    """Delete the files of a renditions map built by generate_renditions()"""
+    for rendition in renditions.values():
+        for _, extension, _ in IMAGE_RENDITION_FORMATS:
+            name = rendition.get(extension)
+            if name:
+                try:
+                    storage.delete(name)
+                except Exception as e:
+                    print(f"Error deleting rendition {name}: {e}")
+
+
 def get_image_dimensions(image_field):
     """
     Get dimensions of an image without loading it fully into memory.
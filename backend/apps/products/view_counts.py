@@ -0,0 +1,67 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, When
+import redis
+
+from apps.analytics.trending import add_bucket_views
+from justclothing.cache import get_redis_client
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# Product views are accumulated in a Redis hash (product id -> pending views)
+# and written to Product.views_count (and the hourly trending buckets) in bulk
+# by the flush_product_view_counts task.
+PENDING_VIEWS_KEY = 'products:views:pending'
+FLUSHING_VIEWS_KEY = 'products:views:flushing'
+FLUSH_BATCH_SIZE = 500
+
+
+def record_product_view(product_id):
+    """
+    Buffer one view of a product.
+    
+    Returns the number of views not yet flushed to the database, so callers can
+    report an up-to-date count without touching Postgres.
+    """
+    try:
+        return get_redis_client().hincrby(PENDING_VIEWS_KEY, product_id, 1)
+    except redis.RedisError as e:
+        logger.warning(f"Failed to record view for product {product_id}: {e}")
+        return 0
+
+
+def flush_product_views():
+    """Apply buffered view counts to Product.views_count; returns the number of products updated"""
+    client = get_redis_client()
+    
+    # A leftover flushing hash means the previous flush did not finish; retry it
+    # before taking the next batch of pending views.
+    if not client.exists(FLUSHING_VIEWS_KEY):
+        try:
+            client.rename(PENDING_VIEWS_KEY, FLUSHING_VIEWS_KEY)
+        except redis.ResponseError:
+            # No pending views
+            return 0
+    
+    pending = [
+        (int(product_id), int(views))
+        for product_id, views in client.hgetall(FLUSHING_VIEWS_KEY).items()
+    ]
+    
+    updated_count = 0
+    with transaction.atomic():
+        for start in range(0, len(pending), FLUSH_BATCH_SIZE):
+            batch = pending[start:start + FLUSH_BATCH_SIZE]
+            updated_count += Product.objects.filter(
+                id__in=[product_id for product_id, _ in batch]
+            ).update(views_count=F('views_count') + Case(
+                *[When(id=product_id, then=views) for product_id, views in batch],
+                default=0,
+                output_field=IntegerField()
+            ))
+            add_bucket_views(batch)
+    
+    client.delete(FLUSHING_VIEWS_KEY)
+    return updated_count
@@ -1,30 +1,55 @@
 from django.shortcuts import render
 from rest_framework import generics, filters, status, permissions, serializers
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, F, Count
+from django.db import connection, transaction
+from django.db.models import Q, F, Count, Min, Max, OuterRef, Subquery
 from django.shortcuts import get_object_or_404
-from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank, TrigramSimilarity
-from django.db.models import Case, When, FloatField, IntegerField
-
-from .models import Category, Product, ProductAttributeType, ProductImage, ProductVideo, ProductOffer
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import IntegerField, FloatField
+from django.db.models.functions import Cast, Floor
+from django.contrib.contenttypes.models import ContentType
+import math
+
+from .models import (
+    Category, Product, ProductAttributeType, ProductImage, ProductVideo, ProductOffer, RelatedProducts,
+    ProductImportJob, SearchSuggestion, TagUsage, link_category_tree, load_category_subtrees,
+    refresh_attributes_docs
+)
 from .serializers import (
-    CategorySerializer, CategoryCreateSerializer,
+    CategorySerializer, CategoryCreateSerializer, CategoryTreeSerializer,
     ProductListSerializer, ProductDetailSerializer, ProductCreateUpdateSerializer,
     ProductAttributeTypeSerializer, ProductImageSerializer, ProductVideoSerializer,
     ProductSearchSerializer, ProductOfferSerializer, ProductOfferCreateSerializer,
-    ProductWithOfferSerializer
+    ProductWithOfferSerializer, ProductImportJobSerializer,
+    sparse_fields_from_request, sparse_queryset
+)
+from .filters import ProductFilter, ProductOrderingFilter
+from .cards import (
+    product_card_map, queue_product_card_refresh, requested_card_fields,
+    serialize_product_cards
+)
+from .offers import refresh_effective_prices
+from .view_counts import record_product_view
+from .tasks import run_product_import_task
+from .pagination import ProductPageNumberPagination, ProductCursorPagination, SearchResultsPagination
+from taggit.models import TaggedItem
+from justclothing.cache import (
+    cache_catalog_response, conditional_response, get_namespace_version, invalidate_namespaces,
+    make_etag, not_modified_response, set_validator_headers
 )
-from .filters import ProductFilter
-from .pagination import ProductPageNumberPagination, SearchResultsPagination
-from taggit.models import Tag
 
 
+@method_decorator(cache_catalog_response('categories'), name='get')
 class CategoryListCreateView(generics.ListCreateAPIView):
     """List categories and create new ones (auto-add from frontend)"""
-    queryset = Category.objects.all()
+    queryset = Category.objects.select_related('parent')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -35,106 +60,124 @@ class CategoryListCreateView(generics.ListCreateAPIView):
         if self.request.method == 'POST':
             return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        
+        page = self.paginate_queryset(queryset)
+        categories = page if page is not None else list(queryset)
+        # Subcategories of the whole page in one query
+        load_category_subtrees(categories)
+        
+        serializer = self.get_serializer(categories, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+
+@method_decorator(cache_catalog_response('categories'), name='get')
+class CategoryTreeView(APIView):
+    """The whole tree of active categories, read in one query"""
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request, *args, **kwargs):
+        categories = link_category_tree(Category.objects.filter(is_active=True))
+        # Subtrees under an inactive category are hidden with it
+        roots = [category for category in categories if category.parent_id is None]
+        return Response(CategoryTreeSerializer(roots, many=True).data)
+
+
+def get_category_validators(request, slug):
+    """
+    ETag of a category page from the rows it shows (the category, its parent's
+    name and its subtree), as categories have no timestamps. The cache
+    namespace version alone could repeat after a flush, and is unknown while
+    the cache is down, when requests are handled as usual.
+    """
+    version = get_namespace_version('categories')
+    if version is None:
+        return None
+    category = Category.objects.filter(slug=slug).values_list('path', 'parent__name').first()
+    if category is None:
+        return None
+    path, parent_name = category
+    subtree = Category.objects.filter(path__startswith=path).order_by('path').values_list(
+        'id', 'name', 'slug', 'description', 'parent_id', 'is_active'
+    )
+    return make_etag(slug, version, parent_name, list(subtree)), None
 
 
+@method_decorator(conditional_response(get_category_validators), name='get')
 class CategoryDetailView(generics.RetrieveAPIView):
     """Get category details"""
-    queryset = Category.objects.all()
+    queryset = Category.objects.select_related('parent')
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'slug'
 
 
+class SparseFieldsViewMixin:
+    """Passes the `fields` and `expand` query parameters on to a SparseFieldsMixin serializer"""
+    
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = sparse_fields_from_request(self.request)
+        kwargs.setdefault('fields', fields)
+        kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+
 class ProductListView(generics.ListAPIView):
     """List products with comprehensive filtering and enhanced search"""
     serializer_class = ProductListSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductOrderingFilter]
     filterset_class = ProductFilter
     ordering_fields = ['price', 'created_at', 'rating', 'sales_count']
+    # Prices sort by what shoppers pay, offers included
+    ordering_aliases = {'price': 'effective_price'}
     ordering = ['-created_at']
     pagination_class = ProductPageNumberPagination
-
+    
     def get_queryset(self):
-        queryset = Product.objects.select_related(
-            'seller', 'category', 'collection'
-        ).prefetch_related(
-            'images', 'tags', 'variants'
-        ).filter(status='active')
+        # Only filters and orders products; the page is rendered from product cards
+        queryset = Product.objects.filter(status='active')
+        
+        # Infinite scroll clients opt into keyset pagination by sending `cursor`
+        # (empty for the first page)
+        use_cursor = self.request.query_params.get('cursor') is not None
+        if use_cursor:
+            self.pagination_class = ProductCursorPagination
         
         # Enhanced search functionality with PostgreSQL full-text search
         search = self.request.query_params.get('search')
         if search:
             # Use custom pagination for search results
-            self.pagination_class = SearchResultsPagination
+            if not use_cursor:
+                self.pagination_class = SearchResultsPagination
             
-            search_query = SearchQuery(search)
+            # Rank by relevance unless the client asked for an explicit ordering
+            self.ordering = ['-rank', '-similarity', '-created_at']
             
-            # Create search vector with weighted fields
-            search_vector = (
-                SearchVector('name', weight='A') +
-                SearchVector('description', weight='B') +
-                SearchVector('seller__business_name', weight='C') +
-                SearchVector('tags__name', weight='D')
-            )
+            search_query = SearchQuery(search)
             
-            # Apply search with ranking
+            # search_document is a stored, GIN-indexed tsvector; the trigram match on
+            # name keeps fuzzy/partial matches (typos, prefixes while typing)
+            # Scores are cast to double precision so that cursor values round-trip exactly
             queryset = queryset.annotate(
-                search=search_vector,
-                rank=SearchRank(search_vector, search_query),
-                # Add trigram similarity for fuzzy matching
-                similarity=TrigramSimilarity('name', search)
+                rank=Cast(SearchRank(F('search_document'), search_query), FloatField()),
+                similarity=Cast(TrigramSimilarity('name', search), FloatField())
             ).filter(
-                Q(search=search_query) | Q(similarity__gt=0.1)
-            ).distinct().order_by('-rank', '-similarity', '-created_at')
-            
-            # If no results found with full-text search, fall back to basic search
-            if not queryset.exists():
-                queryset = Product.objects.select_related(
-                    'seller', 'category', 'collection'
-                ).prefetch_related(
-                    'images', 'tags', 'variants'
-                ).filter(
-                    status='active'
-                ).filter(
-                    Q(name__icontains=search) |
-                    Q(description__icontains=search) |
-                    Q(seller__business_name__icontains=search) |
-                    Q(tags__name__icontains=search)
-                ).distinct().annotate(
-                    rank=Case(
-                        When(name__icontains=search, then=1.0),
-                        When(description__icontains=search, then=0.8),
-                        When(seller__business_name__icontains=search, then=0.6),
-                        When(tags__name__icontains=search, then=0.4),
-                        default=0.0,
-                        output_field=FloatField()
-                    )
-                ).order_by('-rank', '-created_at')
-        
-        # Category filtering
-        category = self.request.query_params.get('category')
-        if category:
-            queryset = queryset.filter(category__slug=category)
+                Q(search_document=search_query) |
+                Q(name__trigram_similar=search) |
+                Q(name__icontains=search)
+            ).order_by('-rank', '-similarity', '-created_at')
         
         # BUSINESS TYPE FILTERING (Main homepage categories)
         business_type = self.request.query_params.get('business_type')
         if business_type:
             queryset = queryset.filter(seller__business_type=business_type)
         
-        # Price filtering
-        min_price = self.request.query_params.get('min_price')
-        max_price = self.request.query_params.get('max_price')
-        
-        if min_price:
-            queryset = queryset.filter(base_price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(base_price__lte=max_price)
-        
-        # Stock filtering
-        in_stock = self.request.query_params.get('in_stock')
-        if in_stock and in_stock.lower() == 'true':
-            queryset = queryset.filter(stock_quantity__gt=0)
+        # `in_stock` is handled by ProductFilter, which leaves out held stock
         
         # Featured products
         is_featured = self.request.query_params.get('is_featured')
@@ -145,50 +188,184 @@ class ProductListView(generics.ListAPIView):
         tags = self.request.query_params.get('tags')
         if tags:
             tag_list = [tag.strip() for tag in tags.split(',')]
-            print(f"DEBUG: Searching for tags: {tag_list}")
             
             # Handle both individual tags and JSON array tags
             tag_queries = Q()
             for tag in tag_list:
-                print(f"DEBUG: Building query for tag: '{tag}'")
                 # Search for exact match or JSON array containing the tag
                 tag_queries |= (
                     Q(tags__name__iexact=tag) |  # Exact match (case insensitive)
                     Q(tags__name__icontains=f'"{tag}"')  # JSON array contains the tag
                 )
             
-            print(f"DEBUG: Final tag query: {tag_queries}")
             queryset = queryset.filter(tag_queries).distinct()
-            print(f"DEBUG: Products found after tag filtering: {queryset.count()}")
-            
-            # Let's also see what tags actually exist
-            from taggit.models import Tag
-            all_tags = Tag.objects.all().values_list('name', flat=True)
-            print(f"DEBUG: All tags in database: {list(all_tags)}")
         
         return queryset
+    
+    def list(self, request, *args, **kwargs):
+        fields, expand = requested_card_fields(request)
+        queryset = self.filter_queryset(self.get_queryset()).only(
+            'id', *self.ordering_fields, *self.ordering_aliases.values()
+        )
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize_product_cards(page, request, fields, expand))
+        return Response(serialize_product_cards(queryset, request, fields, expand))
 
 
-class ProductDetailView(generics.RetrieveAPIView):
-    """Get product details and increment view count"""
-    queryset = Product.objects.select_related('seller', 'category').prefetch_related(
-        'images', 'videos', 'attributes', 'variants', 'tags'
+@method_decorator(cache_catalog_response('products', 'categories', 'tags'), name='get')
+class ProductFacetsView(ProductListView):
+    """
+    Facet counts for the product browse page.
+    Accepts the same filters as ProductListView and counts the matching products
+    per category, business type, size, color, tag and price range.
+    """
+    pagination_class = None
+    tag_facet_limit = 30
+    price_bucket_count = 8
+    
+    def get(self, request, *args, **kwargs):
+        matching = self.filter_queryset(self.get_queryset()).order_by().values('id')
+        # Count over distinct products, whatever joins the filters used
+        products = Product.objects.filter(id__in=matching)
+        
+        return Response({
+            'total': products.count(),
+            'categories': [
+                {'id': row['category_id'], 'name': row['category__name'], 'slug': row['category__slug'], 'count': row['count']}
+                for row in products.filter(category__isnull=False).values(
+                    'category_id', 'category__name', 'category__slug'
+                ).annotate(count=Count('id')).order_by('-count', 'category__name')
+            ],
+            'business_types': [
+                {'value': row['seller__business_type'], 'count': row['count']}
+                for row in products.values('seller__business_type').annotate(
+                    count=Count('id')
+                ).order_by('-count', 'seller__business_type')
+            ],
+            'sizes': self.get_json_array_facet(matching, 'availableSizes'),
+            'colors': self.get_json_array_facet(matching, 'availableColors'),
+            'tags': [
+                {'name': row['tag__name'], 'slug': row['tag__slug'], 'count': row['count']}
+                for row in TaggedItem.objects.filter(
+                    content_type=ContentType.objects.get_for_model(Product),
+                    object_id__in=matching
+                ).values('tag__name', 'tag__slug').annotate(
+                    count=Count('id')
+                ).order_by('-count', 'tag__name')[:self.tag_facet_limit]
+            ],
+            'price_ranges': self.get_price_histogram(products),
+        })
+    
+    def get_json_array_facet(self, matching, column):
+        """Count products per value of a JSON list column (sizes, colors)"""
+        subquery, params = matching.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT value, COUNT(*) FROM {Product._meta.db_table} product, '
+                f'jsonb_array_elements_text(product."{column}") AS value '
+                f'WHERE product.id IN ({subquery}) '
+                # The JSONField does not enforce lists; other values have no elements to count
+                f'AND jsonb_typeof(product."{column}") = \'array\' '
+                f'GROUP BY value ORDER BY COUNT(*) DESC, value',
+                params
+            )
+            return [{'value': value, 'count': count} for value, count in cursor.fetchall()]
+    
+    def get_price_histogram(self, products):
+        """Counts per price range, using evenly sized buckets with round bounds"""
+        bounds = products.aggregate(min_price=Min('effective_price'), max_price=Max('effective_price'))
+        if bounds['min_price'] is None:
+            return []
+        
+        low, high = float(bounds['min_price']), float(bounds['max_price'])
+        raw_width = max((high - low) / self.price_bucket_count, 1)
+        magnitude = 10 ** math.floor(math.log10(raw_width))
+        width = next(step * magnitude for step in (1, 2, 5, 10) if step * magnitude >= raw_width)
+        
+        rows = products.annotate(
+            bucket=Floor(F('effective_price') / width)
+        ).values('bucket').annotate(count=Count('id')).order_by('bucket')
+        return [
+            {'min': int(row['bucket'] * width), 'max': int((row['bucket'] + 1) * width), 'count': row['count']}
+            for row in rows
+        ]
+
+
+def get_product_validators(product_id):
+    """
+    ETag and Last-Modified of a product page, read in one query without loading the product.
+    
+    Product.updated_at also moves when its images, variants, offers or tags change;
+    offers starting or ending on schedule are covered by the live offer columns.
+    The buffered views count is left out, so it may lag on revalidated pages.
+    """
+    now = timezone.now()
+    live_offers = ProductOffer.objects.filter(
+        product=OuterRef('pk'),
+        status='active',
+        start_date__lte=now,
+        end_date__gte=now
+    ).order_by('-created_at')
+    ended_offers = ProductOffer.objects.filter(product=OuterRef('pk'), end_date__lt=now).order_by('-end_date')
+    
+    try:
+        row = Product.objects.filter(id=product_id).annotate(
+            live_offer_id=Subquery(live_offers.values('id')[:1]),
+            live_offer_start=Subquery(live_offers.values('start_date')[:1]),
+            last_offer_end=Subquery(ended_offers.values('end_date')[:1])
+        ).values_list(
+            'id', 'updated_at', 'seller__updated_at', 'live_offer_id', 'live_offer_start', 'last_offer_end'
+        ).first()
+    except ValueError:
+        return None
+    if row is None:
+        return None
+    
+    product_id, updated_at, seller_updated_at, live_offer_id, live_offer_start, last_offer_end = row
+    etag = make_etag(
+        product_id, updated_at, seller_updated_at, live_offer_id,
+        [get_namespace_version(namespace) for namespace in ('categories', 'collections', 'tags')]
+    )
+    last_modified = max(
+        moment for moment in (updated_at, seller_updated_at, live_offer_start, last_offer_end) if moment
     )
+    return etag, last_modified
+
+
+class ProductDetailView(SparseFieldsViewMixin, generics.RetrieveAPIView):
+    """Get product details and increment view count"""
+    queryset = Product.objects.all()
     serializer_class = ProductDetailSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'id'
     
+    def get_queryset(self):
+        # Loads only the columns, joins and prefetches of the requested fields
+        return sparse_queryset(super().get_queryset(), self.get_serializer())
+    
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
+        validators = get_product_validators(self.kwargs['id'])
+        if validators is None:
+            # Unknown product: let get_object() answer with a 404
+            return super().retrieve(request, *args, **kwargs)
         
-        # Increment view count
-        Product.objects.filter(id=instance.id).update(views_count=F('views_count') + 1)
+        # Views are buffered in Redis and flushed periodically; revalidated
+        # pages count as views too
+        pending_views = record_product_view(int(self.kwargs['id']))
         
-        # Refresh instance to get updated view count
-        instance.refresh_from_db()
+        not_modified = not_modified_response(request, *validators)
+        if not_modified is not None:
+            return not_modified
         
+        instance = self.get_object()
         serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        if 'views_count' in serializer.fields:
+            # Report the stored count plus the views still waiting to be flushed
+            instance.views_count += pending_views
+        
+        return set_validator_headers(Response(serializer.data), *validators)
 
 
 class ProductCreateView(generics.CreateAPIView):
@@ -224,7 +401,7 @@ class ProductDeleteView(generics.DestroyAPIView):
         return Product.objects.filter(seller__user=self.request.user)
 
 
-class SellerProductListView(generics.ListAPIView):
+class SellerProductListView(SparseFieldsViewMixin, generics.ListAPIView):
     """List products for authenticated seller"""
     serializer_class = ProductListSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -237,9 +414,14 @@ class SellerProductListView(generics.ListAPIView):
         if not hasattr(self.request.user, 'seller_profile'):
             return Product.objects.none()
         
-        return Product.objects.filter(
-            seller=self.request.user.seller_profile
-        ).select_related('category').prefetch_related('images', 'tags')
+        if self.request.query_params.get('cursor') is not None:
+            self.pagination_class = ProductCursorPagination
+        
+        return sparse_queryset(
+            Product.objects.filter(seller=self.request.user.seller_profile),
+            self.get_serializer(),
+            columns=self.ordering_fields
+        )
 
 
 class ProductImageListCreateView(generics.ListCreateAPIView):
@@ -305,68 +487,61 @@ class ProductAttributeTypeListView(generics.ListAPIView):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cache_catalog_response('products', 'offers', 'categories', 'tags')
 def featured_products_view(request):
     """Get featured products"""
-    products = Product.objects.filter(
-        is_featured=True, 
-        status='active'
-    ).select_related('seller', 'category').prefetch_related('images', 'tags')[:10]
-    
-    serializer = ProductListSerializer(products, many=True, context={'request': request})
-    return Response(serializer.data)
+    # Selected from products, so ones whose card is not built yet are serialized from the tables
+    product_ids = Product.objects.filter(status='active', is_featured=True).order_by(
+        '-created_at'
+    ).values_list('id', flat=True)[:10]
+    return Response(serialize_product_cards(product_ids, request))
 
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def trending_products_view(request):
     """Get trending products with analytics"""
-    from django.utils import timezone
-    from datetime import timedelta
-    from django.db.models import Count, Sum
-    from apps.orders.models import OrderItem, CartItem
+    from apps.analytics.models import TrendingProduct
+    from apps.analytics.trending import get_trending_window
     
-    # Get time range for analytics (last 24 hours by default)
-    hours = int(request.GET.get('hours', 24))
-    time_threshold = timezone.now() - timedelta(hours=hours)
-    
-    # Get products with basic ordering
-    products = Product.objects.filter(
-        status='active'
-    ).select_related('seller', 'category').prefetch_related('images', 'tags').order_by(
-        '-views_count', '-sales_count'
-    )[:20]
+    try:
+        hours = int(request.GET.get('hours', 24))
+    except ValueError:
+        return Response({'error': 'hours must be a whole number'}, status=400)
+    
+    # Rankings are precomputed for fixed windows; use the smallest one covering
+    # the requested range (last 24 hours by default, at least one hour)
+    hours = get_trending_window(max(hours, 1))
+    
+    entries = list(TrendingProduct.objects.filter(
+        window_hours=hours,
+        product__status='active'
+    ).order_by('rank')[:20])
+    
+    if not entries:
+        # Rankings not computed yet: fall back to all-time popularity
+        product_ids = Product.objects.filter(status='active').order_by(
+            '-views_count', '-sales_count'
+        ).values_list('id', flat=True)[:20]
+        entries = [TrendingProduct(product_id=product_id) for product_id in product_ids]
     
     # Prepare response with analytics
     products_data = []
-    serializer = ProductListSerializer(products, many=True, context={'request': request})
+    cards = product_card_map([entry.product_id for entry in entries], request)
     
-    for i, product_data in enumerate(serializer.data):
-        product_id = product_data['id']
-        
-        # Get cart analytics (added to cart in last X hours)
-        cart_adds = CartItem.objects.filter(
-            product_id=product_id,
-            created_at__gte=time_threshold
-        ).aggregate(
-            total_cart_adds=Count('id'),
-            total_cart_quantity=Sum('quantity')
-        )
-        
-        # Get order analytics (ordered in last X hours)
-        order_stats = OrderItem.objects.filter(
-            product_id=product_id,
-            created_at__gte=time_threshold
-        ).aggregate(
-            total_orders=Count('id'),
-            total_ordered_quantity=Sum('quantity')
-        )
+    for entry in entries:
+        product_data = cards.get(entry.product_id)
+        if product_data is None:
+            continue
         
         # Add analytics to product data
         product_data['analytics'] = {
-            'cart_adds': cart_adds['total_cart_adds'] or 0,
-            'cart_quantity': cart_adds['total_cart_quantity'] or 0,
-            'orders': order_stats['total_orders'] or 0,
-            'ordered_quantity': order_stats['total_ordered_quantity'] or 0,
+            'views': entry.views,
+            'cart_adds': entry.cart_adds,
+            'cart_quantity': entry.cart_quantity,
+            'orders': entry.orders,
+            'ordered_quantity': entry.ordered_quantity,
+            'trending_score': round(entry.score, 2),
             'hours_analyzed': hours
         }
         
@@ -394,23 +569,27 @@ def trending_products_view(request):
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def related_products_view(request, product_id):
-    """Get related products based on category and tags"""
+    """Get related products ranked by the precomputed related products index"""
     try:
-        product = Product.objects.get(id=product_id)
-        
-        # Get products with same category or tags
-        related = Product.objects.filter(
-            Q(category=product.category) | Q(tags__in=product.tags.all()),
-            status='active'
-        ).exclude(id=product_id).distinct().select_related(
-            'seller', 'category'
-        ).prefetch_related('images', 'tags')[:8]
-        
-        serializer = ProductListSerializer(related, many=True, context={'request': request})
-        return Response(serializer.data)
-    
-    except Product.DoesNotExist:
+        product = Product.objects.only('id', 'category_id').get(id=product_id)
+    except (Product.DoesNotExist, ValueError):
         return Response({'error': 'Product not found'}, status=404)
+    
+    related_ids = RelatedProducts.objects.filter(
+        product_id=product.id
+    ).values_list('related_ids', flat=True).first() or []
+    
+    if related_ids:
+        # The index may lag behind status changes
+        active_ids = set(Product.objects.filter(id__in=related_ids[:8], status='active').values_list('id', flat=True))
+        related = [related_id for related_id in related_ids[:8] if related_id in active_ids]
+    else:
+        # Not indexed yet (e.g. a new product): best sellers of the same category
+        related = Product.objects.filter(status='active', category_id=product.category_id).exclude(
+            id=product.id
+        ).order_by('-sales_count', '-created_at').values_list('id', flat=True)[:8]
+    
+    return Response(serialize_product_cards(related, request))
 
 
 @api_view(['POST'])
@@ -434,7 +613,21 @@ def bulk_update_products_view(request):
     )
     
     # Apply updates
-    updated_count = products.update(**update_data)
+    product_ids = list(products.values_list('id', flat=True))
+    # updated_at is the validator of conditional GETs of the product page
+    updated_count = products.update(**dict(update_data, updated_at=timezone.now()))
+    
+    # update() skips the signal handlers maintaining denormalized data
+    if 'status' in update_data:
+        TagUsage.refresh_for_products(product_ids)
+    if 'price' in update_data:
+        refresh_effective_prices(product_ids)
+    if {'availableSizes', 'availableColors'} & set(update_data):
+        refresh_attributes_docs(product_ids)
+    if {'name', 'status'} & set(update_data):
+        SearchSuggestion.sync_products(product_ids)
+    queue_product_card_refresh(product_ids)
+    invalidate_namespaces('products')
     
     return Response({
         'message': f'Updated {updated_count} products',
@@ -442,6 +635,44 @@ def bulk_update_products_view(request):
     })
 
 
+class ProductImportListCreateView(generics.ListCreateAPIView):
+    """
+    Upload a CSV/XLSX catalog file (sellers only) and list previous imports.
+    The file is processed in the background; poll the import for progress.
+    """
+    serializer_class = ProductImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    
+    def get_queryset(self):
+        if not hasattr(self.request.user, 'seller_profile'):
+            return ProductImportJob.objects.none()
+        return ProductImportJob.objects.filter(seller=self.request.user.seller_profile)
+    
+    def perform_create(self, serializer):
+        if not hasattr(self.request.user, 'seller_profile'):
+            raise PermissionDenied("Only sellers can import products")
+        
+        job = serializer.save(seller=self.request.user.seller_profile, created_by=self.request.user)
+        transaction.on_commit(lambda: run_product_import_task.delay(job.id))
+    
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+
+class ProductImportDetailView(generics.RetrieveAPIView):
+    """Progress and row errors of a catalog import"""
+    serializer_class = ProductImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        if not hasattr(self.request.user, 'seller_profile'):
+            return ProductImportJob.objects.none()
+        return ProductImportJob.objects.filter(seller=self.request.user.seller_profile)
+
+
 # Product Offer Views
 class ProductOfferListCreateView(generics.ListCreateAPIView):
     """List and create product offers for a seller"""
@@ -494,7 +725,7 @@ def seller_products_for_offers_view(request):
     products = Product.objects.filter(
         seller=request.user.seller_profile,
         status='active'
-    ).select_related('seller').prefetch_related('images').order_by('-created_at')
+    ).select_related('seller').prefetch_related('images').with_active_offer().order_by('-created_at')
     
     serializer = ProductWithOfferSerializer(products, many=True, context={'request': request})
     return Response({'products': serializer.data})
@@ -510,7 +741,7 @@ def seller_products_for_offers_view(request):
     products = Product.objects.filter(
         seller=request.user.seller_profile,
         status='active'
-    ).select_related('seller', 'category').prefetch_related('images', 'tags')
+    ).select_related('seller', 'category', 'collection').prefetch_related('tags').with_primary_image().with_active_offer()
     
     serializer = ProductListSerializer(products, many=True, context={'request': request})
     return Response({'products': serializer.data})
@@ -539,6 +770,7 @@ def seller_active_offers_view(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cache_catalog_response('products', 'offers')
 def store_active_offers_view(request, seller_id):
     """Get active offers for a specific store/seller"""
     from django.utils import timezone
@@ -561,6 +793,7 @@ def store_active_offers_view(request, seller_id):
     return Response({'offers': serializer.data})
 
 
+@method_decorator(cache_catalog_response('tags'), name='get')
 class TagListView(APIView):
     """
     API endpoint for listing all available tags
@@ -569,18 +802,13 @@ class TagListView(APIView):
     permission_classes = []  # Allow public access
     
     def get(self, request, *args, **kwargs):
-        tags = Tag.objects.annotate(
-            usage_count=Count('taggit_taggeditem_items')
-        ).order_by('-usage_count', 'name')
-        
-        tag_data = []
-        for tag in tags:
-            tag_data.append({
-                'id': tag.id,
-                'name': tag.name,
-                'slug': tag.slug,
-                'usage_count': tag.usage_count
-            })
+        # Usage counts (active products per tag) are maintained in TagUsage
+        tag_data = [
+            {'id': tag_id, 'name': name, 'slug': slug, 'usage_count': product_count}
+            for tag_id, name, slug, product_count in TagUsage.ranked().values_list(
+                'tag_id', 'name', 'slug', 'product_count'
+            )
+        ]
         
         return Response({
             'results': tag_data,
@@ -601,57 +829,15 @@ def search_suggestions(request):
     if len(query) < 2:
         return Response({'suggestions': []})
     
-    suggestions = {
-        'products': [],
-        'tags': [],
-        'categories': [],
-        'sellers': []
-    }
-    
-    # Product name suggestions using trigram similarity
-    product_suggestions = Product.objects.filter(
-        status='active'
-    ).annotate(
-        similarity=TrigramSimilarity('name', query)
-    ).filter(
-        Q(name__icontains=query) | Q(similarity__gt=0.3)
-    ).order_by('-similarity', '-created_at').values_list('name', flat=True)[:limit]
-    
-    suggestions['products'] = list(product_suggestions)
-    
-    # Tag suggestions
-    tag_suggestions = Tag.objects.filter(
-        name__icontains=query
-    ).annotate(
-        usage_count=Count('taggit_taggeditem_items')
-    ).order_by('-usage_count', 'name').values_list('name', flat=True)[:limit]
-    
-    suggestions['tags'] = list(tag_suggestions)
-    
-    # Category suggestions
-    category_suggestions = Category.objects.filter(
-        name__icontains=query
-    ).values_list('name', flat=True)[:limit]
-    
-    suggestions['categories'] = list(category_suggestions)
-    
-    # Seller/business suggestions
-    try:
-        from apps.users.models import SellerProfile
-        seller_suggestions = SellerProfile.objects.filter(
-            business_name__icontains=query,
-            is_active=True
-        ).values_list('business_name', flat=True)[:limit]
-        
-        suggestions['sellers'] = list(seller_suggestions)
-    except ImportError:
-        suggestions['sellers'] = []
+    # Single trigram-indexed lookup, ranked and capped per suggestion type
+    suggestions = SearchSuggestion.lookup(query, limit)
     
     return Response({'suggestions': suggestions})
 
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cache_catalog_response('products', 'tags')
 def trending_searches(request):
     """
     API endpoint for trending search terms
@@ -664,10 +850,8 @@ def trending_searches(request):
         status='active'
     ).order_by('-views_count', '-sales_count')[:limit].values_list('name', flat=True)
     
-    # Get trending tags (most used tags)
-    trending_tags = Tag.objects.annotate(
-        usage_count=Count('taggit_taggeditem_items')
-    ).order_by('-usage_count')[:limit].values_list('name', flat=True)
+    # Get trending tags (on the most active products)
+    trending_tags = TagUsage.ranked().filter(product_count__gt=0)[:limit].values_list('name', flat=True)
     
     return Response({
         'trending': {
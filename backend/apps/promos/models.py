@@ -1,10 +1,13 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from djmoney.models.fields import MoneyField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 import uuid
 from decimal import Decimal
+from justclothing.cache import invalidate_namespaces
 
 User = get_user_model()
 
@@ -396,3 +399,14 @@ class SellerPromoRequest(models.Model):
     
     def __str__(self):
         return f"Promo Request: {self.requested_code} by {self.seller.business_name}"
+
+
+# Signal handlers invalidating the cached offers page
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+@receiver(post_save, sender=PromoCode)
+@receiver(post_delete, sender=PromoCode)
+@receiver(post_save, sender=FeaturedPromo)
+@receiver(post_delete, sender=FeaturedPromo)
+def invalidate_promotion_cache(sender, **kwargs):
+    invalidate_namespaces('promotions')
@@ -2,7 +2,7 @@ from django.shortcuts import render
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Q, Count
+from django.db.models import Q, F, Count
 from django.utils import timezone
 from .models import (
     Promotion, PromoCode, SellerPromoRequest, 
@@ -13,6 +13,7 @@ from .serializers import (
     PromoUsageSerializer, ProductBasicSerializer, FeaturedPromoSerializer
 )
 from apps.products.models import Product
+from justclothing.cache import cache_catalog_response
 
 
 class SellerPromoRequestViewSet(viewsets.ModelViewSet):
@@ -195,14 +196,19 @@ class PromotionViewSet(viewsets.ReadOnlyModelViewSet):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cache_catalog_response('promotions')
 def offers_page_data(request):
     """Get comprehensive data for offers page"""
     now = timezone.now()
     
     # Get featured banners/promos
     featured_banners = FeaturedPromo.objects.filter(
+        Q(max_impressions__isnull=True) | Q(max_impressions=0) | Q(current_impressions__lt=F('max_impressions')),
+        Q(max_clicks__isnull=True) | Q(max_clicks=0) | Q(current_clicks__lt=F('max_clicks')),
         placement='homepage_banner',
-        is_currently_active=True
+        is_active=True,
+        promotion_start__lte=now,
+        promotion_end__gte=now
     ).select_related('promo_code__promotion')[:5]
     
     # Get all active promotions
@@ -41,7 +41,7 @@ def update_seller_rating(seller_profile):
     # Update the seller profile
     seller_profile.rating = Decimal(str(avg_rating))
     seller_profile.total_reviews = total_reviews
-    seller_profile.save(update_fields=['rating', 'total_reviews'])
+    seller_profile.save(update_fields=['rating', 'total_reviews', 'updated_at'])
     
     return avg_rating, total_reviews
 
@@ -72,7 +72,7 @@ def update_product_rating(product):
     # Update the product
     product.rating = Decimal(str(avg_rating))
     product.review_count = total_reviews
-    product.save(update_fields=['rating', 'review_count'])
+    product.save(update_fields=['rating', 'review_count', 'updated_at'])
     
     return avg_rating, total_reviews
 
@@ -245,5 +245,10 @@ class SellerHomepageProductSerializer(serializers.ModelSerializer):
     
     def get_product_data(self, obj):
         """Get basic product information"""
+        # Views pass the card data of all listed products as `product_cards`
+        product_cards = self.context.get('product_cards')
+        if product_cards is not None and obj.product_id in product_cards:
+            return product_cards[obj.product_id]
+        
         from apps.products.serializers import ProductListSerializer
         return ProductListSerializer(obj.product, context=self.context).data 
\ No newline at end of file
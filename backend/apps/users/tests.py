@@ -1,3 +1,65 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.products.models import Product
+from .models import User, SellerProfile, SellerHomepageProduct
+
+
+def create_seller():
+    user = User.objects.create(email='seller@example.com', username='seller')
+    return SellerProfile.objects.create(
+        user=user, business_name='Shop', business_description='Clothes',
+        phone_number='+8801711111111', business_address='Dhaka', status='approved'
+    )
+
+
+class StoreConditionalGetTests(TestCase):
+    """ETags of public store pages"""
+    
+    def setUp(self):
+        cache.clear()
+        self.seller = create_seller()
+        self.product = Product.objects.create(
+            seller=self.seller, name='Shirt', description='Shirt', price=100, base_price=100, stock_quantity=5
+        )
+        SellerHomepageProduct.objects.create(seller=self.seller, product=self.product, order=0)
+        self.store_url = f'/api/v1/auth/stores/{self.seller.id}/'
+        self.homepage_url = f'/api/v1/auth/stores/{self.seller.id}/homepage-products/'
+        self.client = APIClient()
+    
+    def test_unchanged_store_is_not_modified(self):
+        etag = self.client.get(self.store_url)['ETag']
+        
+        response = self.client.get(self.store_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+    
+    def test_store_profile_changes_the_etag(self):
+        etag = self.client.get(self.store_url)['ETag']
+        self.seller.business_name = 'New Shop'
+        self.seller.save()
+        
+        response = self.client.get(self.store_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['business_name'], 'New Shop')
+    
+    def test_unchanged_homepage_is_not_modified(self):
+        etag = self.client.get(self.homepage_url)['ETag']
+        
+        response = self.client.get(self.homepage_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+    
+    def test_selected_product_changes_the_homepage_etag(self):
+        etag = self.client.get(self.homepage_url)['ETag']
+        self.product.name = 'Tee'
+        self.product.save()
+        
+        response = self.client.get(self.homepage_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_unapproved_store_is_not_found(self):
+        SellerProfile.objects.filter(id=self.seller.id).update(status='pending')
+        
+        response = self.client.get(self.store_url)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
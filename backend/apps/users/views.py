@@ -7,8 +7,12 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.decorators import method_decorator
 
 from .models import CustomerProfile, SellerProfile, Address, SellerTeamMember, SellerHomepageProduct
+from apps.products.cards import product_card_map, requested_card_fields
+from justclothing.cache import conditional_response, make_etag
 from .serializers import (
     CustomTokenObtainPairSerializer,
     UserRegistrationSerializer,
@@ -265,6 +269,20 @@ class PublicSellerListView(generics.ListAPIView):
         return SellerProfile.objects.filter(status='approved')
 
 
+def get_store_validators(request, id):
+    """ETag and Last-Modified of a public store profile from its timestamps"""
+    try:
+        row = SellerProfile.objects.filter(id=id, status='approved').values_list(
+            'id', 'updated_at', 'user__updated_at'
+        ).first()
+    except ValueError:
+        return None
+    if row is None:
+        return None
+    return make_etag(*row), max(row[1], row[2])
+
+
+@method_decorator(conditional_response(get_store_validators), name='get')
 class PublicSellerDetailView(generics.RetrieveAPIView):
     """Public view of specific seller/store"""
     serializer_class = SellerProfileSerializer
@@ -353,7 +371,7 @@ def store_reviews_view(request, seller_id):
                 'distribution': rating_distribution
             }
         })
-        
+    
     except SellerProfile.DoesNotExist:
         return Response({'error': 'Store not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -412,15 +430,14 @@ def seller_homepage_products_view(request):
     if request.method == 'GET':
         print(f"🏪 DEBUG: Seller {seller.id} ({seller.business_name}) fetching their homepage products")
         
-        homepage_products = SellerHomepageProduct.objects.filter(
-            seller=seller
-        ).select_related('product').order_by('order')
-        
-        print(f"🏪 DEBUG: Found {homepage_products.count()} homepage products for seller")
-        for hp in homepage_products:
-            print(f"🏪 DEBUG: Seller's Product {hp.order}: {hp.product.name} (ID: {hp.product.id})")
+        homepage_products = list(SellerHomepageProduct.objects.filter(seller=seller).order_by('order'))
+        product_cards = product_card_map(
+            [hp.product_id for hp in homepage_products], request, *requested_card_fields(request)
+        )
         
-        serializer = SellerHomepageProductSerializer(homepage_products, many=True, context={'request': request})
+        serializer = SellerHomepageProductSerializer(
+            homepage_products, many=True, context={'request': request, 'product_cards': product_cards}
+        )
         print(f"🏪 DEBUG: Seller's serialized data: {serializer.data}")
         
         return Response(serializer.data)
@@ -463,7 +480,7 @@ def seller_homepage_products_view(request):
                 )
                 created_count += 1
                 print(f"🏪 DEBUG: Successfully created homepage product for {product.name}")
-                
+            
             except Product.DoesNotExist:
                 print(f"🏪 DEBUG: ERROR - Product {product_id} not found or doesn't belong to seller")
                 continue
@@ -482,8 +499,32 @@ def seller_homepage_products_view(request):
         return Response({'message': 'Homepage products updated successfully'})
 
 
+def get_store_homepage_validators(request, store_id):
+    """
+    ETag and Last-Modified of a store homepage from the selection rows and the
+    timestamps of the selected products and their cards, without serializing them.
+    """
+    seller_updated_at = SellerProfile.objects.filter(id=store_id).values_list('updated_at', flat=True).first()
+    if seller_updated_at is None:
+        return None
+    
+    now = timezone.now()
+    rows = SellerHomepageProduct.objects.filter(seller_id=store_id).order_by('order').values_list(
+        'id', 'order', 'updated_at', 'product_id', 'product__updated_at',
+        'product__card__refreshed_at', 'product__card__offer_ends_at'
+    )
+    # Card offers expire on read, so the ETag changes once an offer ends
+    entries = [row + (bool(row[-1] and row[-1] < now),) for row in rows]
+    
+    moments = [seller_updated_at]
+    for _, _, updated_at, _, product_updated_at, refreshed_at, offer_ends_at, expired in entries:
+        moments.extend([updated_at, product_updated_at, refreshed_at, offer_ends_at if expired else None])
+    return make_etag(store_id, seller_updated_at, entries), max(moment for moment in moments if moment)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@conditional_response(get_store_homepage_validators)
 def store_homepage_products_view(request, store_id):
     """Get homepage products for a specific store (public endpoint)"""
     
@@ -493,15 +534,14 @@ def store_homepage_products_view(request, store_id):
         seller = SellerProfile.objects.get(id=store_id)
         print(f"🔍 DEBUG: Found seller: {seller.business_name}, status: {seller.status}")
         
-        homepage_products = SellerHomepageProduct.objects.filter(
-            seller=seller
-        ).select_related('product').order_by('order')
-        
-        print(f"🔍 DEBUG: Found {homepage_products.count()} homepage products")
-        for hp in homepage_products:
-            print(f"🔍 DEBUG: Product {hp.order}: {hp.product.name} (ID: {hp.product.id})")
+        homepage_products = list(SellerHomepageProduct.objects.filter(seller=seller).order_by('order'))
+        product_cards = product_card_map(
+            [hp.product_id for hp in homepage_products], request, *requested_card_fields(request)
+        )
         
-        serializer = SellerHomepageProductSerializer(homepage_products, many=True, context={'request': request})
+        serializer = SellerHomepageProductSerializer(
+            homepage_products, many=True, context={'request': request, 'product_cards': product_cards}
+        )
         print(f"🔍 DEBUG: Serialized data: {serializer.data}")
         
         return Response(serializer.data)
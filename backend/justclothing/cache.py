@@ -0,0 +1,161 @@
+import hashlib
+import logging
+from functools import lru_cache, wraps
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+# Public catalog responses are cached per namespace. Instead of deleting keys,
+# invalidation bumps the namespace version, which is part of every cache key,
+# so stale entries are never read again and simply expire.
+# When Redis is unreachable, responses are served uncached and writes go
+# through without invalidating, rather than failing the request.
+CATALOG_CACHE_TIMEOUT = 300
+VERSION_KEY = 'catalog:version:{}'
+
+logger = logging.getLogger(__name__)
+
+
+def get_namespace_version(namespace):
+    """Current version of a cache namespace; None when the cache is unavailable"""
+    try:
+        return cache.get_or_set(VERSION_KEY.format(namespace), 1, timeout=None)
+    except redis.RedisError as e:
+        logger.warning(f"Cache unavailable, reading namespace {namespace} uncached: {e}")
+        return None
+
+
+def invalidate_namespaces(*namespaces):
+    """Invalidate every cached response depending on the given namespaces"""
+    for namespace in namespaces:
+        key = VERSION_KEY.format(namespace)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Version not set yet (or evicted): start a fresh one
+                cache.set(key, 2, timeout=None)
+        except redis.RedisError as e:
+            logger.warning(f"Cache unavailable, could not invalidate namespace {namespace}: {e}")
+
+
+def build_cache_key(request, namespaces, view_kwargs=None):
+    """
+    Cache key from the path, normalized query parameters and namespace versions;
+    None when the versions cannot be read
+    """
+    params = sorted(
+        (key, sorted(values))
+        for key, values in request.query_params.lists()
+        if any(values)
+    )
+    versions = [(namespace, get_namespace_version(namespace)) for namespace in namespaces]
+    if any(version is None for _, version in versions):
+        return None
+    signature = repr((
+        request.get_host(),
+        request.path,
+        params,
+        sorted((view_kwargs or {}).items()),
+        versions,
+    ))
+    return 'catalog:response:' + hashlib.md5(signature.encode('utf-8')).hexdigest()
+
+
+def cache_catalog_response(*namespaces, timeout=CATALOG_CACHE_TIMEOUT):
+    """
+    Cache the data of successful GET responses of a public DRF view.
+
+    Apply it to the view function below `@api_view`, or to view methods with
+    `method_decorator`, so that it receives the DRF request.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view_func(request, *args, **kwargs)
+
+            key = build_cache_key(request, namespaces, kwargs)
+            if key is None:
+                return view_func(request, *args, **kwargs)
+            try:
+                cached = cache.get(key)
+            except redis.RedisError as e:
+                logger.warning(f"Cache unavailable, serving {request.path} uncached: {e}")
+                return view_func(request, *args, **kwargs)
+            if cached is not None:
+                data, status_code = cached
+                return Response(data, status=status_code)
+
+            response = view_func(request, *args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                try:
+                    cache.set(key, (response.data, response.status_code), timeout)
+                except redis.RedisError as e:
+                    logger.warning(f"Cache unavailable, could not store {request.path}: {e}")
+            return response
+        return wrapper
+    return decorator
+
+
+def make_etag(*parts):
+    """Weak ETag from the values a representation depends on"""
+    digest = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+    return f'W/"{digest}"'
+
+
+def not_modified_response(request, etag=None, last_modified=None):
+    """304 (or 412) response when the client's validators still match, otherwise None"""
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None
+    )
+
+
+def set_validator_headers(response, etag=None, last_modified=None):
+    """Send ETag and Last-Modified with a successful response"""
+    if response.status_code == 200:
+        if etag:
+            response.headers['ETag'] = etag
+        if last_modified:
+            response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def conditional_response(get_validators):
+    """
+    Answer conditional GETs of a view without running it when nothing changed.
+
+    `get_validators(request, *args, **kwargs)` returns `(etag, last_modified)`
+    from a lightweight query, or None when they cannot be computed (e.g. the
+    object does not exist), in which case the view handles the request as usual.
+    Like cache_catalog_response, apply it below `@api_view` or with `method_decorator`.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            validators = get_validators(request, *args, **kwargs)
+            if validators is None:
+                return view_func(request, *args, **kwargs)
+
+            response = not_modified_response(request, *validators)
+            if response is not None:
+                return response
+            return set_validator_headers(view_func(request, *args, **kwargs), *validators)
+        return wrapper
+    return decorator
+
+
+@lru_cache(maxsize=None)
+def get_redis_client():
+    """Shared Redis connection for counters and buffers outside the cache API"""
+    return redis.Redis.from_url(settings.REDIS_URL)
@@ -57,6 +57,7 @@ DJANGO_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    'django.contrib.postgres',
 ]
 
 THIRD_PARTY_APPS = [
@@ -335,7 +336,20 @@ LOGGING = {
 # Create logs directory if it doesn't exist
 os.makedirs(os.path.join(BASE_DIR, 'logs'), exist_ok=True)
 
+# Cache Configuration
+REDIS_URL = config('REDIS_URL', default='redis://redis:6379/0')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('CACHE_REDIS_URL', default=REDIS_URL),
+        'KEY_PREFIX': 'justclothing',
+    }
+}
+
 # Celery Configuration
+from celery.schedules import crontab
+
 CELERY_BROKER_URL = 'redis://redis:6379/0'
 CELERY_RESULT_BACKEND = 'redis://redis:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
@@ -343,6 +357,44 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
+# Image processing runs in its own worker pool (the celery-images service),
+# so long resizes never hold up the default queue
+CELERY_TASK_ROUTES = {
+    'apps.products.tasks.generate_image_renditions_task': {'queue': 'images'},
+    'apps.products.tasks.fetch_product_images_task': {'queue': 'images'},
+}
+
+CELERY_BEAT_SCHEDULE = {
+    'flush-product-view-counts': {
+        'task': 'apps.products.tasks.flush_product_view_counts',
+        'schedule': 60.0,
+    },
+    'refresh-trending-products': {
+        'task': 'apps.analytics.tasks.refresh_trending_products',
+        'schedule': 300.0,
+    },
+    'rebuild-related-products': {
+        'task': 'apps.products.tasks.rebuild_related_products_index',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'apply-offer-lifecycle': {
+        'task': 'apps.products.tasks.apply_offer_lifecycle_task',
+        'schedule': 60.0,
+    },
+    'release-expired-stock-reservations': {
+        'task': 'apps.products.tasks.release_expired_stock_reservations',
+        'schedule': 60.0,
+    },
+    'reconcile-tag-usage': {
+        'task': 'apps.products.tasks.reconcile_tag_usage',
+        'schedule': crontab(minute=30),
+    },
+    'purge-idempotency-keys': {
+        'task': 'apps.orders.tasks.purge_idempotency_keys',
+        'schedule': crontab(minute=45),
+    },
+}
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "https://justclothing.store",
@@ -355,3 +407,7 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+
+# Order requests may carry an Idempotency-Key (see apps.orders.idempotency)
+from corsheaders.defaults import default_headers
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')